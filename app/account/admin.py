@@ -1,8 +1,14 @@
 # -*- coding: UTF-8 -*-
 """This module customizes admin UI for the `account` application."""
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.db.models import QuerySet
+from django.http import HttpRequest, StreamingHttpResponse
+from django.template.response import TemplateResponse
 
-from app.account.models import Account
+from app.account.export import CONTENT_TYPES, export_rows
+from app.account.forms import AccountExportForm
+from app.account.models import Account, Newsletter, OutboxEmail
 
 
 @admin.register(Account)
@@ -17,3 +23,73 @@ class AccountAdmin(admin.ModelAdmin):
         "email",
     )
     search_fields = ("username", "email")
+    actions = ("export_accounts",)
+
+    @admin.action(description="Export selected accounts")
+    def export_accounts(
+        self,
+        request: HttpRequest,
+        queryset: QuerySet,
+    ) -> StreamingHttpResponse | TemplateResponse:
+        """Stream the selected accounts as CSV or JSON Lines.
+
+        The first call renders a form to choose the columns and the format,
+        submitting it streams the export.
+
+        Args:
+            request (HttpRequest): Request object.
+            queryset (QuerySet): Selected accounts.
+
+        Returns:
+            Streamed export or the export form.
+        """
+        form = AccountExportForm(
+            request.POST if "apply" in request.POST else None,
+        )
+        if form.is_valid():
+            file_format = form.cleaned_data["file_format"]
+            response = StreamingHttpResponse(
+                export_rows(
+                    queryset,
+                    tuple(form.cleaned_data["columns"]),
+                    file_format,
+                ),
+                content_type=CONTENT_TYPES[file_format],
+            )
+            response["Content-Disposition"] = (
+                f'attachment; filename="accounts.{file_format}"'
+            )
+            return response
+        return TemplateResponse(
+            request,
+            "admin/account/export.html",
+            {
+                **self.admin_site.each_context(request),
+                "title": "Export accounts",
+                "opts": self.model._meta,
+                "form": form,
+                "selected": request.POST.getlist(
+                    helpers.ACTION_CHECKBOX_NAME,
+                ),
+                "select_across": request.POST.get("select_across", "0"),
+                "action_checkbox_name": helpers.ACTION_CHECKBOX_NAME,
+            },
+        )
+
+
+@admin.register(Newsletter)
+class NewsletterAdmin(admin.ModelAdmin):
+    """Newsletters are sent by `manage.py send_newsletter`."""
+
+    list_display = ("subject", "created_at", "started_at", "fanned_out_at")
+    readonly_fields = ("started_at", "fanned_out_at", "last_enqueued_pk")
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """Outbox emails are sent by the `dispatch_email_outbox` task."""
+
+    list_display = ("kind", "account", "created_at", "attempts", "sent_at")
+    list_filter = ("kind",)
+    raw_id_fields = ("account",)
+    readonly_fields = ("claimed_at", "claimed_by", "attempts", "sent_at")
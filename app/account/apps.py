@@ -9,3 +9,27 @@ class AccountConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app.account'
     label = 'app_account'
+
+    def ready(self) -> None:
+        """Replace the per-login `last_login` UPDATE with a buffered one."""
+        from django.contrib.auth.models import update_last_login
+        from django.contrib.auth.signals import user_logged_in
+        from django.core.signals import request_finished
+
+        from app.account.last_login import (
+            last_login_recorder,
+            record_last_login,
+        )
+
+        user_logged_in.disconnect(
+            update_last_login,
+            dispatch_uid="update_last_login",
+        )
+        user_logged_in.connect(
+            record_last_login,
+            dispatch_uid="record_last_login",
+        )
+        request_finished.connect(
+            last_login_recorder.flush_if_due,
+            dispatch_uid="flush_last_logins",
+        )
@@ -1,9 +1,47 @@
 # -*- coding: UTF-8 -*-
 """This module adds the custom authentication backend."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from threading import Lock
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password
 from django.http import HttpRequest
 
+from app.services.cache_functions import (
+    acache_account,
+    aget_account_cache_version,
+    aget_cached_account,
+    cache_account,
+    get_account_cache_version,
+    get_cached_account,
+)
+
+_hashing_executor = None
+_hashing_executor_lock = Lock()
+
+
+def get_hashing_executor() -> ThreadPoolExecutor:
+    """Return the bounded thread pool used for password hashing.
+
+    The pool size is taken from `PASSWORD_HASHING_WORKERS`, so a burst
+    of logins never runs more hashes at once than the setting allows.
+
+    Returns:
+        Shared thread pool executor.
+    """
+    global _hashing_executor  # noqa: WPS420
+    with _hashing_executor_lock:
+        if _hashing_executor is None:
+            _hashing_executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS,
+                thread_name_prefix="password-hashing",
+            )
+    return _hashing_executor
+
 
 class EmailAuthBackend(ModelBackend):
     """Authenticate against email address."""
@@ -23,15 +61,18 @@ class EmailAuthBackend(ModelBackend):
             username (str): it's actually an email because django uses
                 username by default.
             password (str): password hash.
-            **kwargs (dict): some extra keyword arguments.
+            **kwargs (dict): some extra keyword arguments, the email
+                may be passed as `email` instead of `username`.
 
         Returns:
             User if it exists and the correct password is provided,
             None otherwise.
         """
         user_model = get_user_model()
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
         try:
-            user = user_model.objects.get(email=username)
+            user = user_model.objects.filter_by_email(username).get()
         except user_model.DoesNotExist:
             return None
         else:
@@ -39,17 +80,110 @@ class EmailAuthBackend(ModelBackend):
                 return user
         return None
 
-    def get_user(self, email: str):
-        """User extraction method.
+    async def aauthenticate(
+            self,
+            request: HttpRequest,
+            username: str = None,
+            password: str = None,
+            **kwargs,
+    ):
+        """Async version of `authenticate()`.
+
+        The account is fetched with the async ORM and the password is
+        verified in the hashing executor, so the event loop isn't blocked.
+        A hash with outdated parameters is upgraded in place. Like
+        `ModelBackend.authenticate()`, an unknown email still costs one
+        hash, so the response time doesn't reveal registered emails, and
+        users who can't authenticate, e.g. inactive ones, are rejected.
 
         Args:
-            email (str): user email.
+            request (HttpRequest): object that contains metadata about
+                the request.
+            username (str): it's actually an email because django uses
+                username by default.
+            password (str): password hash.
+            **kwargs (dict): some extra keyword arguments, the email
+                may be passed as `email` instead of `username`.
 
         Returns:
-            User if it exists, None otherwise.
+            User if it exists and the correct password is provided,
+            None otherwise.
         """
         user_model = get_user_model()
-        try:
-            return user_model.objects.get(email=email)
-        except user_model.DoesNotExist:
+        if username is None:
+            username = kwargs.get(user_model.USERNAME_FIELD)
+        if username is None or password is None:
             return None
+        user = await user_model.objects.filter_by_email(username).afirst()
+        loop = asyncio.get_running_loop()
+        if user is None:
+            await loop.run_in_executor(
+                get_hashing_executor(),
+                partial(user_model().set_password, password),
+            )
+            return None
+        outdated = []
+        is_correct = await loop.run_in_executor(
+            get_hashing_executor(),
+            partial(
+                check_password,
+                password,
+                user.password,
+                setter=outdated.append,
+            ),
+        )
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if outdated:
+            await loop.run_in_executor(
+                get_hashing_executor(),
+                partial(user.set_password, password),
+            )
+            await user.asave(update_fields=["password"])
+        return user
+
+    def get_user(self, user_id: int):
+        """User extraction method.
+
+        The session stores the primary key, so the account is looked up
+        by pk. A cached copy is used when it is available, that way most
+        authenticated requests don't query the database. The cache
+        version is read before the database, so an account changed while
+        it is fetched isn't cached under the new version.
+
+        Args:
+            user_id (int): user primary key.
+
+        Returns:
+            User if it exists, None otherwise.
+        """
+        version = get_account_cache_version(user_id)
+        user = get_cached_account(user_id, version)
+        if user is None:
+            user_model = get_user_model()
+            try:
+                user = user_model.objects.get(pk=user_id)
+            except user_model.DoesNotExist:
+                return None
+            cache_account(user, version)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id: int):
+        """Async version of `get_user()`.
+
+        Args:
+            user_id (int): user primary key.
+
+        Returns:
+            User if it exists, None otherwise.
+        """
+        version = await aget_account_cache_version(user_id)
+        user = await aget_cached_account(user_id, version)
+        if user is None:
+            user_model = get_user_model()
+            try:
+                user = await user_model.objects.aget(pk=user_id)
+            except user_model.DoesNotExist:
+                return None
+            await acache_account(user, version)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,247 @@
+# -*- coding: UTF-8 -*-
+"""This module queues Celery tasks with an in-process fallback.
+
+The account views and tasks queue work with `dispatch_task()`. With
+`TASK_DISPATCH_MODE = "broker"` the task is published to the broker
+over a pooled connection, connected once with a `TASK_DISPATCH_TIMEOUT`
+seconds timeout and without retries. If the broker is unreachable, the
+task runs on a
+bounded in-process thread pool instead and the broker is skipped for
+`TASK_DISPATCH_RETRY_SECONDS`, so an outage costs one timeout instead of
+one per request. With `"thread"` every task runs on the pool, for single
+node deployments without Redis.
+
+The pool runs `TASK_DISPATCH_WORKERS` tasks at once and holds at most
+`TASK_DISPATCH_QUEUE_SIZE` waiting ones, tasks beyond that are dropped
+with an error and `dispatch_task()` returns False. Outbox emails of a
+dropped dispatch stay pending and go out with the next one. Bulk jobs
+raise `TaskDispatchError` instead, their work stays pending for the next
+run: unsent newsletter chunks for `send_newsletter --resume`, accounts
+not reminded for the next daily reminder run.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Any, Optional
+from weakref import WeakKeyDictionary
+
+from celery import Celery, Task
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+from kombu.connection import ConnectionPool
+from kombu.exceptions import LimitExceeded, OperationalError
+
+logger = logging.getLogger(__name__)
+
+_dispatcher = None
+_dispatcher_lock = Lock()
+
+
+class TaskDispatchError(Exception):
+    """Task was neither published nor queued in process."""
+
+
+class TaskDispatcher:
+    """Publish tasks to the broker or run them on a thread pool."""
+
+    def __init__(
+        self,
+        mode: str,
+        timeout: float,
+        retry_seconds: float,
+        workers: int,
+        queue_size: int,
+    ):
+        """Create the dispatcher.
+
+        Args:
+            mode (str): `broker` or `thread`.
+            timeout (float): Seconds to wait for the broker connection.
+            retry_seconds (float): Seconds to skip the broker after it
+                was unreachable.
+            workers (int): Number of pool threads.
+            queue_size (int): Number of tasks waiting for a thread.
+
+        Raises:
+            ValueError: If the mode is unknown.
+        """
+        if mode not in {"broker", "thread"}:
+            raise ValueError(f"Unknown task dispatch mode: {mode}")
+        self.mode = mode
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="task-dispatch",
+        )
+        self._slots = BoundedSemaphore(workers + queue_size)
+        self._broker_down_until = 0.0
+        self._pools: WeakKeyDictionary = WeakKeyDictionary()
+        self._pools_lock = Lock()
+
+    def dispatch(self, task: Task, *args: Any) -> bool:
+        """Queue the task on the broker or the pool.
+
+        Args:
+            task (Task): Celery task.
+            *args (Any): Task arguments.
+
+        Returns:
+            Whether the task was queued, False if the pool is full.
+        """
+        if self.mode == "broker" and self.publish(task, args):
+            return True
+        return self.submit(task, args)
+
+    def get_pool(self, app: Celery) -> ConnectionPool:
+        """Return the broker connection pool of the app.
+
+        Unlike the app's own pool, connections time out after `timeout`
+        seconds instead of `broker_connection_timeout`.
+
+        Args:
+            app (Celery): Application of the published tasks.
+
+        Returns:
+            Connection pool limited to `broker_pool_limit` connections.
+        """
+        with self._pools_lock:
+            pool = self._pools.get(app)
+            if pool is None:
+                pool = app.connection_for_write(
+                    connect_timeout=self.timeout,
+                ).Pool(limit=app.conf.broker_pool_limit)
+                self._pools[app] = pool
+        return pool
+
+    def publish(self, task: Task, args: tuple) -> bool:
+        """Publish the task to the broker.
+
+        Args:
+            task (Task): Celery task.
+            args (tuple): Task arguments.
+
+        Returns:
+            Whether the task was published.
+        """
+        if time.monotonic() < self._broker_down_until:
+            return False
+        pool = self.get_pool(task.app)
+        errors = (
+            OperationalError,
+            LimitExceeded,
+            *pool.connection.connection_errors,
+        )
+        try:
+            with pool.acquire(block=True, timeout=self.timeout) as connection:
+                connection.ensure_connection(max_retries=0)
+                task.apply_async(args, connection=connection, retry=False)
+        except errors:
+            self._broker_down_until = time.monotonic() + self.retry_seconds
+            logger.warning(
+                "Broker unreachable, running %s in process",
+                task.name,
+                exc_info=True,
+            )
+            return False
+        return True
+
+    def submit(self, task: Task, args: tuple) -> bool:
+        """Run the task on the pool.
+
+        Args:
+            task (Task): Celery task.
+            args (tuple): Task arguments.
+
+        Returns:
+            Whether the task was queued, False if the pool is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            logger.error("Task dispatch pool is full, dropped %s", task.name)
+            return False
+        self.executor.submit(self._run, task, args)
+        return True
+
+    def _run(self, task: Task, args: tuple) -> None:
+        """Run the task and release its pool slot.
+
+        Args:
+            task (Task): Celery task.
+            args (tuple): Task arguments.
+        """
+        try:
+            result = task.apply(args)
+            if result.failed():
+                logger.error(
+                    "Task %s failed in process\n%s",
+                    task.name,
+                    result.traceback,
+                )
+        finally:
+            connections.close_all()
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        """Stop the pool once the queued tasks are done.
+
+        Broker connections are closed.
+        """
+        self.executor.shutdown(wait=False)
+        with self._pools_lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+        for pool in pools:
+            pool.force_close_all()
+
+
+def get_task_dispatcher() -> TaskDispatcher:
+    """Return the dispatcher configured by the `TASK_DISPATCH_*` settings.
+
+    Returns:
+        Shared task dispatcher.
+    """
+    global _dispatcher  # noqa: WPS420
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = TaskDispatcher(
+                mode=settings.TASK_DISPATCH_MODE,
+                timeout=settings.TASK_DISPATCH_TIMEOUT,
+                retry_seconds=settings.TASK_DISPATCH_RETRY_SECONDS,
+                workers=settings.TASK_DISPATCH_WORKERS,
+                queue_size=settings.TASK_DISPATCH_QUEUE_SIZE,
+            )
+    return _dispatcher
+
+
+def dispatch_task(task: Task, *args: Any) -> bool:
+    """Queue a task on the broker, or in process if it is unreachable.
+
+    Args:
+        task (Task): Celery task.
+        *args (Any): Task arguments.
+
+    Returns:
+        Whether the task was queued.
+    """
+    return get_task_dispatcher().dispatch(task, *args)
+
+
+@receiver(setting_changed)
+def reset_task_dispatcher(setting: str, **kwargs) -> None:
+    """Drop the dispatcher when its settings change.
+
+    Args:
+        setting (str): Changed setting name.
+        **kwargs (dict): Signal arguments.
+    """
+    global _dispatcher  # noqa: WPS420
+    if not setting.startswith("TASK_DISPATCH_"):
+        return
+    with _dispatcher_lock:
+        dispatcher: Optional[TaskDispatcher] = _dispatcher
+        _dispatcher = None
+    if dispatcher is not None:
+        dispatcher.shutdown()
@@ -0,0 +1,373 @@
+# -*- coding: UTF-8 -*-
+"""This module adds an SMTP email backend with an asyncio core.
+
+Django's SMTP backend sends messages one after another over a single
+blocking connection. This backend spreads the messages of one
+`send_messages()` call over up to `EMAIL_CONCURRENCY` SMTP connections
+driven by one event loop, and pipelines the commands of every message
+(RFC 2920) when the server supports it.
+
+It keeps the `send_mail()`/`send_messages()` API and reads the usual
+`EMAIL_HOST`, `EMAIL_PORT`, `EMAIL_USE_TLS`, ... settings. Enable it
+with `EMAIL_BACKEND = "app.account.email_backend.EmailBackend"`.
+
+Connections live for one `send_messages()` call, `open()` and `close()`
+are no-ops. Sync callers must not run inside an event loop, async code
+awaits `asend_messages()` instead.
+"""
+import asyncio
+import base64
+import re
+import ssl
+from collections import deque
+from email.utils import parseaddr
+from smtplib import (
+    SMTPDataError,
+    SMTPRecipientsRefused,
+    SMTPResponseException,
+    SMTPSenderRefused,
+    SMTPServerDisconnected,
+)
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.core.mail.backends import smtp
+from django.core.mail.message import sanitize_address
+from django.core.mail.utils import DNS_NAME
+
+LINE_END_PATTERN = re.compile(rb"\r\n|\n|\r(?!\n)")
+PERIOD_PATTERN = re.compile(rb"(?m)^\.")
+
+
+class SMTPClient:
+    """Minimal SMTP client over asyncio streams."""
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        timeout: Optional[float],
+    ):
+        """Create the client over an open connection.
+
+        Args:
+            reader (asyncio.StreamReader): Connection reader.
+            writer (asyncio.StreamWriter): Connection writer.
+            timeout (float | None): Seconds to wait for a reply.
+        """
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.extensions: set[str] = set()
+
+    @classmethod
+    async def connect(cls, backend: "EmailBackend") -> "SMTPClient":
+        """Open a connection and greet, secure and log in to the server.
+
+        The connection is closed if any step of the handshake fails.
+
+        Args:
+            backend (EmailBackend): Backend holding the SMTP settings.
+
+        Returns:
+            Ready client.
+
+        Raises:
+            SMTPResponseException: If the server refuses the connection.
+        """
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                backend.host,
+                backend.port,
+                ssl=backend.ssl_context if backend.use_ssl else None,
+            ),
+            backend.timeout,
+        )
+        client = cls(reader, writer, backend.timeout)
+        try:
+            await client.handshake(backend)
+        except Exception:  # noqa: B902
+            client.writer.close()
+            raise
+        return client
+
+    async def handshake(self, backend: "EmailBackend") -> None:
+        """Read the greeting, then secure and log in to the server.
+
+        Args:
+            backend (EmailBackend): Backend holding the SMTP settings.
+
+        Raises:
+            SMTPResponseException: If the server refuses the connection.
+        """
+        code, reply = await self.read_reply()
+        if code != 220:
+            raise SMTPResponseException(code, reply)
+        await self.hello()
+        if backend.use_tls and not backend.use_ssl:
+            await self.check("STARTTLS", 220)
+            await self.writer.start_tls(
+                backend.ssl_context, server_hostname=backend.host,
+            )
+            await self.hello()
+        if backend.username and backend.password:
+            credentials = base64.b64encode(
+                f"\0{backend.username}\0{backend.password}".encode(),
+            ).decode()
+            await self.check(f"AUTH PLAIN {credentials}", 235)
+
+    async def read_reply(self) -> tuple[int, bytes]:
+        """Read a possibly multiline reply.
+
+        Returns:
+            Reply code and text.
+
+        Raises:
+            SMTPServerDisconnected: If the connection is closed.
+        """
+        lines = []
+        while True:
+            line = await asyncio.wait_for(
+                self.reader.readline(), self.timeout,
+            )
+            if not line:
+                raise SMTPServerDisconnected("Connection unexpectedly closed")
+            lines.append(line[4:].strip())
+            if line[3:4] != b"-":
+                return int(line[:3]), b"\n".join(lines)
+
+    async def command(self, line: str) -> tuple[int, bytes]:
+        """Send a command and read its reply.
+
+        Args:
+            line (str): Command line without the line ending.
+
+        Returns:
+            Reply code and text.
+        """
+        self.writer.write(f"{line}\r\n".encode())
+        return await self.read_reply()
+
+    async def check(self, line: str, expected: int) -> bytes:
+        """Send a command and require the expected reply code.
+
+        Args:
+            line (str): Command line without the line ending.
+            expected (int): Expected reply code.
+
+        Returns:
+            Reply text.
+
+        Raises:
+            SMTPResponseException: If the server replies another code.
+        """
+        code, reply = await self.command(line)
+        if code != expected:
+            raise SMTPResponseException(code, reply)
+        return reply
+
+    async def hello(self) -> None:
+        """Greet the server with EHLO, or HELO if EHLO is refused."""
+        code, reply = await self.command(f"EHLO {DNS_NAME.get_fqdn()}")
+        if code != 250:
+            await self.check(f"HELO {DNS_NAME.get_fqdn()}", 250)
+            self.extensions = set()
+            return
+        self.extensions = {
+            line.split()[0].decode().upper()
+            for line in reply.splitlines()[1:]
+            if line.strip()
+        }
+
+    async def send(
+        self,
+        from_email: str,
+        recipients: list[str],
+        data: bytes,
+    ) -> None:
+        """Send one message.
+
+        With PIPELINING, MAIL, RCPT and DATA are written at once and
+        their replies are read afterwards.
+
+        Args:
+            from_email (str): Envelope sender.
+            recipients (list[str]): Envelope recipients.
+            data (bytes): Message with CRLF line endings.
+
+        Raises:
+            SMTPSenderRefused: If the sender is refused.
+            SMTPRecipientsRefused: If all recipients are refused.
+            SMTPDataError: If the message is refused.
+        """
+        commands = [
+            f"MAIL FROM:<{parseaddr(from_email)[1]}>",
+            *(f"RCPT TO:<{parseaddr(address)[1]}>" for address in recipients),
+            "DATA",
+        ]
+        if "PIPELINING" in self.extensions:
+            self.writer.write(
+                "".join(f"{line}\r\n" for line in commands).encode(),
+            )
+            replies = [await self.read_reply() for _ in commands]
+        else:
+            replies = []
+            for line in commands:
+                replies.append(await self.command(line))
+                if line.startswith("MAIL") and replies[-1][0] != 250:
+                    break
+        code, reply = replies[0]
+        if code != 250:
+            await self.reset(replies)
+            raise SMTPSenderRefused(code, reply, from_email)
+        refused = {
+            address: replies[index]
+            for index, address in enumerate(recipients, start=1)
+            if index < len(replies) and replies[index][0] not in {250, 251}
+        }
+        if len(refused) == len(recipients):
+            await self.reset(replies)
+            raise SMTPRecipientsRefused(refused)
+        code, reply = replies[-1]
+        if code != 354:
+            await self.reset(replies)
+            raise SMTPDataError(code, reply)
+        data = PERIOD_PATTERN.sub(b"..", LINE_END_PATTERN.sub(b"\r\n", data))
+        if not data.endswith(b"\r\n"):
+            data += b"\r\n"
+        self.writer.write(data + b".\r\n")
+        code, reply = await self.read_reply()
+        if code != 250:
+            raise SMTPDataError(code, reply)
+
+    async def reset(self, replies: list[tuple[int, bytes]]) -> None:
+        """Abort the current message.
+
+        Args:
+            replies (list[tuple[int, bytes]]): Replies read so far, a
+                pipelined DATA accepted with 354 is ended first.
+        """
+        if replies and replies[-1][0] == 354:
+            self.writer.write(b".\r\n")
+            await self.read_reply()
+        await self.command("RSET")
+
+    async def quit(self) -> None:
+        """Say goodbye and close the connection."""
+        try:
+            await self.command("QUIT")
+        except (OSError, asyncio.TimeoutError):
+            pass
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+
+class EmailBackend(smtp.EmailBackend):
+    """SMTP backend sending over concurrent connections."""
+
+    def __init__(self, concurrency: Optional[int] = None, **kwargs):
+        """Create the backend.
+
+        Args:
+            concurrency (int | None): Maximum number of SMTP connections,
+                `EMAIL_CONCURRENCY` by default.
+            **kwargs (dict): Arguments of the Django SMTP backend.
+        """
+        super().__init__(**kwargs)
+        self.concurrency = concurrency or settings.EMAIL_CONCURRENCY
+
+    def open(self) -> None:
+        """Do nothing, connections are opened per `send_messages()`."""
+
+    def close(self) -> None:
+        """Do nothing, connections are closed per `send_messages()`."""
+
+    def send_messages(self, email_messages: Iterable[EmailMessage]) -> int:
+        """Send the messages over concurrent connections.
+
+        Args:
+            email_messages (Iterable[EmailMessage]): Messages to send.
+
+        Returns:
+            Number of sent messages.
+        """
+        return asyncio.run(self.asend_messages(email_messages))
+
+    async def asend_messages(
+        self,
+        email_messages: Iterable[EmailMessage],
+    ) -> int:
+        """Send the messages over concurrent connections.
+
+        Every connection takes the next message from a shared queue, so
+        a slow message doesn't hold up the others.
+
+        Args:
+            email_messages (Iterable[EmailMessage]): Messages to send.
+
+        Returns:
+            Number of sent messages.
+        """
+        queue = deque(
+            message for message in email_messages if message.recipients()
+        )
+        if not queue:
+            return 0
+        sent = await asyncio.gather(*(
+            self._send_from_queue(queue)
+            for _ in range(min(self.concurrency, len(queue)))
+        ))
+        return sum(sent)
+
+    async def _send_from_queue(self, queue: deque) -> int:
+        """Send messages from the queue over one connection.
+
+        Args:
+            queue (deque): Messages left to send.
+
+        Returns:
+            Number of sent messages.
+
+        Raises:
+            OSError: If the connection fails, or a message is refused
+                (`SMTPException`), and `fail_silently` is off.
+        """
+        try:
+            client = await SMTPClient.connect(self)
+        except (OSError, asyncio.TimeoutError):
+            if self.fail_silently:
+                return 0
+            raise
+        sent = 0
+        try:
+            while queue:
+                message = queue.popleft()
+                encoding = message.encoding or settings.DEFAULT_CHARSET
+                try:
+                    await client.send(
+                        sanitize_address(message.from_email, encoding),
+                        [
+                            sanitize_address(address, encoding)
+                            for address in message.recipients()
+                        ],
+                        message.message().as_bytes(linesep="\r\n"),
+                    )
+                except (SMTPResponseException, SMTPRecipientsRefused):
+                    if not self.fail_silently:
+                        raise
+                    continue
+                except (OSError, asyncio.TimeoutError):
+                    # The connection is gone, other connections take the
+                    # message and the remaining ones.
+                    queue.appendleft(message)
+                    if self.fail_silently:
+                        return sent
+                    raise
+                sent += 1
+        finally:
+            await client.quit()
+        return sent
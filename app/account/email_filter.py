@@ -0,0 +1,152 @@
+# -*- coding: UTF-8 -*-
+"""This module adds an in-memory filter of registered emails.
+
+The login and password reset forms ask the filter before querying the
+database, so unknown addresses sprayed by bots are rejected without a
+query. The filter is built from `Account.email_canonical` on first use,
+rebuilt every `REGISTERED_EMAIL_FILTER_REBUILD_SECONDS` and updated when
+an account is saved.
+
+Every process has its own filter. Emails saved since the last rebuild
+are also marked in the cache, so accounts created by other processes
+are found as long as the cache is shared between them. Without a shared
+cache a new account would be rejected by the other processes, so the
+settings enable the filter only when `CACHE_URL` is set.
+"""
+import time
+from threading import Lock
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from app.account.managers import AccountManager
+from app.services.filter_functions import BloomFilter
+from app.services.metrics_functions import Counters
+
+RECENT_EMAIL_KEY = "registered-email:{email}"
+
+
+class RegisteredEmailFilter:
+    """Bloom filter of registered emails with periodic rebuilds."""
+
+    def __init__(self):
+        """Create the filter, it is built on first use."""
+        self._filter: Optional[BloomFilter] = None
+        self._built_at = 0.0
+        self._lock = Lock()
+        self._adds_lock = Lock()
+        self._added_while_building: Optional[list[str]] = None
+        self.stats = Counters("definite_misses", "possible_hits")
+
+    def rebuild(self) -> None:
+        """Build the filter from all account emails.
+
+        Emails added while the accounts are read are merged into the new
+        filter, so it doesn't lose accounts created in the meantime. Rows
+        written without `Account.save()` may lack the canonical email, the
+        email lookups can't find them either, so they are left out.
+        """
+        with self._adds_lock:
+            self._added_while_building = []
+        accounts = get_user_model().objects.exclude(
+            email_canonical__isnull=True,
+        )
+        bloom = BloomFilter(
+            capacity=accounts.count() * 2 + 1000,
+            error_rate=settings.REGISTERED_EMAIL_FILTER_ERROR_RATE,
+        )
+        bloom.update(
+            accounts.values_list("email_canonical", flat=True).iterator(
+                chunk_size=5000,
+            ),
+        )
+        with self._adds_lock:
+            bloom.update(self._added_while_building)
+            self._added_while_building = None
+            self._filter = bloom
+        self._built_at = time.monotonic()
+
+    def _get_filter(self) -> BloomFilter:
+        """Return the filter, building it when it is missing or outdated.
+
+        Returns:
+            Current Bloom filter.
+        """
+        if self._is_outdated():
+            with self._lock:
+                if self._is_outdated():
+                    self.rebuild()
+        return self._filter
+
+    def _is_outdated(self) -> bool:
+        """Check whether the filter has to be rebuilt.
+
+        Returns:
+            True if it is missing or older than the rebuild interval.
+        """
+        if self._filter is None:
+            return True
+        age = time.monotonic() - self._built_at
+        return age > settings.REGISTERED_EMAIL_FILTER_REBUILD_SECONDS
+
+    def add(self, email: str) -> None:
+        """Register the email in this process and in the shared cache.
+
+        Args:
+            email (str): Canonical email address.
+        """
+        with self._adds_lock:
+            if self._filter is not None:
+                self._filter.add(email)
+            if self._added_while_building is not None:
+                self._added_while_building.append(email)
+        cache.set(
+            RECENT_EMAIL_KEY.format(email=email),
+            True,
+            timeout=settings.REGISTERED_EMAIL_FILTER_REBUILD_SECONDS * 2,
+        )
+
+    def add_many(self, emails: list[str]) -> None:
+        """Register many emails with one cache round trip.
+
+        Args:
+            emails (list[str]): Canonical email addresses.
+        """
+        with self._adds_lock:
+            if self._filter is not None:
+                self._filter.update(emails)
+            if self._added_while_building is not None:
+                self._added_while_building.extend(emails)
+        cache.set_many(
+            {RECENT_EMAIL_KEY.format(email=email): True for email in emails},
+            timeout=settings.REGISTERED_EMAIL_FILTER_REBUILD_SECONDS * 2,
+        )
+
+    def might_contain(self, email: str) -> bool:
+        """Check whether the email may be registered.
+
+        Args:
+            email (str): Email address.
+
+        Returns:
+            False if the email is definitely not registered, True if it
+            may be and the database has to be asked.
+        """
+        if not settings.REGISTERED_EMAIL_FILTER_ENABLED or not email:
+            return True
+        email = AccountManager.canonicalize_email(email)
+        found = email in self._get_filter() or bool(
+            cache.get(RECENT_EMAIL_KEY.format(email=email)),
+        )
+        self.stats.increment("possible_hits" if found else "definite_misses")
+        return found
+
+    def reset(self) -> None:
+        """Drop the filter, it is rebuilt on the next lookup."""
+        with self._lock:
+            self._filter = None
+
+
+registered_emails = RegisteredEmailFilter()
@@ -3,7 +3,7 @@
 from typing import Optional
 
 from django import forms
-from django.contrib.auth import authenticate
+from django.conf import settings
 from django.contrib.auth.forms import (
     PasswordChangeForm,
     PasswordResetForm,
@@ -11,7 +11,35 @@ from django.contrib.auth.forms import (
     UserCreationForm,
 )
 
+from app.account.email_filter import registered_emails
+from app.account.export import (
+    DEFAULT_EXPORT_FIELDS,
+    EXPORT_FIELDS,
+    EXPORT_FORMATS,
+)
 from app.account.models import Account
+from app.account.throttling import login_throttle
+
+
+def validate_email_not_taken(email: str, instance: Account) -> str:
+    """Check that no other account uses the email in any letter case.
+
+    Args:
+        email (str): Entered email address.
+        instance (Account): Account being created or edited.
+
+    Returns:
+        The email if it is free.
+
+    Raises:
+        ValidationError: if another account has the same email.
+    """
+    accounts = Account.objects.filter_by_email(email)
+    if instance.pk:
+        accounts = accounts.exclude(pk=instance.pk)
+    if accounts.exists():
+        raise forms.ValidationError("Account with this Email already exists.")
+    return email
 
 
 class AccountLoginForm(forms.Form):
@@ -50,6 +78,7 @@ class AccountLoginForm(forms.Form):
             **kwargs (dict): Keyword arguments.
         """
         self.request = kwargs.pop("request", None)
+        self.user_cache = None
         super().__init__(*args, **kwargs)
 
         for field in self.fields:
@@ -66,37 +95,53 @@ class AccountLoginForm(forms.Form):
         )
 
     def get_user(self) -> Optional[Account]:
-        """Authenticate user object.
+        """Return the user authenticated by `clean()`.
 
         This method is not called until the form has been
-        successfully validated.
+        successfully validated, so the account found during validation
+        is reused instead of being looked up and hashed a second time.
 
         Returns:
-            Account: Account instance.
+            Account: Account instance or None if validation failed.
         """
-        email = self.cleaned_data.get("email")
-        password = self.cleaned_data.get("password")
-        user = authenticate(
-            request=self.request,
-            username=email,
-            password=password,
-            backend="app.account.backends.EmailAuthBackend",
-        )
-        return user
+        return self.user_cache
 
     def clean(self) -> None:
         """Perform validation that requires access to multiple form fields.
 
+        The account is fetched with a single query and the password is
+        verified once. The authenticated account is kept in `user_cache`
+        for `get_user()`.
+
+        Attempts over the login throttle limits are rejected before the
+        database is queried or the password is hashed. Emails missing
+        from the registered emails filter skip the query as well.
+
         Raises:
-            ValidationError: if user not found or password isn't correct.
+            ValidationError: if the attempt is throttled, user not found,
+                password isn't correct or the account is inactive.
         """
         email = self.cleaned_data.get("email")
         password = self.cleaned_data.get("password")
-        user = Account.objects.filter(email=email).first()
+        if not login_throttle.allow(self.request, email):
+            raise forms.ValidationError(
+                "Too many login attempts, try again later",
+                code="throttled",
+            )
+        if not registered_emails.might_contain(email):
+            raise forms.ValidationError("Email isn't registered")
+        user = Account.objects.filter_by_email(email).first()
         if not user:
             raise forms.ValidationError("Email isn't registered")
         if not user.check_password(password):
             raise forms.ValidationError("Email or password isn't correct")
+        if not user.is_active:
+            raise forms.ValidationError(
+                "This account is inactive",
+                code="inactive",
+            )
+        user.backend = settings.AUTHENTICATION_BACKENDS[0]
+        self.user_cache = user
 
 
 class AccountSignUpForm(UserCreationForm):
@@ -151,6 +196,17 @@ class AccountSignUpForm(UserCreationForm):
             },
         )
 
+    def clean_email(self) -> str:
+        """Validate that the email isn't registered in any letter case.
+
+        Returns:
+            The entered email.
+        """
+        return validate_email_not_taken(
+            self.cleaned_data.get("email"),
+            self.instance,
+        )
+
     def clean(self) -> None:
         """Perform validation that requires access to multiple form fields.
 
@@ -206,6 +262,17 @@ class AccountProfileUpdateForm(forms.ModelForm):
             },
         )
 
+    def clean_email(self) -> str:
+        """Validate that the email isn't used by another account.
+
+        Returns:
+            The entered email.
+        """
+        return validate_email_not_taken(
+            self.cleaned_data.get("email"),
+            self.instance,
+        )
+
 
 class AccountPasswordChangeForm(PasswordChangeForm):
     """Form to update a user's password."""
@@ -249,6 +316,10 @@ class AccountPasswordResetFrom(PasswordResetForm):
     def clean_email(self) -> str:
         """Validate that the email address is correct.
 
+        Emails missing from the registered emails filter are rejected
+        without querying the database. The found account is kept in
+        `account`, so the view doesn't look it up again.
+
         Returns:
             If the email string is correct then it is returned,
             otherwise a ValidationError raise.
@@ -257,9 +328,12 @@ class AccountPasswordResetFrom(PasswordResetForm):
             ValidationError: if the email address isn't registered.
         """
         email = self.cleaned_data.get("email")
-        user = Account.objects.filter(email=email).first()
+        if not registered_emails.might_contain(email):
+            raise forms.ValidationError("Email isn't registered")
+        user = Account.objects.filter_by_email(email).first()
         if not user:
             raise forms.ValidationError("Email isn't registered")
+        self.account = user
         return email
 
 
@@ -283,3 +357,19 @@ class AccountSetPasswordForm(SetPasswordForm):
             self.fields[field].widget.attrs.update(
                 {"class": "form-control mb-1", "placeholder": ""},
             )
+
+
+class AccountExportForm(forms.Form):
+    """Form to choose the columns and the format of an account export."""
+
+    columns = forms.MultipleChoiceField(
+        label="Columns",
+        choices=[(field, field) for field in EXPORT_FIELDS],
+        initial=DEFAULT_EXPORT_FIELDS,
+        widget=forms.CheckboxSelectMultiple,
+    )
+    file_format = forms.ChoiceField(
+        label="Format",
+        choices=[(name, name.upper()) for name in EXPORT_FORMATS],
+        initial="csv",
+    )
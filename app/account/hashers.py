@@ -0,0 +1,69 @@
+# -*- coding: UTF-8 -*-
+"""This module adds password hashers with host-calibrated cost.
+
+The cost parameters come from `settings.PASSWORD_HASHERS_CALIBRATION`,
+which is written by the `calibrate_hashers` management command. Stored
+hashes with other parameters are reported by `must_update()`, so Django
+rehashes them in place on the next successful login.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+
+SCRYPT_MAX_WORK_FACTOR = 2**20
+
+
+def get_calibrated_parameter(algorithm: str, name: str, default: int) -> int:
+    """Return a calibrated hasher parameter.
+
+    Args:
+        algorithm (str): Hasher algorithm name.
+        name (str): Parameter name.
+        default (int): Value used when the host isn't calibrated.
+
+    Returns:
+        Calibrated value or the default one.
+    """
+    calibration = settings.PASSWORD_HASHERS_CALIBRATION.get(algorithm, {})
+    return calibration.get(name, default)
+
+
+class CalibratedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 hasher using the calibrated number of iterations."""
+
+    @property
+    def iterations(self) -> int:
+        """Return the number of iterations for new hashes.
+
+        Returns:
+            Number of iterations.
+        """
+        return get_calibrated_parameter(
+            self.algorithm,
+            "iterations",
+            PBKDF2PasswordHasher.iterations,
+        )
+
+
+class CalibratedScryptPasswordHasher(ScryptPasswordHasher):
+    """Scrypt hasher using the calibrated work factor."""
+
+    # OpenSSL refuses more than 32 MiB by default, scrypt takes about
+    # 128 * r * N bytes, the limit leaves room for any work factor the
+    # calibration can pick.
+    maxmem = ScryptPasswordHasher.block_size * SCRYPT_MAX_WORK_FACTOR * 192
+
+    @property
+    def work_factor(self) -> int:
+        """Return the work factor (N) for new hashes.
+
+        Returns:
+            Work factor, a power of two.
+        """
+        return get_calibrated_parameter(
+            self.algorithm,
+            "work_factor",
+            ScryptPasswordHasher.work_factor,
+        )
@@ -0,0 +1,186 @@
+# -*- coding: UTF-8 -*-
+"""This module buffers `last_login` updates and writes them in bulk.
+
+Django's `update_last_login` receiver issues one UPDATE per login. The
+`LastLoginRecorder` keeps the timestamps in process memory instead and
+writes them with a single `bulk_update` when `LAST_LOGIN_FLUSH_SIZE`
+logins are pending or the oldest one is `LAST_LOGIN_FLUSH_SECONDS` old.
+The age is checked after every login and every finished request, and
+pending timestamps are also written when the process exits.
+
+Recorded timestamps are put into the cache too, so `get_last_login()`
+returns a fresh value in every process before the flush.
+
+Password reset tokens hash `last_login`, so the buffered timestamp of
+an account is written with `flush_account()` before a token is made,
+otherwise the later flush would invalidate the token.
+"""
+import atexit
+import logging
+import time
+from datetime import datetime
+from threading import Lock
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.utils import timezone
+
+
+LAST_LOGIN_KEY = "last-login:{pk}"
+
+logger = logging.getLogger(__name__)
+
+
+class LastLoginRecorder:
+    """Collect last login timestamps and flush them in bulk."""
+
+    def __init__(self):
+        """Create an empty buffer."""
+        self._pending: dict[int, datetime] = {}
+        self._oldest = None
+        self._lock = Lock()
+
+    def record(self, user) -> None:
+        """Record a login of the user.
+
+        Args:
+            user (Account): Logged in user.
+        """
+        now = timezone.now()
+        user.last_login = now
+        with self._lock:
+            self._pending[user.pk] = now
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+        cache.set(
+            LAST_LOGIN_KEY.format(pk=user.pk),
+            now,
+            timeout=settings.LAST_LOGIN_FLUSH_SECONDS * 2,
+        )
+        self.flush_if_due()
+
+    def get(self, pk: int) -> Optional[datetime]:
+        """Return the buffered last login of the account.
+
+        Args:
+            pk (int): Account primary key.
+
+        Returns:
+            Timestamp not written to the database yet, or None.
+        """
+        with self._lock:
+            last_login = self._pending.get(pk)
+        return last_login or cache.get(LAST_LOGIN_KEY.format(pk=pk))
+
+    def is_due(self) -> bool:
+        """Check whether the buffer has to be flushed.
+
+        Returns:
+            True if it is full or its oldest entry is too old.
+        """
+        with self._lock:
+            if self._oldest is None:
+                return False
+            full = len(self._pending) >= settings.LAST_LOGIN_FLUSH_SIZE
+            age = time.monotonic() - self._oldest
+        return full or age >= settings.LAST_LOGIN_FLUSH_SECONDS
+
+    def flush_if_due(self, **kwargs) -> None:
+        """Flush the buffer if it is due.
+
+        It is also connected to the `request_finished` signal, so a
+        database error is logged and the timestamps are kept for the next
+        flush instead of failing the request.
+
+        Args:
+            **kwargs (dict): Signal arguments.
+        """
+        if not self.is_due():
+            return
+        try:
+            self.flush()
+        except DatabaseError:
+            logger.exception("Failed to flush buffered last logins")
+
+    def flush_account(self, account) -> None:
+        """Write the buffered last login of one account right away.
+
+        The login may be buffered by another process, so the timestamp
+        shared through the cache is written too. The later bulk flush
+        writes the same value again.
+
+        Args:
+            account (Account): Account instance, its `last_login` is
+                updated as well.
+        """
+        last_login = self.get(account.pk)
+        if last_login is None:
+            return
+        if account.last_login and last_login <= account.last_login:
+            return
+        type(account).objects.filter(pk=account.pk).update(
+            last_login=last_login,
+        )
+        account.last_login = last_login
+
+    def flush(self) -> int:
+        """Write all pending timestamps with one bulk update.
+
+        Returns:
+            Number of updated accounts.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._oldest = None
+        if not pending:
+            return 0
+        account_model = get_user_model()
+        accounts = [
+            account_model(pk=pk, last_login=last_login)
+            for pk, last_login in pending.items()
+        ]
+        try:
+            account_model.objects.bulk_update(
+                accounts,
+                ["last_login"],
+                batch_size=settings.LAST_LOGIN_FLUSH_SIZE,
+            )
+        except DatabaseError:
+            with self._lock:
+                self._pending = {**pending, **self._pending}
+                self._oldest = self._oldest or time.monotonic()
+            raise
+        return len(pending)
+
+
+last_login_recorder = LastLoginRecorder()
+
+
+def record_last_login(sender, request, user, **kwargs) -> None:
+    """Record the login, the receiver of the `user_logged_in` signal.
+
+    Args:
+        sender (type): User model.
+        request (HttpRequest): Login request.
+        user (Account): Logged in user.
+        **kwargs (dict): Signal arguments.
+    """
+    last_login_recorder.record(user)
+
+
+def get_last_login(account) -> Optional[datetime]:
+    """Return the freshest known last login of the account.
+
+    Args:
+        account (Account): Account instance.
+
+    Returns:
+        Buffered timestamp if there is one, the stored value otherwise.
+    """
+    return last_login_recorder.get(account.pk) or account.last_login
+
+
+atexit.register(last_login_recorder.flush)
@@ -0,0 +1,210 @@
+# -*- coding: UTF-8 -*-
+"""Calibrate password hasher cost for the current host."""
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+from django.core.management.base import BaseCommand, CommandParser
+
+from app.account.hashers import (
+    SCRYPT_MAX_WORK_FACTOR,
+    CalibratedPBKDF2PasswordHasher,
+    CalibratedScryptPasswordHasher,
+)
+
+CALIBRATION_PASSWORD = "calibration-password"
+PBKDF2_STEP = 1000
+
+
+def measure_hasher(hasher, samples: int, **params) -> float:
+    """Measure the p99 time of hashing a password.
+
+    Args:
+        hasher (BasePasswordHasher): Hasher instance.
+        samples (int): Number of hashes to measure.
+        **params (dict): Cost parameters passed to `encode()`.
+
+    Returns:
+        p99 hashing time in milliseconds.
+    """
+    timings = []
+    for _ in range(samples):
+        salt = hasher.salt()
+        started = time.perf_counter()
+        hasher.encode(CALIBRATION_PASSWORD, salt, **params)
+        timings.append((time.perf_counter() - started) * 1000)
+    if len(timings) < 2:
+        return timings[0]
+    return statistics.quantiles(timings, n=100)[98]
+
+
+class Command(BaseCommand):
+    """Benchmark PBKDF2 and scrypt and write the hasher configuration."""
+
+    help = (
+        "Benchmark PBKDF2 and scrypt on this host and write the cost "
+        "parameters meeting the target p99 hashing time."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments.
+
+        Args:
+            parser (CommandParser): Command argument parser.
+        """
+        parser.add_argument(
+            "--target-ms",
+            type=float,
+            default=250,
+            help="Target p99 time of one password hash in milliseconds.",
+        )
+        parser.add_argument(
+            "--samples",
+            type=int,
+            default=20,
+            help="Number of hashes measured for every candidate cost.",
+        )
+        parser.add_argument(
+            "--algorithm",
+            choices=(
+                CalibratedPBKDF2PasswordHasher.algorithm,
+                CalibratedScryptPasswordHasher.algorithm,
+            ),
+            default=CalibratedPBKDF2PasswordHasher.algorithm,
+            help="Algorithm used for new password hashes.",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            default=settings.PASSWORD_HASHERS_CONFIG,
+            help="Path of the written configuration file.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the configuration without writing it.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Run the calibration.
+
+        Args:
+            *args (tuple): Positional arguments.
+            **options (dict): Command options.
+        """
+        target_ms = options["target_ms"]
+        samples = options["samples"]
+        iterations, pbkdf2_ms = self.calibrate_pbkdf2(target_ms, samples)
+        work_factor, scrypt_ms = self.calibrate_scrypt(target_ms, samples)
+        config = {
+            "algorithm": options["algorithm"],
+            "target_ms": target_ms,
+            CalibratedPBKDF2PasswordHasher.algorithm: {
+                "iterations": iterations,
+                "p99_ms": round(pbkdf2_ms, 2),
+            },
+            CalibratedScryptPasswordHasher.algorithm: {
+                "work_factor": work_factor,
+                "p99_ms": round(scrypt_ms, 2),
+            },
+        }
+        rendered = json.dumps(config, indent=4)
+        if options["dry_run"]:
+            self.stdout.write(rendered)
+            return
+        output = options["output"]
+        output.write_text(f"{rendered}\n")
+        self.stdout.write(
+            self.style.SUCCESS(f"Configuration written to {output}"),
+        )
+
+    def calibrate_pbkdf2(self, target_ms: float, samples: int) -> tuple:
+        """Find the largest PBKDF2 iteration count meeting the target.
+
+        The count never goes below the Django default.
+
+        Args:
+            target_ms (float): Target p99 time in milliseconds.
+            samples (int): Number of hashes per measurement.
+
+        Returns:
+            Number of iterations and its p99 time in milliseconds.
+        """
+        hasher = PBKDF2PasswordHasher()
+        minimum = PBKDF2PasswordHasher.iterations
+        p99_ms = measure_hasher(hasher, samples, iterations=minimum)
+        iterations = max(
+            minimum,
+            int(minimum * target_ms / p99_ms) // PBKDF2_STEP * PBKDF2_STEP,
+        )
+        p99_ms = measure_hasher(hasher, samples, iterations=iterations)
+        while p99_ms > target_ms and iterations > minimum:
+            iterations = max(
+                minimum,
+                int(iterations * 0.9) // PBKDF2_STEP * PBKDF2_STEP,
+            )
+            p99_ms = measure_hasher(hasher, samples, iterations=iterations)
+        self.report(
+            hasher.algorithm, "iterations", iterations, p99_ms, target_ms,
+        )
+        return iterations, p99_ms
+
+    def calibrate_scrypt(self, target_ms: float, samples: int) -> tuple:
+        """Find the largest scrypt work factor meeting the target.
+
+        The work factor never goes below the Django default.
+
+        Args:
+            target_ms (float): Target p99 time in milliseconds.
+            samples (int): Number of hashes per measurement.
+
+        Returns:
+            Work factor and its p99 time in milliseconds.
+        """
+        hasher = CalibratedScryptPasswordHasher()
+        work_factor = ScryptPasswordHasher.work_factor
+        p99_ms = measure_hasher(hasher, samples, n=work_factor)
+        while work_factor < SCRYPT_MAX_WORK_FACTOR:
+            next_ms = measure_hasher(hasher, samples, n=work_factor * 2)
+            if next_ms > target_ms:
+                break
+            work_factor *= 2
+            p99_ms = next_ms
+        self.report(
+            hasher.algorithm, "work factor", work_factor, p99_ms, target_ms,
+        )
+        return work_factor, p99_ms
+
+    def report(
+        self,
+        algorithm: str,
+        parameter: str,
+        value: int,
+        p99_ms: float,
+        target_ms: float,
+    ) -> None:
+        """Print the calibration result of one algorithm.
+
+        Args:
+            algorithm (str): Hasher algorithm name.
+            parameter (str): Calibrated parameter name.
+            value (int): Calibrated value.
+            p99_ms (float): Measured p99 time in milliseconds.
+            target_ms (float): Target p99 time in milliseconds.
+        """
+        message = f"{algorithm}: {parameter}={value}, p99={p99_ms:.1f} ms"
+        if p99_ms > target_ms:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{message} exceeds the target even with the "
+                    "Django default cost",
+                ),
+            )
+        else:
+            self.stdout.write(message)
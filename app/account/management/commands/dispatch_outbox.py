@@ -0,0 +1,50 @@
+# -*- coding: UTF-8 -*-
+"""Send pending outbox emails, once or by polling the outbox table."""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from app.account.tasks import dispatch_email_outbox
+
+
+class Command(BaseCommand):
+    """Dispatch the email outbox without Celery."""
+
+    help = (
+        "Send pending outbox emails in batches. Polls the outbox until "
+        "interrupted unless --once is given."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments.
+
+        Args:
+            parser (CommandParser): Command argument parser.
+        """
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send what is pending and exit.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.EMAIL_OUTBOX_POLL_SECONDS,
+            help="Seconds between polls of an empty outbox.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Run the dispatcher.
+
+        Args:
+            *args (tuple): Positional arguments.
+            **options (dict): Command options.
+        """
+        while True:
+            dispatched = dispatch_email_outbox()
+            if dispatched:
+                self.stdout.write(f"{dispatched} outbox emails dispatched")
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,95 @@
+# -*- coding: UTF-8 -*-
+"""Export accounts to a CSV or JSON Lines file."""
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+
+from app.account.export import (
+    DEFAULT_EXPORT_FIELDS,
+    EXPORT_FIELDS,
+    EXPORT_FORMATS,
+    export_rows,
+)
+
+
+class Command(BaseCommand):
+    """Stream accounts to a file or stdout."""
+
+    help = (
+        "Stream accounts as CSV or JSON Lines to a file or stdout. Memory "
+        f"use is constant. Available columns: {', '.join(EXPORT_FIELDS)}."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments.
+
+        Args:
+            parser (CommandParser): Command argument parser.
+        """
+        parser.add_argument(
+            "--format",
+            choices=EXPORT_FORMATS,
+            default="csv",
+            help="Output format.",
+        )
+        parser.add_argument(
+            "--fields",
+            default=",".join(DEFAULT_EXPORT_FIELDS),
+            help="Comma-separated exported columns.",
+        )
+        parser.add_argument(
+            "--output",
+            type=Path,
+            help="Output file, stdout by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of rows fetched from the database at once.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Run the export.
+
+        Args:
+            *args (tuple): Positional arguments.
+            **options (dict): Command options.
+
+        Raises:
+            CommandError: If an unknown column is requested.
+        """
+        fields = tuple(
+            field.strip()
+            for field in options["fields"].split(",")
+            if field.strip()
+        )
+        unknown = set(fields) - set(EXPORT_FIELDS)
+        if unknown:
+            raise CommandError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        lines = export_rows(
+            get_user_model().objects.all(),
+            fields,
+            options["format"],
+            options["chunk_size"],
+        )
+        output = options["output"]
+        if output is None:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        exported = 0
+        with output.open("w", encoding="utf-8", newline="") as file:
+            for line in lines:
+                file.write(line)
+                exported += 1
+        if options["format"] == "csv":
+            exported -= 1
+        self.stdout.write(
+            self.style.SUCCESS(f"{exported} accounts written to {output}"),
+        )
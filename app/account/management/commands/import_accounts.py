@@ -0,0 +1,388 @@
+# -*- coding: UTF-8 -*-
+"""Import accounts in bulk from a CSV or JSON Lines file."""
+import csv
+import json
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+import django
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import BooleanField, Field
+
+from app.account.email_filter import registered_emails
+from app.account.managers import AccountManager
+from app.services.metrics_functions import Counters
+from app.services.models_functions import unique_slugify_many
+
+IMPORTED_FIELDS = (
+    "username",
+    "first_name",
+    "last_name",
+    "bio",
+    "birth_day",
+    "subscribe",
+)
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+BOOLEAN_TEXT = {"true": True, "yes": True, "false": False, "no": False}
+
+Row = tuple[int, dict[str, Any]]
+
+
+def read_rows(path: Path, file_format: str) -> Iterator[dict[str, Any]]:
+    """Stream the rows of the input file.
+
+    Args:
+        path (Path): Input file path.
+        file_format (str): Either `csv` or `jsonl`.
+
+    Yields:
+        One dictionary per account.
+    """
+    with path.open(encoding="utf-8", newline="") as input_file:
+        if file_format == "csv":
+            yield from csv.DictReader(input_file)
+            return
+        for line in input_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def batched(rows: Iterable[Row], size: int) -> Iterator[list[Row]]:
+    """Split the rows into lists of at most `size` rows.
+
+    Args:
+        rows (Iterable[Row]): Numbered rows.
+        size (int): Batch size.
+
+    Yields:
+        Batches of rows.
+    """
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def parse_field(field: Field, value: Any) -> Any:
+    """Convert an input value to the Python value of the model field.
+
+    Boolean text is accepted in any case, e.g. `true` or `FALSE`.
+
+    Args:
+        field (Field): Model field.
+        value (Any): Value read from the input file.
+
+    Returns:
+        Python value of the field.
+    """
+    if isinstance(field, BooleanField) and isinstance(value, str):
+        value = BOOLEAN_TEXT.get(value.strip().lower(), value)
+    return field.to_python(value)
+
+
+def setup_worker() -> None:
+    """Configure Django in a hashing worker process."""
+    if not apps.ready:
+        django.setup()
+
+
+def hash_passwords(passwords: list[Optional[str]]) -> list[str]:
+    """Hash the passwords with the default hasher.
+
+    Args:
+        passwords (list[str | None]): Raw passwords, None for accounts
+            without a usable password.
+
+    Returns:
+        Encoded passwords.
+    """
+    return [make_password(password) for password in passwords]
+
+
+class Command(BaseCommand):
+    """Create accounts from a CSV or JSON Lines file."""
+
+    help = (
+        "Stream accounts from a CSV or JSON Lines file, hash passwords in "
+        "a process pool and insert them in batches. An interrupted import "
+        "resumes from its checkpoint."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments.
+
+        Args:
+            parser (CommandParser): Command argument parser.
+        """
+        parser.add_argument(
+            "path",
+            type=Path,
+            help="Input file with an `email` column and optional "
+            f"`password`, {', '.join(map(repr, IMPORTED_FIELDS))}.",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="Input format, guessed from the file suffix by default.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows inserted in one transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of hashing processes, 0 hashes in this process.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=Path,
+            help="Checkpoint file, `<path>.checkpoint` by default.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint and import from the first row.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Run the import.
+
+        Hashing of the next batch runs in the pool while the current one
+        is inserted. The checkpoint is written after every committed batch
+        and removed when the import is complete.
+
+        Args:
+            *args (tuple): Positional arguments.
+            **options (dict): Command options.
+        """
+        path = options["path"]
+        file_format = options["format"] or (
+            "jsonl" if path.suffix in JSONL_SUFFIXES else "csv"
+        )
+        checkpoint = options["checkpoint"] or path.with_name(
+            f"{path.name}.checkpoint",
+        )
+        start = 0
+        if not options["restart"]:
+            start = self.read_checkpoint(checkpoint, path)
+        if start:
+            self.stdout.write(f"Resuming after row {start}")
+
+        self.stats = Counters("created", "skipped", "invalid")
+        self.started = time.perf_counter()
+        rows = islice(
+            enumerate(read_rows(path, file_format), start=1), start, None,
+        )
+        workers = options["workers"]
+        executor = None
+        if workers > 0:
+            executor = ProcessPoolExecutor(workers, initializer=setup_worker)
+        try:
+            pending = None
+            for batch in batched(rows, options["batch_size"]):
+                accounts = self.build_accounts(batch)
+                hashed = self.submit_hashing(executor, accounts, workers)
+                if pending is not None:
+                    self.insert_batch(*pending, checkpoint, path)
+                pending = (accounts, hashed, batch[-1][0])
+            if pending is not None:
+                self.insert_batch(*pending, checkpoint, path)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        checkpoint.unlink(missing_ok=True)
+        self.stdout.write(self.style.SUCCESS(self.progress("Imported")))
+
+    def read_checkpoint(self, checkpoint: Path, path: Path) -> int:
+        """Return the number of rows already imported from the file.
+
+        Args:
+            checkpoint (Path): Checkpoint file.
+            path (Path): Input file.
+
+        Returns:
+            Number of rows to skip.
+
+        Raises:
+            CommandError: If the checkpoint belongs to another file.
+        """
+        if not checkpoint.exists():
+            return 0
+        state = json.loads(checkpoint.read_text())
+        if state["input"] != str(path.resolve()):
+            raise CommandError(
+                f"{checkpoint} belongs to {state['input']}, "
+                "use --restart or another --checkpoint",
+            )
+        return state["rows"]
+
+    def write_checkpoint(self, checkpoint: Path, path: Path, rows: int):
+        """Atomically store the number of imported rows.
+
+        Args:
+            checkpoint (Path): Checkpoint file.
+            path (Path): Input file.
+            rows (int): Number of processed rows.
+        """
+        temporary = checkpoint.with_name(f"{checkpoint.name}.tmp")
+        temporary.write_text(
+            json.dumps({"input": str(path.resolve()), "rows": rows}),
+        )
+        os.replace(temporary, checkpoint)
+
+    def build_accounts(self, batch: list[Row]) -> list[dict[str, Any]]:
+        """Validate the rows and drop duplicated emails of the batch.
+
+        Args:
+            batch (list[Row]): Numbered rows.
+
+        Returns:
+            Account field values with the raw password.
+        """
+        account_model = get_user_model()
+        accounts = {}
+        for line, row in batch:
+            try:
+                email = AccountManager.normalize_email(
+                    (row.get("email") or "").strip(),
+                )
+                validate_email(email)
+                fields = {
+                    name: parse_field(
+                        account_model._meta.get_field(name), row[name],
+                    )
+                    for name in IMPORTED_FIELDS
+                    if row.get(name) not in {None, ""}
+                }
+            except ValidationError as error:
+                self.stats.increment("invalid")
+                self.stderr.write(f"Row {line}: {'; '.join(error.messages)}")
+                continue
+            canonical = AccountManager.canonicalize_email(email)
+            if canonical in accounts:
+                self.stats.increment("skipped")
+                continue
+            fields.setdefault("username", email.partition("@")[0])
+            accounts[canonical] = {
+                "email": email,
+                "email_canonical": canonical,
+                "password": row.get("password") or None,
+                **fields,
+            }
+        return list(accounts.values())
+
+    def submit_hashing(
+        self,
+        executor: Optional[ProcessPoolExecutor],
+        accounts: list[dict[str, Any]],
+        workers: int,
+    ) -> list[Future] | list[list[str]]:
+        """Start hashing the passwords of the batch.
+
+        Args:
+            executor (ProcessPoolExecutor | None): Hashing pool, None to
+                hash in this process.
+            accounts (list[dict[str, Any]]): Account field values.
+            workers (int): Number of hashing processes.
+
+        Returns:
+            Futures of password chunks, or the hashed chunk itself.
+        """
+        passwords = [account["password"] for account in accounts]
+        if executor is None:
+            return [hash_passwords(passwords)]
+        chunk_size = max(1, -(-len(passwords) // workers))
+        return [
+            executor.submit(
+                hash_passwords, passwords[index:index + chunk_size],
+            )
+            for index in range(0, len(passwords), chunk_size)
+        ]
+
+    def insert_batch(
+        self,
+        accounts: list[dict[str, Any]],
+        hashed: list[Future] | list[list[str]],
+        last_row: int,
+        checkpoint: Path,
+        path: Path,
+    ) -> None:
+        """Insert the accounts which don't exist yet and save progress.
+
+        Args:
+            accounts (list[dict[str, Any]]): Account field values.
+            hashed (list): Result of `submit_hashing()`.
+            last_row (int): Number of the last row of the batch.
+            checkpoint (Path): Checkpoint file.
+            path (Path): Input file.
+        """
+        passwords = [
+            password
+            for chunk in hashed
+            for password in (
+                chunk.result() if isinstance(chunk, Future) else chunk
+            )
+        ]
+        account_model = get_user_model()
+        with transaction.atomic():
+            existing = set(
+                account_model.objects.filter(
+                    email_canonical__in=[
+                        account["email_canonical"] for account in accounts
+                    ],
+                ).values_list("email_canonical", flat=True),
+            )
+            new_accounts = [
+                account_model(**{**account, "password": password})
+                for account, password in zip(accounts, passwords)
+                if account["email_canonical"] not in existing
+            ]
+            slugs = unique_slugify_many(
+                account_model,
+                [account.username for account in new_accounts],
+            )
+            for account, slug in zip(new_accounts, slugs):
+                account.slug = slug
+            account_model.objects.bulk_create(new_accounts)
+        registered_emails.add_many(
+            [account.email_canonical for account in new_accounts],
+        )
+        self.write_checkpoint(checkpoint, path, last_row)
+        self.stats.increment("created", len(new_accounts))
+        self.stats.increment("skipped", len(existing))
+        self.stdout.write(self.progress(f"Row {last_row}"))
+
+    def progress(self, prefix: str) -> str:
+        """Format the import counters and speed.
+
+        Args:
+            prefix (str): Message prefix.
+
+        Returns:
+            Progress message.
+        """
+        stats = self.stats.snapshot()
+        rows = sum(stats.values())
+        elapsed = time.perf_counter() - self.started
+        return (
+            f"{prefix}: {stats['created']} created, {stats['skipped']} "
+            f"skipped, {stats['invalid']} invalid, "
+            f"{rows / max(elapsed, 1e-9):.1f} rows/s"
+        )
@@ -0,0 +1,127 @@
+# -*- coding: UTF-8 -*-
+"""Start, resume or report a newsletter send."""
+from pathlib import Path
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+
+from app.account.dispatch import dispatch_task
+from app.account.models import Newsletter, NewsletterChunk
+from app.account.tasks import fan_out_newsletter
+
+
+class Command(BaseCommand):
+    """Fan out a newsletter to the subscribers through Celery."""
+
+    help = (
+        "Create a newsletter and queue it for all subscribers, resume an "
+        "interrupted send or print its throughput."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        """Add command arguments.
+
+        Args:
+            parser (CommandParser): Command argument parser.
+        """
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument(
+            "--body-file",
+            type=Path,
+            help="Text file with the body of a new newsletter.",
+        )
+        group.add_argument(
+            "--resume",
+            type=int,
+            metavar="ID",
+            help="Queue the unsent chunks and subscribers of a newsletter.",
+        )
+        group.add_argument(
+            "--report",
+            type=int,
+            metavar="ID",
+            help="Print the throughput of a newsletter.",
+        )
+        parser.add_argument(
+            "--subject",
+            help="Subject of a new newsletter.",
+        )
+        parser.add_argument(
+            "--requeue-sending",
+            action="store_true",
+            help="With --resume, also queue chunks whose worker crashed "
+            "while sending them. Their emails may be sent twice.",
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Run the command.
+
+        Args:
+            *args (tuple): Positional arguments.
+            **options (dict): Command options.
+
+        Raises:
+            CommandError: If the subject is missing, the newsletter
+                doesn't exist or its fan-out was dropped.
+        """
+        if options["body_file"]:
+            if not options["subject"]:
+                raise CommandError("--subject is required for a newsletter")
+            newsletter = Newsletter.objects.create(
+                subject=options["subject"],
+                body=options["body_file"].read_text(encoding="utf-8"),
+            )
+            self.queue(newsletter)
+            self.stdout.write(
+                self.style.SUCCESS(f"Newsletter {newsletter.pk} queued"),
+            )
+            return
+        pk = options["resume"] or options["report"]
+        try:
+            newsletter = Newsletter.objects.get(pk=pk)
+        except Newsletter.DoesNotExist as error:
+            raise CommandError(f"Newsletter {pk} doesn't exist") from error
+        if options["report"]:
+            self.report(newsletter)
+            return
+        if options["requeue_sending"]:
+            newsletter.chunks.filter(
+                status=NewsletterChunk.Status.SENDING,
+            ).update(status=NewsletterChunk.Status.PENDING)
+        self.queue(newsletter)
+        self.stdout.write(
+            self.style.SUCCESS(f"Newsletter {newsletter.pk} resumed"),
+        )
+
+    def queue(self, newsletter: Newsletter) -> None:
+        """Queue the fan-out of the newsletter.
+
+        Args:
+            newsletter (Newsletter): Sent newsletter.
+
+        Raises:
+            CommandError: If the fan-out was dropped.
+        """
+        if not dispatch_task(fan_out_newsletter, newsletter.pk):
+            raise CommandError(
+                f"Newsletter {newsletter.pk} wasn't queued, the task pool "
+                f"is full. Run --resume {newsletter.pk} later.",
+            )
+
+    def report(self, newsletter: Newsletter) -> None:
+        """Print the throughput of the newsletter.
+
+        Args:
+            newsletter (Newsletter): Newsletter instance.
+        """
+        throughput = newsletter.get_throughput()
+        self.stdout.write(
+            f"{newsletter}: {throughput['sent']} sent, "
+            f"{throughput['pending_chunks']} chunks pending, "
+            f"{throughput['emails_per_second']} emails/s",
+        )
+        for worker, rate in sorted(throughput["workers"].items()):
+            self.stdout.write(f"  {worker}: {rate} emails/s")
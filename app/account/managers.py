@@ -1,20 +1,116 @@
 # -*- coding: UTF-8 -*-
 """Define the custom manager class."""
+from collections.abc import Iterable
+from datetime import datetime
 from typing import Self
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import BaseUserManager
+from django.db.models import Q, QuerySet
 from django.utils.functional import lazy
 
+from app.services.cache_functions import invalidate_account_cache
+
 Account = lazy(get_user_model, object)()
 
 
-class AccountManager(BaseUserManager):
+class AccountQuerySet(QuerySet):
+    """Queries of accounts keeping the account cache up to date.
+
+    `save()` and `delete()` of the model invalidate the cached account,
+    bulk updates and deletes skip them, so they invalidate the accounts
+    here.
+    """
+
+    def update(self, **kwargs) -> int:
+        """Update the accounts and invalidate their cached copies.
+
+        The primary keys are read first, which costs one more query.
+
+        Args:
+            **kwargs (dict): Updated field values.
+
+        Returns:
+            Number of updated accounts.
+        """
+        pks = list(self.values_list("pk", flat=True))
+        updated = super().update(**kwargs)
+        for pk in pks:
+            invalidate_account_cache(pk, using=self.db)
+        return updated
+
+    def delete(self) -> tuple[int, dict[str, int]]:
+        """Delete the accounts and invalidate their cached copies.
+
+        The primary keys are read first, which costs one more query.
+
+        Returns:
+            Number of deleted objects and deletions per object type.
+        """
+        pks = list(self.values_list("pk", flat=True))
+        deleted = super().delete()
+        for pk in pks:
+            invalidate_account_cache(pk, using=self.db)
+        return deleted
+
+    def bulk_update(
+        self,
+        objs: Iterable[Account],
+        fields: Iterable[str],
+        batch_size: int = None,
+    ) -> int:
+        """Update the given accounts and invalidate their cached copies.
+
+        Args:
+            objs (Iterable[Account]): Updated accounts.
+            fields (Iterable[str]): Updated field names.
+            batch_size (int): Number of accounts per query.
+
+        Returns:
+            Number of updated accounts.
+        """
+        objs = list(objs)
+        # The keys are known, a plain queryset skips the read of `update()`
+        updated = QuerySet(self.model, using=self.db).bulk_update(
+            objs, fields, batch_size=batch_size,
+        )
+        for account in objs:
+            invalidate_account_cache(account.pk, using=self.db)
+        return updated
+
+
+class AccountManager(BaseUserManager.from_queryset(AccountQuerySet)):
     """The account model manager.
 
     The class provides email authentication functionality.
     """
 
+    @classmethod
+    def canonicalize_email(cls, email: str) -> str:
+        """Return the case-insensitive form of the email address.
+
+        Args:
+            email (str): The email address.
+
+        Returns:
+            Lowercased email address without surrounding whitespace.
+        """
+        return cls.normalize_email(email).strip().lower()
+
+    def filter_by_email(self, email: str) -> QuerySet:
+        """Filter accounts by email ignoring its case.
+
+        The lookup goes through the indexed `email_canonical` column.
+
+        Args:
+            email (str): The email address.
+
+        Returns:
+            QuerySet: Accounts with the given email.
+        """
+        return self.filter(email_canonical=self.canonicalize_email(email))
+
     def create_user(
         self,
         email: str,
@@ -64,3 +160,33 @@ class AccountManager(BaseUserManager):
         extra_fields.setdefault('is_staff', True)
         extra_fields.setdefault('is_superuser', True)
         return self.create_user(email=email, password=password, **extra_fields)
+
+
+class OutboxEmailQuerySet(QuerySet):
+    """Queries of the email outbox."""
+
+    def pending(self) -> Self:
+        """Filter emails waiting to be sent.
+
+        Emails that failed `EMAIL_OUTBOX_MAX_ATTEMPTS` times are left out.
+
+        Returns:
+            Unsent emails, oldest first.
+        """
+        return self.filter(
+            sent_at__isnull=True,
+            attempts__lt=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+        ).order_by("pk")
+
+    def claimable(self, stale_before: datetime) -> Self:
+        """Filter pending emails not claimed by a running dispatcher.
+
+        Args:
+            stale_before (datetime): Claims older than this are given up.
+
+        Returns:
+            Unclaimed or stale pending emails.
+        """
+        return self.pending().filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale_before),
+        )
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-17 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_account", "0004_alter_account_username"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="email_canonical",
+            field=models.EmailField(
+                editable=False,
+                max_length=255,
+                null=True,
+                unique=True,
+                verbose_name="Canonical email",
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# -*- coding: UTF-8 -*-
+"""Fill `Account.email_canonical` for existing accounts.
+
+Rows are updated in primary key ranges, every batch in its own short
+transaction, so large tables are never locked for the whole backfill.
+"""
+from django.db import migrations, transaction
+from django.db.models import Count, Max, Min
+from django.db.models.functions import Lower, Trim
+
+BATCH_SIZE = 1000
+
+
+def backfill_email_canonical(apps, schema_editor):
+    Account = apps.get_model("app_account", "Account")
+    db_alias = schema_editor.connection.alias
+    accounts = Account.objects.using(db_alias)
+
+    duplicates = list(
+        accounts.annotate(canonical=Lower(Trim("email")))
+        .values("canonical")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+        .values_list("canonical", flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Accounts differing only in email case must be merged before "
+            f"the migration: {', '.join(duplicates)}"
+        )
+
+    bounds = accounts.aggregate(low=Min("id"), high=Max("id"))
+    if bounds["low"] is None:
+        return
+    for start in range(bounds["low"], bounds["high"] + 1, BATCH_SIZE):
+        with transaction.atomic(using=db_alias):
+            accounts.filter(
+                id__gte=start,
+                id__lt=start + BATCH_SIZE,
+                email_canonical__isnull=True,
+            ).update(email_canonical=Lower(Trim("email")))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("app_account", "0005_account_email_canonical"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            backfill_email_canonical,
+            migrations.RunPython.noop,
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_account", "0006_backfill_account_email_canonical"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountSlugRedirect",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "old_slug",
+                    models.SlugField(unique=True, verbose_name="Old slug"),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slug_redirects",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Account",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Account slug redirect",
+                "verbose_name_plural": "Account slug redirects",
+            },
+        ),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 5.1.6 on 2026-10-17 10:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_account", "0007_accountslugredirect"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Newsletter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "subject",
+                    models.CharField(max_length=255, verbose_name="Subject"),
+                ),
+                ("body", models.TextField(verbose_name="Body")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Created at"
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Started at"
+                    ),
+                ),
+                (
+                    "fanned_out_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Fanned out at"
+                    ),
+                ),
+                (
+                    "last_enqueued_pk",
+                    models.BigIntegerField(
+                        default=0, verbose_name="Last enqueued account"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Newsletter",
+                "verbose_name_plural": "Newsletters",
+            },
+        ),
+        migrations.CreateModel(
+            name="NewsletterChunk",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "first_pk",
+                    models.BigIntegerField(verbose_name="First account"),
+                ),
+                (
+                    "last_pk",
+                    models.BigIntegerField(verbose_name="Last account"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("sending", "Sending"),
+                            ("sent", "Sent"),
+                        ],
+                        default="pending",
+                        max_length=16,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "sent_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Sent emails"
+                    ),
+                ),
+                (
+                    "elapsed_ms",
+                    models.FloatField(default=0, verbose_name="Elapsed ms"),
+                ),
+                (
+                    "worker",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Worker"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Finished at"
+                    ),
+                ),
+                (
+                    "newsletter",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chunks",
+                        to="app_account.newsletter",
+                        verbose_name="Newsletter",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Newsletter chunk",
+                "verbose_name_plural": "Newsletter chunks",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("newsletter", "first_pk"),
+                        name="unique_newsletter_chunk",
+                    )
+                ],
+            },
+        ),
+    ]
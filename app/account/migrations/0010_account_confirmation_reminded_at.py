@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-17 07:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("app_account", "0009_outboxemail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="confirmation_reminded_at",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                null=True,
+                verbose_name="Confirmation reminded at",
+            ),
+        ),
+    ]
@@ -1,13 +1,16 @@
 # -*- coding: UTF-8 -*-
 """Creating models for the `account` application."""
-from typing import Callable
+from typing import Any
 
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import FileExtensionValidator
-from django.db import models
-from django.shortcuts import reverse
+from django.db import IntegrityError, models, transaction
+from django.db.models import Max, Sum
 
-from app.account.managers import AccountManager
+from app.account.email_filter import registered_emails
+from app.account.managers import AccountManager, OutboxEmailQuerySet
+from app.account.slugs import forget_account_slug, get_account_url
+from app.services.cache_functions import invalidate_account_cache
 from app.services.models_functions import unique_slugify
 
 
@@ -18,6 +21,7 @@ class Account(AbstractUser):
     REQUIRED_FIELDS = []
 
     DEFAULT_LENGTH_FIELD = 255
+    SLUG_SAVE_ATTEMPTS = 3
 
     username = models.CharField(
         unique=False,
@@ -31,6 +35,13 @@ class Account(AbstractUser):
         null=False,
         blank=False,
     )
+    email_canonical = models.EmailField(
+        unique=True,
+        verbose_name="Canonical email",
+        max_length=DEFAULT_LENGTH_FIELD,
+        null=True,
+        editable=False,
+    )
 
     slug = models.SlugField(unique=True, verbose_name="Slug")
     avatar = models.ImageField(
@@ -59,6 +70,14 @@ class Account(AbstractUser):
         verbose_name="Confirm Email",
         default=False,
     )
+    confirmation_reminded_at = models.DateTimeField(
+        verbose_name="Confirmation reminded at",
+        blank=True,
+        null=True,
+        editable=False,
+    )
+
+    _loaded_slug = None
 
     class Meta:
         """The Class adds metadata options."""
@@ -75,21 +94,359 @@ class Account(AbstractUser):
         """
         return self.email
 
-    def get_absolute_url(self) -> Callable:
+    @classmethod
+    def from_db(cls, db, field_names, values) -> "Account":
+        """Create an instance loaded from the database.
+
+        The loaded slug is kept to detect slug changes in `save()`.
+
+        Args:
+            db (str): Database alias.
+            field_names (list[str]): Loaded field names.
+            values (list): Loaded field values.
+
+        Returns:
+            Account instance.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_slug = instance.__dict__.get("slug")
+        return instance
+
+    def get_absolute_url(self) -> str:
         """Calculate the canonical URL of an object.
 
         Returns:
-            Callable: URL of the object by self slug.
+            URL of the object by self slug.
         """
-        return reverse("account:profile_detail", args=(self.slug,))
+        return get_account_url("account:profile_detail", self.slug)
 
     def save(self, *args, **kwargs) -> None:
         """Save the account to the database and add unique slug to the user.
 
+        The lowercased email is stored in `email_canonical`, which is used
+        for all case-insensitive email lookups. The cached copy of the
+        account is invalidated once the save is committed and the email
+        is added to the registered emails filter. If the slug has changed,
+        the old one is redirected to the account and dropped from the slug
+        caches.
+
+        If a concurrent save takes the generated slug first, the unique
+        constraint fails and the account is saved again with a new slug,
+        at most `SLUG_SAVE_ATTEMPTS` times.
+
         Args:
             *args (tuple): Positional arguments.
             **kwargs (dict): Keyword arguments.
         """
-        if not self.slug:
+        generate_slug = not self.slug
+        if generate_slug:
             self.slug = unique_slugify(self, self.username)
-        super().save(*args, **kwargs)
+        self.email_canonical = AccountManager.canonicalize_email(self.email)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "email" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "email_canonical"}
+        if generate_slug:
+            self._save_with_generated_slug(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
+        invalidate_account_cache(self.pk, using=self._state.db)
+        if update_fields is None or "email" in update_fields:
+            registered_emails.add(self.email_canonical)
+        if update_fields is None or "slug" in update_fields:
+            self._redirect_old_slug()
+
+    def _redirect_old_slug(self) -> None:
+        """Redirect the previously loaded slug if it has changed."""
+        old_slug, self._loaded_slug = self._loaded_slug, self.slug
+        if not old_slug or old_slug == self.slug:
+            return
+        AccountSlugRedirect.objects.update_or_create(
+            old_slug=old_slug,
+            defaults={"account": self},
+        )
+        forget_account_slug(old_slug)
+
+    def _save_with_generated_slug(self, *args, **kwargs) -> None:
+        """Save the account, regenerating the slug if it was taken meanwhile.
+
+        Each attempt runs in a savepoint, so a failed insert doesn't break
+        the surrounding transaction.
+
+        Args:
+            *args (tuple): Positional arguments.
+            **kwargs (dict): Keyword arguments.
+
+        Raises:
+            IntegrityError: If the save fails for another reason than
+                a taken slug or all attempts fail.
+        """
+        for attempt in range(1, self.SLUG_SAVE_ATTEMPTS + 1):
+            try:
+                with transaction.atomic(using=kwargs.get("using")):
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                slug_taken = type(self).objects.filter(
+                    slug=self.slug,
+                ).exists()
+                if not slug_taken or attempt == self.SLUG_SAVE_ATTEMPTS:
+                    raise
+                self.slug = unique_slugify(self, self.username)
+            else:
+                return
+
+    def delete(self, *args, **kwargs) -> tuple[int, dict[str, int]]:
+        """Delete the account and drop it from the cache.
+
+        Args:
+            *args (tuple): Positional arguments.
+            **kwargs (dict): Keyword arguments.
+
+        Returns:
+            Number of deleted objects and deletions per object type.
+        """
+        pk = self.pk
+        deleted = super().delete(*args, **kwargs)
+        invalidate_account_cache(pk, using=self._state.db)
+        forget_account_slug(self.slug)
+        return deleted
+
+
+class AccountSlugRedirect(models.Model):
+    """Old slug of an account, redirected to its current profile."""
+
+    old_slug = models.SlugField(unique=True, verbose_name="Old slug")
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name="slug_redirects",
+        verbose_name="Account",
+    )
+
+    class Meta:
+        """The Class adds metadata options."""
+
+        verbose_name = "Account slug redirect"
+        verbose_name_plural = "Account slug redirects"
+        app_label = "app_account"
+
+    def __str__(self) -> str:
+        """Introduce the redirect via the old slug.
+
+        Returns:
+            String representation of the redirect.
+        """
+        return self.old_slug
+
+
+class Newsletter(models.Model):
+    """Newsletter sent to the subscribed accounts.
+
+    Subscribers are split into `NewsletterChunk` ranges of primary keys,
+    `last_enqueued_pk` is the fan-out checkpoint.
+    """
+
+    subject = models.CharField(max_length=255, verbose_name="Subject")
+    body = models.TextField(verbose_name="Body")
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Created at",
+    )
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Started at",
+    )
+    fanned_out_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Fanned out at",
+    )
+    last_enqueued_pk = models.BigIntegerField(
+        default=0,
+        verbose_name="Last enqueued account",
+    )
+
+    class Meta:
+        """The Class adds metadata options."""
+
+        verbose_name = "Newsletter"
+        verbose_name_plural = "Newsletters"
+        app_label = "app_account"
+
+    def __str__(self) -> str:
+        """Introduce the newsletter via its subject.
+
+        Returns:
+            String representation of the newsletter.
+        """
+        return self.subject
+
+    def get_throughput(self) -> dict[str, Any]:
+        """Report how fast the newsletter has been sent.
+
+        Returns:
+            Sent emails, emails per second since the start and emails
+            per second of busy time for every worker.
+        """
+        chunks = self.chunks.filter(status=NewsletterChunk.Status.SENT)
+        totals = chunks.aggregate(
+            sent=Sum("sent_count"),
+            finished_at=Max("finished_at"),
+        )
+        sent = totals["sent"] or 0
+        elapsed = 0.0
+        if self.started_at and totals["finished_at"]:
+            elapsed = (totals["finished_at"] - self.started_at).total_seconds()
+        workers = {
+            row["worker"]: round(
+                row["sent"] / max(row["busy_ms"] / 1000, 1e-3), 1,
+            )
+            for row in chunks.values("worker").annotate(
+                sent=Sum("sent_count"),
+                busy_ms=Sum("elapsed_ms"),
+            )
+        }
+        return {
+            "sent": sent,
+            "pending_chunks": self.chunks.exclude(
+                status=NewsletterChunk.Status.SENT,
+            ).count(),
+            "emails_per_second": round(sent / max(elapsed, 1e-3), 1),
+            "workers": workers,
+        }
+
+
+class NewsletterChunk(models.Model):
+    """Range of subscribers sent by one task over one connection."""
+
+    class Status(models.TextChoices):
+        """Sending state of the chunk."""
+
+        PENDING = "pending", "Pending"
+        SENDING = "sending", "Sending"
+        SENT = "sent", "Sent"
+
+    newsletter = models.ForeignKey(
+        Newsletter,
+        on_delete=models.CASCADE,
+        related_name="chunks",
+        verbose_name="Newsletter",
+    )
+    first_pk = models.BigIntegerField(verbose_name="First account")
+    last_pk = models.BigIntegerField(verbose_name="Last account")
+    status = models.CharField(
+        max_length=16,
+        choices=Status,
+        default=Status.PENDING,
+        verbose_name="Status",
+    )
+    sent_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Sent emails",
+    )
+    elapsed_ms = models.FloatField(default=0, verbose_name="Elapsed ms")
+    worker = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Worker",
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Finished at",
+    )
+
+    class Meta:
+        """The Class adds metadata options."""
+
+        verbose_name = "Newsletter chunk"
+        verbose_name_plural = "Newsletter chunks"
+        app_label = "app_account"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("newsletter", "first_pk"),
+                name="unique_newsletter_chunk",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """Introduce the chunk via its account range.
+
+        Returns:
+            String representation of the chunk.
+        """
+        return f"{self.newsletter_id}: {self.first_pk}-{self.last_pk}"
+
+
+class OutboxEmail(models.Model):
+    """Email written in the transaction of the change that triggers it.
+
+    Rows are sent in batches by `dispatch_email_outbox`, so requests
+    never wait for the broker or the mail server, and a rolled back
+    change never sends its email.
+    """
+
+    class Kind(models.TextChoices):
+        """Email template sent to the account."""
+
+        PASSWORD_RESET = "password_reset", "Password reset"
+        CONFIRMATION = "confirmation", "Email confirmation"
+
+    kind = models.CharField(
+        max_length=32,
+        choices=Kind,
+        verbose_name="Kind",
+    )
+    account = models.ForeignKey(
+        Account,
+        on_delete=models.CASCADE,
+        related_name="outbox_emails",
+        verbose_name="Account",
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Created at",
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Claimed at",
+    )
+    claimed_by = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name="Claimed by",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Attempts",
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Sent at",
+    )
+
+    objects = OutboxEmailQuerySet.as_manager()
+
+    class Meta:
+        """The Class adds metadata options."""
+
+        verbose_name = "Outbox email"
+        verbose_name_plural = "Outbox emails"
+        app_label = "app_account"
+        indexes = [
+            models.Index(
+                fields=("id",),
+                condition=models.Q(sent_at__isnull=True),
+                name="outbox_email_pending_idx",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        """Introduce the email via its kind and account.
+
+        Returns:
+            String representation of the email.
+        """
+        return f"{self.get_kind_display()}: {self.account_id}"
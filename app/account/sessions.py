@@ -0,0 +1,177 @@
+# -*- coding: UTF-8 -*-
+"""This module adds a write-behind session engine.
+
+Sessions are read from and written to the cache first:
+
+* sessions expiring at browser close (the default, and logins without
+  "Remember me") live only in the cache and never touch the database;
+* persistent sessions ("Remember me") are also written to the database,
+  at most once per `SESSION_WRITE_BEHIND_SECONDS` unless the logged-in
+  user changes, so the database copy can be reloaded after a cache
+  eviction.
+
+Enable it with `SESSION_ENGINE = "app.account.sessions"` and a cache
+shared by all processes; the settings do so when `CACHE_URL` is set.
+"""
+import time
+from typing import Any, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.cached_db import (
+    SessionStore as CachedDBStore,
+)
+from django.db import router
+
+KEY_PREFIX = "app.account.sessions"
+
+
+class SessionStore(CachedDBStore):
+    """Cache-first session store flushing persistent sessions to the DB."""
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key: Optional[str] = None):
+        """Create the store.
+
+        Args:
+            session_key (str): Session key from the cookie, if any.
+        """
+        super().__init__(session_key)
+        self._flushed_at = None
+        self._flushed_auth = None
+
+    @staticmethod
+    def _auth_fingerprint(data: dict[str, Any]) -> tuple:
+        """Return the logged-in user data of the session.
+
+        Args:
+            data (dict[str, Any]): Session data.
+
+        Returns:
+            User id and session auth hash.
+        """
+        return data.get(SESSION_KEY), data.get(HASH_SESSION_KEY)
+
+    def load(self) -> dict[str, Any]:
+        """Load the session from the cache, falling back to the database.
+
+        Returns:
+            Session data.
+        """
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:  # noqa: B902
+            # Some backends (e.g. memcache) raise an exception on invalid
+            # cache keys, the session is reset then like in `cached_db`.
+            entry = None
+        if entry is not None:
+            self._flushed_at = entry["flushed_at"]
+            self._flushed_auth = entry["flushed_auth"]
+            return entry["data"]
+        session = self._get_session_from_db()
+        if not session:
+            return {}
+        data = self.decode(session.session_data)
+        self._flushed_at = time.time()
+        self._flushed_auth = self._auth_fingerprint(data)
+        self._write_cache(
+            data,
+            self.get_expiry_age(expiry=session.expire_date),
+        )
+        return data
+
+    def save(self, must_create: bool = False) -> None:
+        """Save the session to the cache and, if needed, to the database.
+
+        Args:
+            must_create (bool): Whether a new session must be created.
+
+        Raises:
+            CreateError: if a new session key is already taken.
+        """
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        if must_create and not self._cache.add(
+            self.cache_key,
+            self._cache_entry(data),
+            self.get_expiry_age(),
+        ):
+            raise CreateError
+        if self._needs_flush(data):
+            self._flush_to_db(data)
+        elif must_create:
+            return None
+        self._write_cache(data, self.get_expiry_age())
+
+    async def aload(self) -> dict[str, Any]:
+        """Async version of `load()`.
+
+        Returns:
+            Session data.
+        """
+        return await sync_to_async(self.load)()
+
+    async def asave(self, must_create: bool = False) -> None:
+        """Async version of `save()`.
+
+        Args:
+            must_create (bool): Whether a new session must be created.
+        """
+        await sync_to_async(self.save)(must_create)
+
+    def _needs_flush(self, data: dict[str, Any]) -> bool:
+        """Check whether the session has to be written to the database.
+
+        Args:
+            data (dict[str, Any]): Session data.
+
+        Returns:
+            True for persistent sessions that were never flushed, changed
+            user or weren't flushed for `SESSION_WRITE_BEHIND_SECONDS`.
+        """
+        if self.get_expire_at_browser_close():
+            return False
+        if self._flushed_at is None:
+            return True
+        user_changed = self._flushed_auth != self._auth_fingerprint(data)
+        age = time.time() - self._flushed_at
+        return user_changed or age >= settings.SESSION_WRITE_BEHIND_SECONDS
+
+    def _flush_to_db(self, data: dict[str, Any]) -> None:
+        """Insert or update the database copy of the session.
+
+        Args:
+            data (dict[str, Any]): Session data.
+        """
+        obj = self.create_model_instance(data)
+        obj.save(using=router.db_for_write(self.model, instance=obj))
+        self._flushed_at = time.time()
+        self._flushed_auth = self._auth_fingerprint(data)
+
+    def _cache_entry(self, data: dict[str, Any]) -> dict[str, Any]:
+        """Return the cached value of the session.
+
+        Args:
+            data (dict[str, Any]): Session data.
+
+        Returns:
+            Session data with its flush state.
+        """
+        return {
+            "data": data,
+            "flushed_at": self._flushed_at,
+            "flushed_auth": self._flushed_auth,
+        }
+
+    def _write_cache(self, data: dict[str, Any], timeout: int) -> None:
+        """Store the session data with its flush state in the cache.
+
+        Args:
+            data (dict[str, Any]): Session data.
+            timeout (int): Cache timeout in seconds.
+        """
+        self._cache.set(self.cache_key, self._cache_entry(data), timeout)
@@ -0,0 +1,140 @@
+# -*- coding: UTF-8 -*-
+"""This module resolves profile slugs and builds account URLs.
+
+Profile URLs contain the account slug. `get_account_pk()` maps a slug to
+the account primary key through the cache, so the profile view loads the
+account from the account cache instead of querying the slug on every
+hit. `get_account_url()` memoizes reversed account URLs in the process.
+
+When the slug of an account changes, `Account.save()` stores the old one
+in `AccountSlugRedirect` and calls `forget_account_slug()`. Requests for
+the old slug are then permanently redirected to the current one instead
+of ending with a 404.
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import get_script_prefix, reverse
+
+SLUG_PK_KEY = "account-slug:{slug}"
+
+
+class AccountURLCache:
+    """Reversed account URLs memoized per URL name and slug.
+
+    The least recently used URLs are dropped above `max_urls`.
+    """
+
+    def __init__(self, max_urls: int = 10000):
+        """Create an empty cache.
+
+        Args:
+            max_urls (int): Maximum number of kept URLs.
+        """
+        self.max_urls = max_urls
+        self._urls: OrderedDict[tuple[str, str, str], str] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, name: str, slug: str) -> str:
+        """Return the URL, reversing it on the first call.
+
+        Args:
+            name (str): URL pattern name taking the slug.
+            slug (str): Account slug.
+
+        Returns:
+            Absolute path of the URL.
+        """
+        key = (name, slug, get_script_prefix())
+        with self._lock:
+            url = self._urls.get(key)
+            if url is not None:
+                self._urls.move_to_end(key)
+                return url
+        url = reverse(name, args=(slug,))
+        with self._lock:
+            self._urls[key] = url
+            if len(self._urls) > self.max_urls:
+                self._urls.popitem(last=False)
+        return url
+
+    def forget(self, slug: str) -> None:
+        """Drop all URLs of the slug.
+
+        Args:
+            slug (str): Account slug.
+        """
+        with self._lock:
+            for key in [key for key in self._urls if key[1] == slug]:
+                del self._urls[key]
+
+    def clear(self) -> None:
+        """Drop all URLs."""
+        with self._lock:
+            self._urls.clear()
+
+
+account_urls = AccountURLCache()
+
+
+def get_account_url(name: str, slug: str) -> str:
+    """Return the memoized account URL.
+
+    Args:
+        name (str): URL pattern name taking the slug.
+        slug (str): Account slug.
+
+    Returns:
+        Absolute path of the URL.
+    """
+    return account_urls.get(name, slug)
+
+
+def get_account_pk(slug: str) -> Optional[int]:
+    """Return the primary key of the account with the slug.
+
+    Args:
+        slug (str): Account slug.
+
+    Returns:
+        Primary key, or None if no account has the slug.
+    """
+    key = SLUG_PK_KEY.format(slug=slug)
+    pk = cache.get(key)
+    if pk is None:
+        pk = get_user_model().objects.filter(slug=slug).values_list(
+            "pk", flat=True,
+        ).first()
+        if pk is not None:
+            cache.set(key, pk, timeout=settings.ACCOUNT_CACHE_TIMEOUT)
+    return pk
+
+
+def get_redirect_slug(slug: str) -> Optional[str]:
+    """Return the current slug of the account that used to have the slug.
+
+    Args:
+        slug (str): Old account slug.
+
+    Returns:
+        Current slug, or None if the slug was never changed.
+    """
+    from app.account.models import AccountSlugRedirect
+
+    return AccountSlugRedirect.objects.filter(old_slug=slug).values_list(
+        "account__slug", flat=True,
+    ).first()
+
+
+def forget_account_slug(slug: str) -> None:
+    """Drop the slug from the slug cache and the URL cache.
+
+    Args:
+        slug (str): Account slug that is no longer in use.
+    """
+    cache.delete(SLUG_PK_KEY.format(slug=slug))
+    account_urls.forget(slug)
@@ -1,38 +1,531 @@
 # -*- coding: UTF-8 -*-
-"""Tasks module for celery in `account` application."""
+"""Tasks module for celery in `account` application.
+
+Password reset and signup confirmation emails go through the
+`OutboxEmail` table: the view writes a row in the transaction of the
+triggering change and `dispatch_email_outbox` claims pending rows in
+batches and sends every batch over one mail connection. A rolled back
+change sends nothing. Beat runs the dispatch every
+`EMAIL_OUTBOX_POLL_SECONDS`, and `wake_email_outbox()` runs it right
+after the commit. Password reset requests are also deduplicated per
+account: repeated requests within `PASSWORD_RESET_DEDUPE_SECONDS` are
+dropped by `queue_reset_password_email()`, which the
+`send_reset_password_email` task calls too.
+
+The daily `send_confirmation_reminders` task pages unconfirmed accounts
+due for a reminder by primary key and sends every page with one
+`send_confirmation_emails` task over a single connection, which marks
+the accounts as reminded.
+
+Newsletters are fanned out by `fan_out_newsletter`, which pages the
+subscribers by primary key and queues one `send_newsletter_chunk` task
+per page. Every page is stored as a `NewsletterChunk` together with the
+fan-out checkpoint, so a crashed send resumes where it stopped.
+
+Tasks are queued with `dispatch_task()`, which runs them in process
+when the broker is unreachable. Bulk tasks are queued with
+`queue_bulk_task()`, which fails loudly if the in-process pool is full.
+No caller waits for the tasks, so they don't store results. Lists of
+primary keys are sent with the `compact` serializer.
+"""
+import logging
+import socket
+import uuid
+from datetime import timedelta
+from functools import partial
+from typing import Any, Optional
+
+from celery import Task
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
+from app.account.dispatch import TaskDispatchError, dispatch_task
+from app.account.models import Newsletter, NewsletterChunk, OutboxEmail
 from app.myblog import celery_app
+from app.services.email_functions import build_email_message, render_email
 from app.services.tasks_funtions import (
+    generate_email_confirmation_uidb_and_token,
     generate_password_reset_uidb_and_token,
-    prepare_password_reset_email_letter,
+    prepare_email_confirmation_email,
+    prepare_password_reset_email,
+    send_messages_over_connection,
 )
 
 Account = get_user_model()
 
+logger = logging.getLogger(__name__)
+
+RESET_SUBJECT = "Myblog Password Reset"
+RESET_TEMPLATE_NAME = "account/password_reset_email.html"
+RESET_REQUEST_KEY = "reset-email:request:{pk}"
+CONFIRMATION_SUBJECT = "Myblog Email Confirmation"
+CONFIRMATION_TEMPLATE_NAME = "account/confirm_email_email.html"
+NEWSLETTER_TEMPLATE_NAME = "account/newsletter_email.html"
+
 
-@celery_app.task
-def send_reset_password_email(email) -> None:
+@celery_app.task(ignore_result=True)
+def send_reset_password_email(pk: int) -> None:
     """Celery task for sending password reset email.
 
+    The views write reset emails to the outbox directly. The task stays
+    as an entry point, e.g. for messages queued before the outbox, and
+    writes the email to the outbox as well.
+
+    Args:
+        pk (int): Account primary key.
+    """
+    queue_reset_password_email(pk)
+
+
+def queue_reset_password_email(pk: int) -> bool:
+    """Write the password reset email to the outbox.
+
+    The row is written in the caller's transaction. The request is
+    dropped if the account already requested a reset in the last
+    `PASSWORD_RESET_DEDUPE_SECONDS`. If the row can't be written, the
+    request is forgotten, so the user can retry right away.
+
     Args:
-        email (str): User's email address.
+        pk (int): Account primary key.
+
+    Returns:
+        Whether the email was queued, False for a repeated request.
+    """
+    dedupe = settings.PASSWORD_RESET_DEDUPE_SECONDS
+    key = RESET_REQUEST_KEY.format(pk=pk)
+    if dedupe and not cache.add(key, True, timeout=dedupe):
+        return False
+    try:
+        OutboxEmail.objects.create(
+            kind=OutboxEmail.Kind.PASSWORD_RESET,
+            account_id=pk,
+        )
+    except Exception:  # noqa: B902
+        if dedupe:
+            cache.delete(key)
+        raise
+    wake_email_outbox()
+    return True
+
+
+def wake_email_outbox() -> None:
+    """Dispatch the outbox once the current transaction commits.
+
+    The email goes out without waiting for the next beat run, which
+    still sends it if the dispatch is lost.
+    """
+    transaction.on_commit(partial(dispatch_task, dispatch_email_outbox))
+
+
+def queue_bulk_task(task: Task, *args: Any) -> None:
+    """Queue a batch of a bulk job.
+
+    Args:
+        task (Task): Celery task.
+        *args (Any): Task arguments.
+
+    Raises:
+        TaskDispatchError: If the task was dropped, the batch is left for
+            the next run of the job.
+    """
+    if not dispatch_task(task, *args):
+        raise TaskDispatchError(f"{task.name} was dropped, pool is full")
+
+
+def build_reset_message(user: Account) -> EmailMultiAlternatives:
+    """Render the password reset message of the account.
+
+    Args:
+        user (Account): Account resetting its password.
+
+    Returns:
+        Message with the password reset link.
     """
-    user = Account.objects.get(email=email)
     uidb64, token = generate_password_reset_uidb_and_token(user)
-    message = prepare_password_reset_email_letter(
+    rendered = prepare_password_reset_email(
+        user=user,
+        email=user.email,
+        uidb64=uidb64,
+        token=token,
+        template_name=RESET_TEMPLATE_NAME,
+    )
+    return build_email_message(RESET_SUBJECT, rendered, [user.email])
+
+
+def build_confirmation_message(user: Account) -> EmailMultiAlternatives:
+    """Render the email confirmation message of the account.
+
+    Args:
+        user (Account): Account with an unconfirmed email.
+
+    Returns:
+        Message with the confirmation link.
+    """
+    uidb64, token = generate_email_confirmation_uidb_and_token(user)
+    rendered = prepare_email_confirmation_email(
         user=user,
-        email=email,
+        email=user.email,
         uidb64=uidb64,
         token=token,
-        template_name="account/password_reset_email.html",
+        template_name=CONFIRMATION_TEMPLATE_NAME,
+    )
+    return build_email_message(CONFIRMATION_SUBJECT, rendered, [user.email])
+
+
+@celery_app.task(ignore_result=True, serializer="compact")
+def send_confirmation_emails(pks: list[int]) -> dict[str, float]:
+    """Send confirmation links to the accounts over one connection.
+
+    Accounts confirmed in the meantime are skipped, the others are
+    marked as reminded once their emails are sent.
+
+    Args:
+        pks (list[int]): Account primary keys.
+
+    Returns:
+        Number of requested and sent emails and the send latency.
+    """
+    accounts = list(Account.objects.filter(pk__in=pks, confirm_email=False))
+    sent, latency_ms = send_messages_over_connection(
+        build_confirmation_message(user) for user in accounts
+    )
+    Account.objects.filter(pk__in=[user.pk for user in accounts]).update(
+        confirmation_reminded_at=timezone.now(),
+    )
+    logger.info(
+        "Sent %d of %d confirmation emails in %.1f ms",
+        sent,
+        len(pks),
+        latency_ms,
+    )
+    return {
+        "requested": len(pks),
+        "sent": sent,
+        "latency_ms": round(latency_ms, 2),
+    }
+
+
+def get_confirmation_reminder_accounts():
+    """Return the unconfirmed accounts due for a reminder.
+
+    A reminder is due `EMAIL_CONFIRMATION_REMINDER_DAYS` days after
+    signup and stays due for `EMAIL_CONFIRMATION_REMINDER_WINDOW_DAYS`
+    days unless the account was reminded since. Nobody is reminded when
+    `ACCOUNT_EMAIL_VERIFICATION` is "none", since signups aren't asked
+    to confirm their email then.
+
+    Returns:
+        QuerySet: Active unconfirmed accounts ordered by primary key.
+    """
+    if settings.ACCOUNT_EMAIL_VERIFICATION == "none":
+        return Account.objects.none()
+    now = timezone.now()
+    window = timedelta(days=settings.EMAIL_CONFIRMATION_REMINDER_WINDOW_DAYS)
+    due = Q(pk__in=[])
+    for days in settings.EMAIL_CONFIRMATION_REMINDER_DAYS:
+        age = timedelta(days=days)
+        not_reminded = Q(confirmation_reminded_at__isnull=True) | Q(
+            confirmation_reminded_at__lt=F("date_joined") + age,
+        )
+        due |= not_reminded & Q(
+            date_joined__lte=now - age,
+            date_joined__gt=now - age - window,
+        )
+    return Account.objects.filter(
+        due,
+        confirm_email=False,
+        is_active=True,
+    ).order_by("pk")
+
+
+@celery_app.task(ignore_result=True)
+def send_confirmation_reminders() -> int:
+    """Queue reminders for accounts still unconfirmed after signup.
+
+    Accounts due for a reminder are paged by primary key, every page of
+    `EMAIL_CONFIRMATION_BATCH_SIZE` accounts is sent by its own task.
+    Accounts are marked when their reminder is sent, so a batch that
+    wasn't sent is queued again by the next run.
+
+    Returns:
+        Number of queued batches.
+    """
+    accounts = get_confirmation_reminder_accounts()
+    batches = 0
+    last_pk = 0
+    while True:
+        pks = list(
+            accounts.filter(pk__gt=last_pk).values_list(
+                "pk", flat=True,
+            )[:settings.EMAIL_CONFIRMATION_BATCH_SIZE],
+        )
+        if not pks:
+            return batches
+        queue_bulk_task(send_confirmation_emails, pks)
+        batches += 1
+        last_pk = pks[-1]
+
+
+def build_outbox_message(
+    email: OutboxEmail,
+    account: Optional[Account],
+) -> Optional[EmailMultiAlternatives]:
+    """Render the message of an outbox email.
+
+    Args:
+        email (OutboxEmail): Outbox row.
+        account (Account | None): Recipient account.
+
+    Returns:
+        Message, or None if it isn't needed anymore.
+    """
+    if account is None:
+        return None
+    if email.kind == OutboxEmail.Kind.CONFIRMATION:
+        if account.confirm_email:
+            return None
+        return build_confirmation_message(account)
+    return build_reset_message(account)
+
+
+def send_outbox_emails(emails: list[OutboxEmail]) -> int:
+    """Send claimed outbox emails over one connection and mark them.
+
+    If rendering or sending fails, the emails are retried after
+    `EMAIL_OUTBOX_RETRY_SECONDS`, emails that failed
+    `EMAIL_OUTBOX_MAX_ATTEMPTS` times are logged and given up.
+
+    Args:
+        emails (list[OutboxEmail]): Claimed outbox rows.
+
+    Returns:
+        Number of sent emails.
+    """
+    if not emails:
+        return 0
+    claimed_emails = OutboxEmail.objects.filter(
+        pk__in=[email.pk for email in emails],
+    )
+    try:
+        accounts = Account.objects.in_bulk(
+            {email.account_id for email in emails},
+        )
+        messages = [
+            message
+            for message in (
+                build_outbox_message(email, accounts.get(email.account_id))
+                for email in emails
+            )
+            if message is not None
+        ]
+        sent, latency_ms = send_messages_over_connection(messages)
+    except Exception:  # noqa: B902
+        logger.exception("Failed to send %d outbox emails", len(emails))
+        claimed_emails.update(
+            attempts=F("attempts") + 1,
+            claimed_at=timezone.now(),
+            claimed_by="",
+        )
+        exhausted = list(
+            claimed_emails.filter(
+                attempts__gte=settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+            ).values_list("pk", flat=True),
+        )
+        if exhausted:
+            logger.error(
+                "Gave up on outbox emails %s after %d attempts",
+                exhausted,
+                settings.EMAIL_OUTBOX_MAX_ATTEMPTS,
+            )
+        return 0
+    claimed_emails.update(attempts=F("attempts") + 1, sent_at=timezone.now())
+    logger.info("Sent %d outbox emails in %.1f ms", sent, latency_ms)
+    return sent
+
+
+def dispatch_outbox_batch(batch_size: int) -> int:
+    """Claim a batch of pending outbox emails and send it.
+
+    The batch is stamped with a random token in a short transaction and
+    sent after the commit, so no lock is held while talking to the mail
+    server. Where the database supports it, the rows are selected with
+    `SELECT ... FOR UPDATE SKIP LOCKED`, so dispatchers never wait for
+    each other. Elsewhere (SQLite) the stamping UPDATE checks again that
+    the rows are claimable. A claim older than
+    `EMAIL_OUTBOX_RETRY_SECONDS` is given up and the batch is retried.
+
+    Args:
+        batch_size (int): Maximum number of emails in the batch.
+
+    Returns:
+        Number of claimed emails.
+    """
+    stale_before = timezone.now() - timedelta(
+        seconds=settings.EMAIL_OUTBOX_RETRY_SECONDS,
+    )
+    claimable = OutboxEmail.objects.claimable(stale_before)
+    if connection.features.has_select_for_update_skip_locked:
+        claimable = claimable.select_for_update(skip_locked=True)
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        pks = list(claimable.values_list("pk", flat=True)[:batch_size])
+        OutboxEmail.objects.claimable(stale_before).filter(
+            pk__in=pks,
+        ).update(claimed_at=timezone.now(), claimed_by=token)
+    emails = list(OutboxEmail.objects.filter(claimed_by=token))
+    send_outbox_emails(emails)
+    return len(emails)
+
+
+@celery_app.task(ignore_result=True)
+def dispatch_email_outbox() -> int:
+    """Send pending outbox emails in batches until none is left.
+
+    Returns:
+        Number of dispatched emails.
+    """
+    batch_size = settings.EMAIL_OUTBOX_BATCH_SIZE
+    dispatched = 0
+    while True:
+        claimed = dispatch_outbox_batch(batch_size)
+        dispatched += claimed
+        if claimed < batch_size:
+            return dispatched
+
+
+def get_newsletter_recipients():
+    """Return the accounts receiving newsletters.
+
+    Returns:
+        QuerySet: Active subscribed accounts ordered by primary key.
+    """
+    return Account.objects.filter(subscribe=True, is_active=True).order_by(
+        "pk",
+    )
+
+
+@celery_app.task(ignore_result=True)
+def fan_out_newsletter(newsletter_pk: int) -> int:
+    """Split the subscribers into chunks and queue a task per chunk.
+
+    Subscribers are paged by keyset (`pk > last_enqueued_pk`), every page
+    of `NEWSLETTER_CHUNK_SIZE` accounts is saved as a chunk in the same
+    transaction as the checkpoint and queued after the commit. Chunks
+    left unsent by a previous run are queued again.
+
+    Args:
+        newsletter_pk (int): Newsletter primary key.
+
+    Returns:
+        Number of queued chunks.
+    """
+    newsletter = Newsletter.objects.get(pk=newsletter_pk)
+    if newsletter.started_at is None:
+        newsletter.started_at = timezone.now()
+        newsletter.save(update_fields=["started_at"])
+    unsent = list(
+        newsletter.chunks.filter(
+            status=NewsletterChunk.Status.PENDING,
+        ).values_list("pk", flat=True),
+    )
+    for chunk_pk in unsent:
+        queue_bulk_task(send_newsletter_chunk, chunk_pk)
+    queued = len(unsent)
+    recipients = get_newsletter_recipients()
+    while True:
+        pks = list(
+            recipients.filter(
+                pk__gt=newsletter.last_enqueued_pk,
+            ).values_list("pk", flat=True)[:settings.NEWSLETTER_CHUNK_SIZE],
+        )
+        if not pks:
+            break
+        with transaction.atomic():
+            chunk = NewsletterChunk.objects.create(
+                newsletter=newsletter,
+                first_pk=pks[0],
+                last_pk=pks[-1],
+            )
+            newsletter.last_enqueued_pk = pks[-1]
+            newsletter.save(update_fields=["last_enqueued_pk"])
+            transaction.on_commit(
+                partial(queue_bulk_task, send_newsletter_chunk, chunk.pk),
+            )
+        queued += 1
+    newsletter.fanned_out_at = timezone.now()
+    newsletter.save(update_fields=["fanned_out_at"])
+    return queued
+
+
+@celery_app.task(bind=True, ignore_result=True)
+def send_newsletter_chunk(self, chunk_pk: int) -> int:
+    """Send the newsletter to one chunk of subscribers.
+
+    The chunk is claimed atomically, so a chunk queued twice is sent
+    once. The email is rendered once per chunk and all messages go over
+    one connection. If sending fails, the chunk is released and the
+    task retried after `NEWSLETTER_CHUNK_RETRY_SECONDS`, up to
+    `NEWSLETTER_CHUNK_MAX_RETRIES` times. A chunk that still fails stays
+    pending for the next fan-out run.
+
+    Args:
+        chunk_pk (int): Newsletter chunk primary key.
+
+    Returns:
+        Number of sent emails.
+
+    Raises:
+        Retry: If sending failed and the task is retried.
+    """
+    claimed = NewsletterChunk.objects.filter(
+        pk=chunk_pk,
+        status=NewsletterChunk.Status.PENDING,
+    ).update(status=NewsletterChunk.Status.SENDING)
+    if not claimed:
+        return 0
+    chunk = NewsletterChunk.objects.select_related("newsletter").get(
+        pk=chunk_pk,
+    )
+    newsletter = chunk.newsletter
+    try:
+        rendered = render_email(
+            NEWSLETTER_TEMPLATE_NAME, {"newsletter": newsletter},
+        )
+        emails = get_newsletter_recipients().filter(
+            pk__gte=chunk.first_pk,
+            pk__lte=chunk.last_pk,
+        ).values_list("email", flat=True)
+        sent, latency_ms = send_messages_over_connection(
+            build_email_message(newsletter.subject, rendered, [email])
+            for email in emails
+        )
+    except Exception as exc:  # noqa: B902
+        NewsletterChunk.objects.filter(
+            pk=chunk_pk,
+            status=NewsletterChunk.Status.SENDING,
+        ).update(status=NewsletterChunk.Status.PENDING)
+        raise self.retry(
+            exc=exc,
+            countdown=settings.NEWSLETTER_CHUNK_RETRY_SECONDS,
+            max_retries=settings.NEWSLETTER_CHUNK_MAX_RETRIES,
+        )
+    NewsletterChunk.objects.filter(pk=chunk_pk).update(
+        status=NewsletterChunk.Status.SENT,
+        sent_count=sent,
+        elapsed_ms=latency_ms,
+        worker=self.request.hostname or socket.gethostname(),
+        finished_at=timezone.now(),
     )
-    subject = "Myblog Password Reset"
-    send_mail(
-        subject=subject,
-        message=message,
-        from_email=settings.EMAIL_HOST_USER,
-        recipient_list=[email],
+    logger.info(
+        "Sent newsletter %d chunk %d to %d accounts in %.1f ms",
+        newsletter.pk,
+        chunk_pk,
+        sent,
+        latency_ms,
     )
+    return sent
@@ -1,10 +1,30 @@
 import pytest
+from asgiref.sync import async_to_sync
 from django.contrib.auth import authenticate
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 
 from app.tests.conftest import users
 from app.account.backends import EmailAuthBackend
 from app.account.models import Account
+from app.services.cache_functions import (
+    bump_account_cache_version,
+    get_account_cache_stats,
+    reset_account_cache_stats,
+)
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+}
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    """Use an empty local memory cache."""
+    settings.CACHES = LOCMEM_CACHES
+    cache.clear()
 
 
 @pytest.mark.django_db
@@ -40,8 +60,168 @@ def test_email_auth_backend_authenticate(users):
 def test_email_auth_backend_get_user(users):
     """ Testing EmailAuthBackend, get_user method."""
 
-    assert users["user"] == EmailAuthBackend().get_user(users["user"].email), \
+    assert users["user"] == EmailAuthBackend().get_user(users["user"].pk), \
         "User matches"
 
-    assert users["user"] != EmailAuthBackend().get_user("fake@email.com"), \
+    assert EmailAuthBackend().get_user(0) is None, \
         "User doesn't match"
+
+
+@pytest.mark.django_db
+def test_email_auth_backend_get_user_cached(
+    users, locmem_cache, django_assert_num_queries,
+):
+    """Testing EmailAuthBackend, get_user uses the versioned cache."""
+    backend = EmailAuthBackend()
+    user = users["user"]
+    reset_account_cache_stats()
+
+    with django_assert_num_queries(1):
+        assert backend.get_user(user.pk) == user, "User isn't loaded"
+    with django_assert_num_queries(0):
+        assert backend.get_user(user.pk) == user, "User isn't cached"
+
+    assert get_account_cache_stats() == {"hits": 1, "misses": 1}, \
+        "Wrong cache counters"
+
+
+@pytest.mark.django_db
+def test_email_auth_backend_get_user_invalidated(
+    users, locmem_cache, django_assert_num_queries,
+    django_capture_on_commit_callbacks,
+):
+    """Testing EmailAuthBackend, saving an account invalidates the cache."""
+    backend = EmailAuthBackend()
+    user = users["user"]
+    backend.get_user(user.pk)
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        user.first_name = "Changed"
+        user.save()
+    assert backend.get_user(user.pk).first_name == "", \
+        "Cache is invalidated before the commit"
+    for callback in callbacks:
+        callback()
+
+    with django_assert_num_queries(1):
+        assert backend.get_user(user.pk).first_name == "Changed", \
+            "Stale user is returned after save"
+
+    user_pk = user.pk
+    with django_capture_on_commit_callbacks(execute=True):
+        Account.objects.get(pk=user_pk).delete()
+    assert backend.get_user(user_pk) is None, \
+        "Deleted user is returned from the cache"
+
+
+@pytest.mark.django_db
+def test_email_auth_backend_get_user_changed_while_fetched(
+    users, locmem_cache, mocker, django_assert_num_queries,
+):
+    """Testing EmailAuthBackend, a row changed meanwhile isn't cached."""
+    backend = EmailAuthBackend()
+    user = users["user"]
+    get = Account.objects.get
+
+    def get_while_changed(*args, **kwargs):
+        stale = get(*args, **kwargs)
+        bump_account_cache_version(user.pk)
+        return stale
+
+    mocker.patch.object(Account.objects, "get", get_while_changed)
+    backend.get_user(user.pk)
+    mocker.stopall()
+
+    with django_assert_num_queries(1):
+        backend.get_user(user.pk)
+
+
+@pytest.mark.django_db
+def test_email_auth_backend_get_user_bulk_updated(
+    users, locmem_cache, django_capture_on_commit_callbacks,
+):
+    """Testing EmailAuthBackend, a queryset update invalidates the cache."""
+    backend = EmailAuthBackend()
+    user = users["user"]
+    backend.get_user(user.pk)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Account.objects.filter(pk=user.pk).update(is_active=False)
+
+    assert backend.get_user(user.pk) is None, \
+        "Deactivated user is returned from the cache"
+
+
+@pytest.mark.django_db
+def test_email_auth_backend_get_user_bulk_deleted(
+    users, locmem_cache, django_capture_on_commit_callbacks,
+):
+    """Testing EmailAuthBackend, a queryset delete invalidates the cache."""
+    backend = EmailAuthBackend()
+    user = users["user"]
+    backend.get_user(user.pk)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Account.objects.filter(pk=user.pk).delete()
+
+    assert backend.get_user(user.pk) is None, \
+        "Deleted user is returned from the cache"
+
+
+@pytest.mark.django_db
+def test_email_auth_backend_aauthenticate(users):
+    """Testing EmailAuthBackend, aauthenticate method."""
+    aauthenticate = async_to_sync(EmailAuthBackend().aauthenticate)
+
+    assert aauthenticate(
+        None, username=users["user"].email, password="test_password",
+    ) == users["user"], "Correct user isn't authenticated"
+
+    assert aauthenticate(
+        None, email=users["user"].email, password="wrong_password",
+    ) is None, "Wrong user is authenticated"
+
+    assert aauthenticate(
+        None, username="fake@email.com", password="wrong_password",
+    ) is None, "Fake user is authenticated"
+
+
+@pytest.mark.django_db
+def test_email_auth_backend_aauthenticate_inactive(users):
+    """Testing EmailAuthBackend, aauthenticate rejects inactive users."""
+    aauthenticate = async_to_sync(EmailAuthBackend().aauthenticate)
+    Account.objects.filter(pk=users["user"].pk).update(is_active=False)
+
+    assert aauthenticate(
+        None, username=users["user"].email, password="test_password",
+    ) is None, "Inactive user is authenticated"
+
+
+@pytest.mark.django_db
+def test_email_auth_backend_aauthenticate_unknown_email(users, mocker):
+    """Testing EmailAuthBackend, an unknown email costs one hash."""
+    set_password = mocker.spy(Account, "set_password")
+    aauthenticate = async_to_sync(EmailAuthBackend().aauthenticate)
+
+    assert aauthenticate(
+        None, username="fake@email.com", password="wrong_password",
+    ) is None, "Fake user is authenticated"
+
+    set_password.assert_called_once_with(mocker.ANY, "wrong_password")
+
+
+@pytest.mark.django_db
+def test_email_auth_backend_aget_user(
+    users, locmem_cache, django_assert_num_queries,
+):
+    """Testing EmailAuthBackend, aget_user method."""
+    aget_user = async_to_sync(EmailAuthBackend().aget_user)
+
+    with django_assert_num_queries(1):
+        assert aget_user(users["user"].pk) == users["user"], \
+            "User isn't loaded"
+    with django_assert_num_queries(0):
+        assert aget_user(users["user"].pk) == users["user"], \
+            "User isn't cached"
+
+    assert aget_user(0) is None, "Fake user is returned"
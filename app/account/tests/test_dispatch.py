@@ -0,0 +1,89 @@
+import threading
+
+import pytest
+from kombu import Connection
+
+from app.account import dispatch
+from app.account.dispatch import dispatch_task
+from app.tests.conftest import recording_task, task_dispatcher
+
+
+def test_publishes_to_broker(recording_task, task_dispatcher):
+    """Test that a reachable broker gets the task."""
+    task, calls = recording_task("memory://")
+
+    assert task_dispatcher().dispatch(task, 1)
+
+    with task.app.connection_for_write() as connection:
+        message = connection.default_channel.basic_get("dispatch")
+        assert message.decode()[0] == [1]
+    assert calls == []
+
+
+def test_publish_reuses_pooled_connection(
+    recording_task, task_dispatcher, mocker,
+):
+    """Test that dispatches share one broker connection."""
+    task, calls = recording_task("memory://")
+    dispatcher = task_dispatcher()
+    connect = mocker.spy(Connection, "_establish_connection")
+
+    assert dispatcher.dispatch(task, 1)
+    assert dispatcher.dispatch(task, 2)
+
+    assert connect.call_count == 1, "Connection should be pooled"
+    with task.app.connection_for_write() as connection:
+        channel = connection.default_channel
+        assert [
+            channel.basic_get("dispatch").decode()[0] for _ in range(2)
+        ] == [[1], [2]]
+
+
+def test_runs_in_process_when_broker_is_down(
+    recording_task, task_dispatcher, mocker,
+):
+    """Test the fallback to the pool and skipping a down broker."""
+    task, calls = recording_task("amqp://127.0.0.1:1//")
+    connect = mocker.spy(Connection, "ensure_connection")
+    dispatcher = task_dispatcher()
+
+    assert dispatcher.dispatch(task, 1)
+    assert dispatcher.dispatch(task, 2)
+    dispatcher.executor.shutdown(wait=True)
+
+    assert sorted(calls) == [1, 2]
+    assert connect.call_count == 1, "Down broker should be skipped"
+
+
+def test_thread_mode_bounds_the_pool(recording_task, task_dispatcher):
+    """Test that tasks beyond the pool and its queue are dropped."""
+    task, calls = recording_task("memory://")
+    dispatcher = task_dispatcher("thread")
+    release = threading.Event()
+
+    assert dispatcher.dispatch(task, 1, release)
+    assert dispatcher.dispatch(task, 2)
+    assert not dispatcher.dispatch(task, 3), "Full pool should drop"
+    release.set()
+    dispatcher.executor.shutdown(wait=True)
+
+    assert calls == [1, 2]
+
+
+def test_unknown_mode(task_dispatcher):
+    """Test that an unknown mode is refused."""
+    with pytest.raises(ValueError):
+        task_dispatcher("celery")
+
+
+def test_dispatcher_follows_settings(settings, recording_task):
+    """Test that the shared dispatcher is rebuilt on setting changes."""
+    settings.TASK_DISPATCH_WORKERS = 3
+    dispatcher = dispatch.get_task_dispatcher()
+    task, calls = recording_task("memory://")
+
+    assert dispatcher.mode == "thread"
+    assert dispatcher.executor._max_workers == 3
+    assert dispatch_task(task, 1)
+    settings.TASK_DISPATCH_MODE = "broker"
+    assert dispatch.get_task_dispatcher() is not dispatcher
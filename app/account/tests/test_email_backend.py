@@ -0,0 +1,130 @@
+import asyncio
+import socket
+from smtplib import SMTPRecipientsRefused, SMTPResponseException
+
+import pytest
+from django.core.mail import EmailMessage, send_mail
+
+from app.account.email_backend import SMTPClient
+from app.benchmarks.smtp_sink import SMTPSink
+from app.tests.conftest import email_backend, sink
+
+
+def test_messages_spread_over_connections(sink, email_backend):
+    """Test that messages are sent over the bounded connections."""
+    messages = [
+        EmailMessage(
+            subject=f"Message {index}",
+            body="Hello\n.hidden line",
+            from_email="blog@test.com",
+            to=[f"user{index}@test.com"],
+        )
+        for index in range(10)
+    ]
+
+    sent = email_backend(sink.port, concurrency=3).send_messages(messages)
+
+    assert sent == 10
+    assert sink.messages == 10
+    assert sink.connections == 3, "Concurrency should bound connections"
+    assert all(b"\r\n..hidden line" in data for data in sink.received), \
+        "Lines starting with a period should be escaped"
+
+
+def test_send_mail_through_backend(sink, settings):
+    """Test that send_mail works with the backend from settings."""
+    settings.EMAIL_BACKEND = "app.account.email_backend.EmailBackend"
+    settings.EMAIL_HOST = "127.0.0.1"
+    settings.EMAIL_PORT = sink.port
+    settings.EMAIL_HOST_PASSWORD = ""
+
+    sent = send_mail(
+        "Subject",
+        "Text",
+        "blog@test.com",
+        ["user@test.com"],
+        html_message="<p>Text</p>",
+    )
+
+    assert sent == 1
+    assert sink.connections == 1
+    assert b"Subject: Subject" in sink.received[0]
+
+
+def test_messages_without_recipients_skipped(sink, email_backend):
+    """Test that nothing is sent without recipients."""
+    message = EmailMessage(subject="Subject", from_email="blog@test.com")
+
+    assert email_backend(sink.port).send_messages([message]) == 0
+    assert sink.connections == 0
+
+
+def test_connection_refused(email_backend):
+    """Test that connection errors raise unless failing silently."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    message = EmailMessage(from_email="blog@test.com", to=["user@test.com"])
+
+    with pytest.raises(OSError):
+        email_backend(port).send_messages([message])
+    assert email_backend(port, fail_silently=True).send_messages(
+        [message],
+    ) == 0
+
+
+def test_refused_recipient(email_backend):
+    """Test that a refused message raises unless failing silently."""
+    messages = [
+        EmailMessage(from_email="blog@test.com", to=[email])
+        for email in ("bad@test.com", "user@test.com")
+    ]
+
+    with SMTPSink(refuse=("bad@test.com",)) as sink:
+        with pytest.raises(SMTPRecipientsRefused):
+            email_backend(sink.port).send_messages(messages[:1])
+        sent = email_backend(
+            sink.port, fail_silently=True, concurrency=1,
+        ).send_messages(messages)
+
+    assert sent == 1, "A refused message shouldn't stop the others"
+    assert sink.messages == 1
+
+
+def test_lost_connection_requeues_message(sink, email_backend, mocker):
+    """Test that the message of a lost connection goes over another."""
+    send = SMTPClient.send
+    failed = []
+
+    async def send_once_failing(client, *args):
+        if not failed:
+            failed.append(client)
+            raise ConnectionResetError
+        await send(client, *args)
+
+    mocker.patch.object(SMTPClient, "send", send_once_failing)
+    messages = [
+        EmailMessage(from_email="blog@test.com", to=[f"user{index}@test.com"])
+        for index in range(5)
+    ]
+
+    sent = email_backend(
+        sink.port, fail_silently=True, concurrency=2,
+    ).send_messages(messages)
+
+    assert sent == 5, "The lost message should be sent again"
+    assert sink.messages == 5
+
+
+def test_failed_handshake_closes_connection(sink, email_backend, mocker):
+    """Test that a connection failing after the greeting is closed."""
+    mocker.patch.object(
+        SMTPClient, "hello", side_effect=SMTPResponseException(554, b"No"),
+    )
+    close = mocker.spy(asyncio.StreamWriter, "close")
+    message = EmailMessage(from_email="blog@test.com", to=["user@test.com"])
+
+    with pytest.raises(SMTPResponseException):
+        email_backend(sink.port, concurrency=1).send_messages([message])
+
+    assert close.call_count == 1, "Connection should be closed"
@@ -0,0 +1,121 @@
+import pytest
+from django.test import override_settings
+
+from app.account.email_filter import RegisteredEmailFilter, registered_emails
+from app.account.forms import AccountLoginForm, AccountPasswordResetFrom
+from app.account.models import Account
+from app.services.filter_functions import BloomFilter
+from app.tests.conftest import users
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "email-filter-tests",
+    },
+}
+
+
+def test_bloom_filter_has_no_false_negatives():
+    """Test that every added item is found and few others are."""
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    bloom.update(f"user{index}@test.com" for index in range(1000))
+
+    assert all(
+        f"user{index}@test.com" in bloom for index in range(1000)
+    ), "Added item isn't found"
+    false_positives = sum(
+        f"other{index}@test.com" in bloom for index in range(10000)
+    )
+    assert false_positives < 300, "Too many false positives"
+
+
+@pytest.mark.django_db
+@override_settings(REGISTERED_EMAIL_FILTER_ENABLED=True)
+def test_registered_email_filter(users, django_assert_num_queries):
+    """Test that the filter is built from accounts and updated on save."""
+    email_filter = RegisteredEmailFilter()
+
+    with django_assert_num_queries(2):
+        assert email_filter.might_contain(users["user"].email)
+    with django_assert_num_queries(0):
+        assert not email_filter.might_contain("fake@test.com")
+
+    email_filter.add("new@test.com")
+    assert email_filter.might_contain("new@test.com"), \
+        "Added email isn't found"
+    assert email_filter.stats.snapshot() == {
+        "definite_misses": 1,
+        "possible_hits": 2,
+    }, "Wrong filter counters"
+
+
+@pytest.mark.django_db
+@override_settings(REGISTERED_EMAIL_FILTER_ENABLED=True)
+def test_rebuild_skips_missing_canonical_emails(users):
+    """Test that rows without a canonical email don't break the filter."""
+    Account.objects.filter(pk=users["admin"].pk).update(email_canonical=None)
+    email_filter = RegisteredEmailFilter()
+
+    email_filter.rebuild()
+
+    assert email_filter.might_contain(users["user"].email)
+
+
+@pytest.mark.django_db
+@override_settings(REGISTERED_EMAIL_FILTER_ENABLED=True)
+def test_rebuild_keeps_emails_added_meanwhile(users, mocker):
+    """Test that an email added during a rebuild is in the new filter."""
+    email_filter = RegisteredEmailFilter()
+    update = BloomFilter.update
+
+    def add_while_reading(bloom, emails):
+        if not isinstance(emails, list):
+            email_filter.add("meanwhile@test.com")
+        update(bloom, emails)
+
+    mocker.patch.object(BloomFilter, "update", add_while_reading)
+
+    email_filter.rebuild()
+
+    assert email_filter.might_contain("meanwhile@test.com"), \
+        "Email added during the rebuild is lost"
+
+
+@pytest.mark.django_db
+@override_settings(
+    REGISTERED_EMAIL_FILTER_ENABLED=True,
+    CACHES=LOCMEM_CACHES,
+)
+def test_registered_email_filter_sees_other_processes(users):
+    """Test that emails saved elsewhere are found through the cache."""
+    email_filter = RegisteredEmailFilter()
+    email_filter.rebuild()
+
+    Account.objects.create_user(
+        email="elsewhere@test.com", password="test_password", username="new",
+    )
+
+    assert email_filter.might_contain("elsewhere@test.com"), \
+        "Email saved by another filter instance isn't found"
+
+
+@pytest.mark.django_db
+@override_settings(REGISTERED_EMAIL_FILTER_ENABLED=True)
+def test_forms_skip_query_for_unknown_email(
+    users, django_assert_num_queries,
+):
+    """Test that unknown emails are rejected without a query."""
+    registered_emails.reset()
+    registered_emails.might_contain(users["user"].email)
+
+    login_form = AccountLoginForm(
+        data={"email": "fake@test.com", "password": "test_password"},
+    )
+    reset_form = AccountPasswordResetFrom(data={"email": "fake@test.com"})
+    with django_assert_num_queries(0):
+        assert not login_form.is_valid()
+        assert not reset_form.is_valid()
+
+    assert login_form.non_field_errors() == ["Email isn't registered"]
+    assert reset_form.errors["email"] == ["Email isn't registered"]
+    registered_emails.reset()
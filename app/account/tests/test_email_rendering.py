@@ -0,0 +1,99 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.template import engines
+from django.template.loader import render_to_string
+
+from app.services.email_functions import (
+    build_email_message,
+    get_email_template,
+    get_static_email_context,
+    render_email,
+)
+from app.services.tasks_funtions import generate_password_reset_uidb_and_token
+from app.tests.conftest import users
+
+TEMPLATE_NAME = "account/password_reset_email.html"
+
+
+@pytest.mark.django_db
+def test_render_email_text_and_html(users):
+    """Test that one render produces both bodies."""
+    user = users["user"]
+    uidb64, token = generate_password_reset_uidb_and_token(user)
+
+    rendered = render_email(
+        TEMPLATE_NAME,
+        {"email": user.email, "uidb64": uidb64, "user": user, "token": token},
+    )
+
+    link = f"http://localhost:8000/account/password-reset/{uidb64}/{token}/"
+    assert link in rendered.text
+    assert f'<a href="{link}"' in rendered.html, "Links should be clickable"
+    assert rendered.html.startswith("<p>")
+
+    message = build_email_message("Subject", rendered, [user.email])
+    assert message.body == rendered.text
+    assert message.alternatives[0][1] == "text/html"
+
+
+def test_email_template_compiled_once(mocker):
+    """Test that a template is looked up once per process."""
+    get_email_template.cache_clear()
+    get_template = mocker.spy(engines["django"], "get_template")
+
+    for _ in range(3):
+        get_email_template(TEMPLATE_NAME)
+
+    get_template.assert_called_once_with(TEMPLATE_NAME)
+
+
+def test_static_context_follows_settings(settings):
+    """Test that the cached context is rebuilt when settings change."""
+    settings.USE_HTTPS = False
+    assert get_static_email_context()["protocol"] == "http"
+
+    settings.USE_HTTPS = True
+
+    assert get_static_email_context()["protocol"] == "https"
+
+
+@pytest.mark.django_db
+def test_render_email_matches_full_render(users):
+    """Test that the cached template renders like render_to_string."""
+    user = users["user"]
+    uidb64, token = generate_password_reset_uidb_and_token(user)
+    context = {
+        "email": user.email,
+        "uidb64": uidb64,
+        "user": user,
+        "token": token,
+    }
+
+    rendered = render_email(TEMPLATE_NAME, context)
+
+    assert rendered.text == render_to_string(
+        TEMPLATE_NAME, {**get_static_email_context(), **context},
+    )
+
+
+@pytest.mark.parametrize(
+    ("first_name", "expected"),
+    [("Bob", "Hello Bob, from Bob!"), ("", "Hello, from friend!")],
+)
+def test_render_email_branches_on_values(mocker, first_name, expected):
+    """Test that conditions and filters see every message's values."""
+    template = engines["django"].from_string(
+        "{% autoescape off %}"
+        "Hello{% if user.first_name %} {{ user.first_name }}{% endif %}, "
+        "from {{ user.first_name|default:'friend' }}!"
+        "{% endautoescape %}",
+    )
+    mocker.patch(
+        "app.services.email_functions.get_email_template",
+        return_value=template,
+    )
+    user = get_user_model()(first_name="Bob")
+    render_email("greeting", {"user": user})
+    user.first_name = first_name
+
+    assert render_email("greeting", {"user": user}).text == expected
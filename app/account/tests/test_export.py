@@ -0,0 +1,123 @@
+import io
+import json
+
+import pytest
+from django.contrib.admin import helpers
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.urls import reverse
+
+from app.account.export import export_rows
+from app.account.models import Account
+from app.tests.conftest import users
+
+
+@pytest.mark.django_db
+def test_export_rows_csv(users):
+    """Test that CSV export has a header and one line per account."""
+    lines = list(
+        export_rows(Account.objects.all(), ("email", "username"), "csv"),
+    )
+
+    assert lines == [
+        "email,username\r\n",
+        "user@test.com,user\r\n",
+        "admin@test.com,admin\r\n",
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.django_db
+def test_export_rows_csv_escapes_formulas(users):
+    """Test that text cells starting like a formula are quoted."""
+    users["user"].first_name = "=HYPERLINK(\"http://evil.test\")"
+    users["user"].last_name = "-2+3"
+    users["user"].save()
+
+    lines = list(
+        export_rows(
+            Account.objects.filter(pk=users["user"].pk),
+            ("id", "first_name", "last_name"),
+            "csv",
+        ),
+    )
+
+    assert lines[1] == (
+        f"{users['user'].pk},"
+        "\"'=HYPERLINK(\"\"http://evil.test\"\")\",'-2+3\r\n"
+    )
+
+
+@pytest.mark.django_db
+def test_export_rows_jsonl_uses_iterator(users, mocker):
+    """Test that JSONL rows are streamed in chunks."""
+    spy = mocker.spy(type(Account.objects.values_list()), "iterator")
+
+    lines = list(
+        export_rows(
+            Account.objects.all(),
+            ("id", "date_joined"),
+            "jsonl",
+            chunk_size=1,
+        ),
+    )
+
+    spy.assert_called_once_with(mocker.ANY, chunk_size=1)
+    row = json.loads(lines[0])
+    assert row["id"] == users["user"].pk
+    assert row["date_joined"].startswith(
+        str(users["user"].date_joined.date()),
+    )
+
+
+def test_export_rows_rejects_password():
+    """Test that columns outside the export list are refused."""
+    with pytest.raises(ValueError, match="password"):
+        next(export_rows(Account.objects.none(), ("password",)))
+
+
+@pytest.mark.django_db
+def test_export_accounts_command(users, tmp_path):
+    """Test that the command writes the export to a file."""
+    output = tmp_path / "accounts.jsonl"
+    stdout = io.StringIO()
+
+    call_command(
+        "export_accounts",
+        format="jsonl",
+        fields="email",
+        output=output,
+        stdout=stdout,
+    )
+
+    assert output.read_text().splitlines() == [
+        '{"email": "user@test.com"}',
+        '{"email": "admin@test.com"}',
+    ]
+    assert "2 accounts written" in stdout.getvalue()
+    with pytest.raises(CommandError, match="password"):
+        call_command("export_accounts", fields="email,password")
+
+
+@pytest.mark.django_db
+def test_admin_export_action(admin_client, users):
+    """Test that the admin action asks for columns, then streams rows."""
+    url = reverse("admin:app_account_account_changelist")
+    data = {
+        "action": "export_accounts",
+        helpers.ACTION_CHECKBOX_NAME: [users["user"].pk],
+    }
+
+    form_response = admin_client.post(url, data)
+    assert form_response.status_code == 200
+    assert b"Columns" in form_response.content
+
+    response = admin_client.post(
+        url,
+        {**data, "apply": "1", "columns": ["email"], "file_format": "csv"},
+    )
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv"
+    assert b"".join(response.streaming_content) == (
+        b"email\r\nuser@test.com\r\n"
+    )
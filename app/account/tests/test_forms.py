@@ -1,5 +1,6 @@
 import pytest
 from django import forms
+from django.contrib.auth.hashers import get_hasher
 from django.core.exceptions import ValidationError
 
 from app.account.forms import (
@@ -205,6 +206,52 @@ class TestAccountLoginForm:
             account_login_form_with_request.clean() is None
         ), "Wrong clean method"
 
+    @pytest.mark.django_db
+    def test_clean_inactive_account(self, users):
+        """Test that an inactive account can't log in."""
+        Account.objects.filter(pk=users["user"].pk).update(is_active=False)
+        form = AccountLoginForm(
+            data={"email": "user@test.com", "password": "test_password"},
+        )
+
+        assert not form.is_valid(), "Inactive account is logged in"
+        assert form.has_error("__all__", code="inactive")
+        assert form.get_user() is None
+
+    @pytest.mark.django_db
+    def test_login_email_ignores_case(
+        self,
+        users,
+    ):
+        """Test that the login email is matched in any letter case."""
+        form = AccountLoginForm(
+            data={"email": "USER@Test.com", "password": "test_password"},
+        )
+
+        assert form.is_valid(), "Login should ignore the email case"
+        assert form.get_user() == users["user"], "Wrong user is logged in"
+
+    @pytest.mark.django_db
+    def test_login_single_query_and_hash(
+        self,
+        account_login_form_with_request,
+        users,
+        django_assert_num_queries,
+        mocker,
+    ):
+        """Test that a login does one lookup and one password check."""
+        hasher_verify = mocker.spy(type(get_hasher()), "verify")
+
+        with django_assert_num_queries(1):
+            assert account_login_form_with_request.is_valid()
+            user = account_login_form_with_request.get_user()
+
+        assert user == users["user"], "get_user should reuse the clean() user"
+        assert hasattr(user, "backend"), "User should carry a backend path"
+        assert (
+            hasher_verify.call_count == 1
+        ), "Password should be hashed exactly once per login"
+
 
 class TestAccountSignUpForm:
 
@@ -327,6 +374,24 @@ class TestAccountSignUpForm:
             form.clean()
 
 
+    @pytest.mark.django_db
+    def test_clean_email_taken_in_other_case(self, users):
+        """Test that an email registered in another case is rejected."""
+        form = AccountSignUpForm(
+            data={
+                "username": "johndoe",
+                "email": "USER@test.com",
+                "password1": "test_password123",
+                "password2": "test_password123",
+            },
+        )
+
+        assert not form.is_valid(), "Duplicate email should be rejected"
+        assert form.errors["email"] == [
+            "Account with this Email already exists."
+        ], "Wrong duplicate email error"
+
+
 class TestAccountProfileUpdateForm:
 
     def test_meta_class(self):
@@ -520,7 +585,7 @@ class TestAccountPasswordResetForm:
             cleaned_email == "user@test.com"
         ), "Cleaned email should match the provided email"
 
-        mock_filter.assert_called_once_with(email="user@test.com")
+        mock_filter.assert_called_once_with(email_canonical="user@test.com")
 
     def test_clean_email_failure(self, mocker):
         """Test the clean_email method when the email isn't registered."""
@@ -533,4 +598,4 @@ class TestAccountPasswordResetForm:
         with pytest.raises(ValidationError, match="Email isn't registered"):
             form.clean_email()
 
-        mock_filter.assert_called_once_with(email="fake@test.com")
+        mock_filter.assert_called_once_with(email_canonical="fake@test.com")
@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management import call_command
+from django.test import override_settings
+
+from app.account.forms import AccountLoginForm
+from app.account.hashers import (
+    CalibratedPBKDF2PasswordHasher,
+    CalibratedScryptPasswordHasher,
+)
+from app.account.models import Account
+
+CALIBRATED_HASHERS = [
+    "app.account.hashers.CalibratedPBKDF2PasswordHasher",
+    "app.account.hashers.CalibratedScryptPasswordHasher",
+]
+
+
+class TestCalibratedHashers:
+
+    @override_settings(
+        PASSWORD_HASHERS_CALIBRATION={"pbkdf2_sha256": {"iterations": 1000}},
+    )
+    def test_pbkdf2_uses_calibrated_iterations(self):
+        """Test that PBKDF2 takes the iterations from the calibration."""
+        hasher = CalibratedPBKDF2PasswordHasher()
+        encoded = hasher.encode("password", hasher.salt())
+
+        assert hasher.iterations == 1000, "Wrong number of iterations"
+        assert encoded.split("$")[1] == "1000", "Hash has wrong iterations"
+        assert not hasher.must_update(encoded), "Fresh hash needs an update"
+
+    @override_settings(PASSWORD_HASHERS_CALIBRATION={})
+    def test_pbkdf2_defaults_without_calibration(self):
+        """Test that PBKDF2 falls back to the Django default cost."""
+        hasher = CalibratedPBKDF2PasswordHasher()
+        assert (
+            hasher.iterations == CalibratedPBKDF2PasswordHasher.__mro__[1]
+            .iterations
+        ), "Default iterations should be used"
+
+    @override_settings(
+        PASSWORD_HASHERS_CALIBRATION={"scrypt": {"work_factor": 2**10}},
+    )
+    def test_scrypt_verifies_larger_work_factor(self):
+        """Test that scrypt verifies hashes above the 32 MiB default."""
+        hasher = CalibratedScryptPasswordHasher()
+        encoded = hasher.encode("password", hasher.salt(), n=2**15)
+
+        assert hasher.verify("password", encoded), "Hash isn't verified"
+        assert hasher.must_update(encoded), "Outdated hash isn't reported"
+
+    @pytest.mark.django_db
+    @override_settings(
+        PASSWORD_HASHERS=CALIBRATED_HASHERS,
+        PASSWORD_HASHERS_CALIBRATION={"pbkdf2_sha256": {"iterations": 2000}},
+    )
+    def test_login_upgrades_outdated_hash(self):
+        """Test that a login rehashes a password with old parameters."""
+        user = Account.objects.create_user(
+            email="rehash@test.com", password="unused", username="rehash",
+        )
+        user.password = make_password(
+            "test_password", hasher=CalibratedScryptPasswordHasher(),
+        )
+        user.save()
+
+        form = AccountLoginForm(
+            data={"email": "rehash@test.com", "password": "test_password"},
+        )
+        assert form.is_valid(), "Login should succeed with an old hash"
+
+        user.refresh_from_db()
+        assert user.password.startswith("pbkdf2_sha256$2000$"), \
+            "Password isn't rehashed with the calibrated parameters"
+        assert check_password("test_password", user.password)
+
+
+class TestCalibrateHashersCommand:
+
+    def test_writes_configuration(self, tmp_path, mocker):
+        """Test that the command writes costs meeting the target."""
+
+        def fake_measure(hasher, samples, iterations=None, n=None):
+            if iterations:
+                return iterations / 10000
+            return n / 2**10
+
+        mocker.patch(
+            "app.account.management.commands.calibrate_hashers."
+            "measure_hasher",
+            side_effect=fake_measure,
+        )
+        output = tmp_path / "password_hashers.json"
+
+        call_command(
+            "calibrate_hashers",
+            target_ms=100,
+            samples=1,
+            algorithm="scrypt",
+            output=output,
+            stdout=mocker.MagicMock(),
+        )
+
+        config = json.loads(output.read_text())
+        assert config["algorithm"] == "scrypt", "Wrong preferred algorithm"
+        assert config["pbkdf2_sha256"]["iterations"] == 1000000, \
+            "Wrong PBKDF2 iterations"
+        assert config["scrypt"]["work_factor"] == 2**16, \
+            "Wrong scrypt work factor"
@@ -0,0 +1,107 @@
+import io
+import json
+
+import pytest
+from django.contrib.auth.hashers import check_password
+from django.core.management import call_command
+
+from app.account.models import Account
+
+CSV_HEADER = "email,password,username,subscribe\n"
+
+
+def run_import(path, **options):
+    stdout, stderr = io.StringIO(), io.StringIO()
+    call_command(
+        "import_accounts",
+        str(path),
+        stdout=stdout,
+        stderr=stderr,
+        **options,
+    )
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.mark.django_db
+def test_import_csv(tmp_path):
+    """Test that CSV rows are imported like created accounts."""
+    path = tmp_path / "accounts.csv"
+    path.write_text(
+        CSV_HEADER
+        + "One@Test.com,secret1,Same Name,true\n"
+        + "two@test.com,secret2,Same Name,false\n"
+        + "three@test.com,,Same Name,\n"
+    )
+
+    stdout, _ = run_import(path, workers=0, batch_size=2)
+
+    one = Account.objects.get(email="One@test.com")
+    assert one.email_canonical == "one@test.com", "Email not canonical"
+    assert check_password("secret1", one.password), "Password not hashed"
+    assert one.subscribe is True, "Boolean column not parsed"
+    assert not Account.objects.get(
+        email="three@test.com",
+    ).has_usable_password(), "Missing password should be unusable"
+    slugs = set(Account.objects.values_list("slug", flat=True))
+    assert len(slugs) == 3, "Colliding usernames should get unique slugs"
+    assert "3 created" in stdout
+    assert not (tmp_path / "accounts.csv.checkpoint").exists()
+
+
+@pytest.mark.django_db
+def test_import_jsonl_with_process_pool(tmp_path):
+    """Test that JSONL input is hashed in worker processes."""
+    path = tmp_path / "accounts.jsonl"
+    path.write_text(
+        "\n".join(
+            json.dumps({"email": f"user{index}@test.com", "password": "pw"})
+            for index in range(5)
+        ),
+    )
+
+    run_import(path, workers=2, batch_size=3)
+
+    accounts = Account.objects.filter(email__endswith="@test.com")
+    assert accounts.count() == 5
+    assert all(check_password("pw", account.password) for account in accounts)
+
+
+@pytest.mark.django_db
+def test_import_skips_duplicates_and_invalid_rows(tmp_path):
+    """Test that existing, repeated and invalid emails are not imported."""
+    Account.objects.create_user(email="taken@test.com", username="taken")
+    path = tmp_path / "accounts.csv"
+    path.write_text(
+        CSV_HEADER
+        + "TAKEN@test.com,pw,a,\n"
+        + "new@test.com,pw,b,\n"
+        + "NEW@test.com,pw,c,\n"
+        + "not-an-email,pw,d,\n"
+    )
+
+    stdout, stderr = run_import(path, workers=0)
+
+    assert Account.objects.count() == 2
+    assert "1 created, 2 skipped, 1 invalid" in stdout
+    assert "Row 4" in stderr, "Invalid row should be reported"
+
+
+@pytest.mark.django_db
+def test_import_resumes_from_checkpoint(tmp_path):
+    """Test that rows before the checkpoint are not imported again."""
+    path = tmp_path / "accounts.csv"
+    path.write_text(
+        CSV_HEADER + "first@test.com,pw,a,\n" + "second@test.com,pw,b,\n"
+    )
+    checkpoint = tmp_path / "progress.json"
+    checkpoint.write_text(
+        json.dumps({"input": str(path.resolve()), "rows": 1}),
+    )
+
+    stdout, _ = run_import(path, workers=0, checkpoint=checkpoint)
+
+    assert list(Account.objects.values_list("email", flat=True)) == [
+        "second@test.com",
+    ]
+    assert "Resuming after row 1" in stdout
+    assert not checkpoint.exists(), "Finished import removes checkpoint"
@@ -0,0 +1,117 @@
+import logging
+
+import pytest
+from django.contrib.auth.signals import user_logged_in
+from django.contrib.auth.tokens import default_token_generator
+from django.db import DatabaseError
+from django.test import override_settings
+
+from app.account.last_login import (
+    LastLoginRecorder,
+    get_last_login,
+    last_login_recorder,
+    record_last_login,
+)
+from app.account.models import Account
+from app.services.tasks_funtions import generate_password_reset_uidb_and_token
+from app.tests.conftest import users
+
+
+def test_receivers_replaced():
+    """Test that the buffered receiver replaces update_last_login."""
+    receivers = [entry[1]() for entry in user_logged_in.receivers]
+
+    assert record_last_login in receivers, "Recorder isn't connected"
+    assert all(
+        getattr(receiver, "__name__", "") != "update_last_login"
+        for receiver in receivers
+    ), "Django's update_last_login is still connected"
+
+
+@pytest.mark.django_db
+@override_settings(LAST_LOGIN_FLUSH_SIZE=10, LAST_LOGIN_FLUSH_SECONDS=60)
+def test_logins_buffered_and_flushed_in_bulk(
+    users, django_assert_num_queries,
+):
+    """Test that logins are written with one bulk update."""
+    recorder = LastLoginRecorder()
+
+    with django_assert_num_queries(0):
+        recorder.record(users["user"])
+        recorder.record(users["admin"])
+
+    assert Account.objects.get(pk=users["user"].pk).last_login is None, \
+        "Last login is written before the flush"
+    assert recorder.get(users["user"].pk) == users["user"].last_login, \
+        "Buffered last login isn't returned"
+
+    with django_assert_num_queries(1):
+        assert recorder.flush() == 2, "Wrong number of flushed accounts"
+
+    for user in users.values():
+        assert Account.objects.get(pk=user.pk).last_login == user.last_login
+    assert recorder.get(users["user"].pk) is None, "Buffer isn't emptied"
+
+
+@pytest.mark.django_db
+@override_settings(LAST_LOGIN_FLUSH_SIZE=2, LAST_LOGIN_FLUSH_SECONDS=60)
+def test_flush_when_buffer_full(users):
+    """Test that a full buffer is flushed on the next login."""
+    recorder = LastLoginRecorder()
+    recorder.record(users["user"])
+
+    assert not recorder.is_due(), "Buffer shouldn't be due yet"
+
+    recorder.record(users["admin"])
+
+    assert Account.objects.get(pk=users["admin"].pk).last_login is not None, \
+        "Full buffer isn't flushed"
+
+
+@pytest.mark.django_db
+def test_get_last_login_prefers_buffer(users, mocker):
+    """Test that the profile last login comes from the buffer."""
+    buffered = mocker.patch(
+        "app.account.last_login.last_login_recorder.get",
+    )
+
+    assert get_last_login(users["user"]) == buffered.return_value, \
+        "Buffered value should be preferred"
+
+    buffered.return_value = None
+    assert get_last_login(users["user"]) == users["user"].last_login, \
+        "Stored value should be used without a buffered one"
+
+
+@pytest.mark.django_db
+@override_settings(LAST_LOGIN_FLUSH_SIZE=1)
+def test_flush_if_due_logs_database_error(users, mocker, caplog):
+    """Test that a failed flush is logged and the logins are kept."""
+    recorder = LastLoginRecorder()
+    recorder._pending[users["user"].pk] = users["user"].date_joined
+    recorder._oldest = 0
+    mocker.patch.object(
+        Account.objects, "bulk_update", side_effect=DatabaseError,
+    )
+
+    with caplog.at_level(logging.ERROR, logger="app.account.last_login"):
+        recorder.flush_if_due()
+
+    assert "Failed to flush buffered last logins" in caplog.text
+    assert recorder.get(users["user"].pk) == users["user"].date_joined, \
+        "Failed logins should be kept for the next flush"
+
+
+@pytest.mark.django_db
+@override_settings(LAST_LOGIN_FLUSH_SIZE=500, LAST_LOGIN_FLUSH_SECONDS=60)
+def test_reset_token_survives_flush(users):
+    """Test that flushing a buffered login keeps a reset token valid."""
+    last_login_recorder.record(Account.objects.get(pk=users["user"].pk))
+    account = Account.objects.get(pk=users["user"].pk)
+    _, token = generate_password_reset_uidb_and_token(account)
+
+    last_login_recorder.flush()
+
+    assert default_token_generator.check_token(
+        Account.objects.get(pk=account.pk), token,
+    ), "Flushed last login invalidates the reset token"
@@ -66,3 +66,28 @@ class TestAccountManager:
         assert (
             superuser.is_superuser is True
         ), "Superusers should have superuser status"
+
+    def test_canonicalize_email(self, account_manager):
+        """Test that the canonical email is lowercased and stripped."""
+        assert (
+            account_manager.canonicalize_email(" User@Test.COM ")
+            == "user@test.com"
+        ), "Canonical email should be lowercased"
+        assert account_manager.canonicalize_email(None) == "", \
+            "Missing email should give an empty string"
+
+    @pytest.mark.django_db
+    def test_filter_by_email_ignores_case(
+        self, account_manager, test_password,
+    ):
+        """Test that accounts are found by email in any letter case."""
+        user = account_manager.create_user(
+            email="Mixed.Case@Test.com", password=test_password,
+        )
+
+        assert (
+            user.email_canonical == "mixed.case@test.com"
+        ), "Canonical email should be stored on save"
+        assert list(
+            account_manager.filter_by_email("MIXED.CASE@test.com")
+        ) == [user], "Account should be found ignoring case"
@@ -5,6 +5,7 @@ from django.core.exceptions import ValidationError
 from django.utils.timezone import now
 
 from app.account.models import Account
+from app.services.models_functions import unique_slugify
 
 
 class TestAccountModel:
@@ -152,3 +153,75 @@ class TestAccountModel:
             Account.objects.create_user(
                 email="user1@test.com", username="user2", password="password123"
             )
+
+    def test_email_canonical_unique(self, db):
+        """Test that emails differing only in case can't coexist."""
+        Account.objects.create_user(
+            email="user1@test.com", username="user1", password="password123"
+        )
+
+        with pytest.raises(
+            IntegrityError,
+            match="UNIQUE constraint failed: app_account_account.email",
+        ):
+            Account.objects.create_user(
+                email="USER1@test.com", username="user2", password="password123"
+            )
+
+    def test_email_canonical_updated_with_email(self, db):
+        """Test that saving only the email also updates its canonical form."""
+        account = Account.objects.create_user(
+            email="user1@test.com", username="user1", password="password123"
+        )
+        account.email = "New@Test.com"
+        account.save(update_fields=["email"])
+
+        account.refresh_from_db()
+        assert (
+            account.email_canonical == "new@test.com"
+        ), "Canonical email should follow the email"
+
+    def test_colliding_usernames_get_unique_slugs(self, db):
+        """Test that accounts with the same username get distinct slugs."""
+        slugs = {
+            Account.objects.create_user(
+                email=f"user{index}@test.com",
+                username="Test User",
+                password="password123",
+            ).slug
+            for index in range(5)
+        }
+
+        assert len(slugs) == 5, "Every account should get its own slug"
+        assert "test-user" in slugs, "The first account should get the base"
+
+    def test_unique_slugify_single_query(
+        self, db, django_assert_num_queries,
+    ):
+        """Test that a free slug is found with one query."""
+        Account.objects.create_user(
+            email="user1@test.com", username="testuser", password="password123"
+        )
+        account = Account(email="user2@test.com", username="testuser")
+
+        with django_assert_num_queries(1):
+            slug = unique_slugify(account, account.username)
+
+        assert slug.startswith("testuser-"), "Taken base slug gets a suffix"
+
+    def test_save_retries_taken_slug(self, db, mocker):
+        """Test that save generates a new slug if a concurrent one won."""
+        Account.objects.create_user(
+            email="user1@test.com", username="testuser", password="password123"
+        )
+        mocker.patch(
+            "app.account.models.unique_slugify",
+            side_effect=["testuser", "testuser-retried"],
+        )
+
+        account = Account.objects.create_user(
+            email="user2@test.com", username="testuser", password="password123"
+        )
+
+        assert account.slug == "testuser-retried", "Slug should be retried"
+        assert Account.objects.filter(slug="testuser").count() == 1
@@ -0,0 +1,184 @@
+import io
+
+import pytest
+from celery.exceptions import Retry
+from django.core import mail
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from app.account import tasks
+from app.account.dispatch import TaskDispatchError
+from app.account.models import Account, Newsletter, NewsletterChunk
+from app.account.tasks import fan_out_newsletter, send_newsletter_chunk
+from app.services import tasks_funtions
+
+
+@pytest.fixture
+def subscribers(db):
+    return [
+        Account.objects.create_user(
+            email=f"user{index}@test.com",
+            username=f"user{index}",
+            subscribe=index != 2,
+        )
+        for index in range(5)
+    ]
+
+
+@pytest.fixture
+def newsletter(db):
+    return Newsletter.objects.create(subject="News", body="Hello readers")
+
+
+@pytest.mark.django_db
+def test_fan_out_pages_subscribers(
+    settings, mocker, subscribers, newsletter,
+    django_capture_on_commit_callbacks,
+):
+    """Test that subscribers are split into keyset chunks."""
+    settings.NEWSLETTER_CHUNK_SIZE = 2
+    mock_dispatch = mocker.patch("app.account.tasks.dispatch_task")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert fan_out_newsletter(newsletter.pk) == 2
+
+    chunks = list(newsletter.chunks.order_by("first_pk"))
+    assert [(chunk.first_pk, chunk.last_pk) for chunk in chunks] == [
+        (subscribers[0].pk, subscribers[1].pk),
+        (subscribers[3].pk, subscribers[4].pk),
+    ]
+    assert mock_dispatch.call_count == 2
+    newsletter.refresh_from_db()
+    assert newsletter.last_enqueued_pk == subscribers[4].pk
+    assert newsletter.fanned_out_at is not None
+
+
+@pytest.mark.django_db
+def test_fan_out_resumes_from_checkpoint(
+    mocker, subscribers, newsletter, django_capture_on_commit_callbacks,
+):
+    """Test that a resumed fan-out queues only what is left."""
+    pending = NewsletterChunk.objects.create(
+        newsletter=newsletter,
+        first_pk=subscribers[0].pk,
+        last_pk=subscribers[1].pk,
+    )
+    newsletter.last_enqueued_pk = subscribers[3].pk
+    newsletter.save()
+    mock_dispatch = mocker.patch("app.account.tasks.dispatch_task")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert fan_out_newsletter(newsletter.pk) == 2
+
+    assert mock_dispatch.call_args_list[0] == mocker.call(
+        send_newsletter_chunk, pending.pk,
+    )
+    last_chunk = newsletter.chunks.latest("pk")
+    assert last_chunk.first_pk == last_chunk.last_pk == subscribers[4].pk
+
+
+@pytest.mark.django_db
+def test_dropped_chunk_fails_fan_out(
+    settings, mocker, subscribers, newsletter,
+    django_capture_on_commit_callbacks,
+):
+    """Test that a dropped chunk fails loudly and stays pending."""
+    settings.NEWSLETTER_CHUNK_SIZE = 2
+    mocker.patch("app.account.tasks.dispatch_task", return_value=False)
+
+    with pytest.raises(TaskDispatchError):
+        with django_capture_on_commit_callbacks(execute=True):
+            fan_out_newsletter(newsletter.pk)
+
+    assert set(newsletter.chunks.values_list("status", flat=True)) == {
+        NewsletterChunk.Status.PENDING,
+    }, "Resume should queue the dropped chunks"
+
+
+@pytest.mark.django_db
+def test_dropped_fan_out_fails_command(mocker, newsletter):
+    """Test that the command reports a dropped fan-out."""
+    mocker.patch(
+        "app.account.management.commands.send_newsletter.dispatch_task",
+        return_value=False,
+    )
+
+    with pytest.raises(CommandError, match=f"--resume {newsletter.pk}"):
+        call_command("send_newsletter", resume=newsletter.pk)
+
+
+@pytest.mark.django_db
+def test_send_newsletter_chunk(mocker, subscribers, newsletter):
+    """Test that a chunk renders once and reuses one connection."""
+    chunk = NewsletterChunk.objects.create(
+        newsletter=newsletter,
+        first_pk=subscribers[0].pk,
+        last_pk=subscribers[3].pk,
+    )
+    render = mocker.spy(tasks, "render_email")
+    get_connection = mocker.spy(tasks_funtions, "get_connection")
+
+    assert send_newsletter_chunk(chunk.pk) == 3
+    assert send_newsletter_chunk(chunk.pk) == 0, "Chunk is sent once"
+
+    assert render.call_count == 1
+    assert get_connection.call_count == 1
+    assert sorted(message.to[0] for message in mail.outbox) == [
+        "user0@test.com",
+        "user1@test.com",
+        "user3@test.com",
+    ]
+    assert "Hello readers" in mail.outbox[0].body
+    chunk.refresh_from_db()
+    assert chunk.status == NewsletterChunk.Status.SENT
+    assert chunk.worker, "Worker should be recorded"
+
+
+@pytest.mark.django_db
+def test_send_newsletter_report(subscribers, newsletter):
+    """Test that the command prints the throughput per worker."""
+    chunk = NewsletterChunk.objects.create(
+        newsletter=newsletter,
+        first_pk=subscribers[0].pk,
+        last_pk=subscribers[4].pk,
+    )
+    send_newsletter_chunk(chunk.pk)
+    stdout = io.StringIO()
+
+    call_command("send_newsletter", report=newsletter.pk, stdout=stdout)
+
+    output = stdout.getvalue()
+    assert "News: 4 sent, 0 chunks pending" in output
+    assert "emails/s" in output
+
+
+@pytest.mark.django_db
+def test_failed_chunk_released_and_retried(
+    mocker, settings, subscribers, newsletter,
+):
+    """Test that a chunk failing after its claim is released and retried."""
+    settings.NEWSLETTER_CHUNK_RETRY_SECONDS = 5
+    chunk = NewsletterChunk.objects.create(
+        newsletter=newsletter,
+        first_pk=subscribers[0].pk,
+        last_pk=subscribers[1].pk,
+    )
+    error = OSError("Connection lost")
+    mocker.patch(
+        "app.account.tasks.send_messages_over_connection",
+        side_effect=[error, (2, 1.0)],
+    )
+    retry = mocker.patch.object(
+        send_newsletter_chunk, "retry", side_effect=Retry(),
+    )
+
+    with pytest.raises(Retry):
+        send_newsletter_chunk(chunk.pk)
+
+    retry.assert_called_once_with(exc=error, countdown=5, max_retries=3)
+    chunk.refresh_from_db()
+    assert chunk.status == NewsletterChunk.Status.PENDING, \
+        "Failed chunk should be released"
+    assert send_newsletter_chunk(chunk.pk) == 2
+    chunk.refresh_from_db()
+    assert chunk.status == NewsletterChunk.Status.SENT
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+
+from app.account import tasks
+from app.services.serializer_functions import compact_dumps, compact_loads
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        ([list(range(1000, 3000, 3))], {}, {"callbacks": None}),
+        [[5, -3, 70000, 2, 2] * 4, [True] * 20, ["a"] * 20],
+        {"pks": list(range(20)), "nested": [{"pks": list(range(16))}]},
+        [1, 2, 3],
+        "text",
+        None,
+    ],
+)
+def test_compact_round_trip(value):
+    """Test that values come back as with the JSON serializer."""
+    assert compact_loads(compact_dumps(value)) == json.loads(
+        json.dumps(value),
+    )
+
+
+def test_compact_smaller_than_json():
+    """Test that key lists take a fraction of their JSON size."""
+    pks = list(range(100000, 110000))
+
+    assert len(compact_dumps(pks)) * 50 < len(json.dumps(pks))
+
+
+def test_compact_message_through_worker():
+    """Test that a worker accepts tasks sent with the serializer."""
+    app = Celery(
+        "serializer",
+        set_as_current=False,
+        broker="memory://",
+        backend="cache+memory://",
+    )
+    app.conf.update(
+        accept_content=["json", "compact"],
+        broker_transport_options={"polling_interval": 0.005},
+        task_default_queue="serializer",
+    )
+
+    @app.task(name="serializer.total", serializer="compact")
+    def total(pks):
+        return sum(pks)
+
+    with start_worker(app, pool="threads", perform_ping_check=False):
+        assert total.delay(list(range(100))).get(timeout=10) == 4950
+
+
+def test_account_tasks_ignore_results():
+    """Test that no account task stores its result."""
+    account_tasks = [
+        task
+        for name, task in tasks.celery_app.tasks.items()
+        if name.startswith("app.account.tasks.")
+    ]
+
+    assert account_tasks
+    assert all(task.ignore_result for task in account_tasks)
+    assert tasks.send_confirmation_emails.serializer == "compact"
@@ -0,0 +1,83 @@
+import pytest
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+
+from app.account.sessions import SessionStore
+from app.tests.conftest import users
+
+SESSION_SETTINGS = {
+    "SESSION_ENGINE": "app.account.sessions",
+    "SESSION_EXPIRE_AT_BROWSER_CLOSE": True,
+    "SESSION_WRITE_BEHIND_SECONDS": 300,
+    "CACHES": {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "session-tests",
+        },
+    },
+}
+
+
+@pytest.fixture
+def session_settings():
+    with override_settings(**SESSION_SETTINGS):
+        cache.clear()
+        yield
+        cache.clear()
+
+
+def login(client, remember_me):
+    data = {"email": "user@test.com", "password": "test_password"}
+    if remember_me:
+        data["remember_me"] = "on"
+    return client.post(reverse("account:login"), data)
+
+
+@pytest.mark.django_db
+def test_short_session_stays_in_cache(client, users, session_settings):
+    """Test that a login without "Remember me" never writes the DB."""
+    response = login(client, remember_me=False)
+
+    assert response.status_code == 302, "Login failed"
+    assert not Session.objects.exists(), "Short session is stored in the DB"
+    assert client.session.get_expire_at_browser_close(), \
+        "Short session should expire at browser close"
+    assert client.session["_auth_user_id"] == str(users["user"].pk), \
+        "Session isn't readable from the cache"
+
+
+@pytest.mark.django_db
+def test_remember_me_session_is_flushed(client, users, session_settings):
+    """Test that a "Remember me" session survives a cache eviction."""
+    login(client, remember_me=True)
+    session_key = client.session.session_key
+
+    assert Session.objects.filter(session_key=session_key).exists(), \
+        "Persistent session isn't stored in the DB"
+
+    cache.clear()
+    assert SessionStore(session_key)["_auth_user_id"] == str(
+        users["user"].pk,
+    ), "Session isn't reloaded from the DB"
+
+
+@pytest.mark.django_db
+def test_write_behind_skips_db_within_interval(
+    users, session_settings, django_assert_num_queries,
+):
+    """Test that repeated saves within the interval don't hit the DB."""
+    session = SessionStore()
+    session.set_expiry(3600)
+    session["counter"] = 1
+    session.create()
+    session.save()
+
+    session = SessionStore(session.session_key)
+    session["counter"] = 2
+    with django_assert_num_queries(0):
+        session.save()
+
+    assert SessionStore(session.session_key)["counter"] == 2, \
+        "Latest data isn't read from the cache"
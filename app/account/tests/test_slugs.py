@@ -0,0 +1,112 @@
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+
+from app.account.models import Account, AccountSlugRedirect
+from app.account.slugs import account_urls, get_account_pk, get_account_url
+from app.tests.conftest import users
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test-slugs",
+    },
+}
+
+
+@pytest.fixture
+def slug_caches():
+    with override_settings(CACHES=LOCMEM_CACHES):
+        account_urls.clear()
+        yield
+        account_urls.clear()
+
+
+@pytest.mark.django_db
+def test_get_account_pk_is_cached(
+    slug_caches, users, django_assert_num_queries,
+):
+    """Test that the slug is resolved with one query, then from cache."""
+    user = users["user"]
+
+    with django_assert_num_queries(1):
+        assert get_account_pk(user.slug) == user.pk
+    with django_assert_num_queries(0):
+        assert get_account_pk(user.slug) == user.pk
+
+    assert get_account_pk("missing-slug") is None
+
+
+def test_get_account_url_is_memoized(mocker):
+    """Test that an account URL is reversed once."""
+    account_urls.clear()
+    reverse_mock = mocker.patch(
+        "app.account.slugs.reverse", return_value="/account/profile/a/",
+    )
+
+    for _ in range(3):
+        assert (
+            get_account_url("account:profile_detail", "a")
+            == "/account/profile/a/"
+        )
+
+    reverse_mock.assert_called_once_with(
+        "account:profile_detail", args=("a",),
+    )
+    account_urls.clear()
+
+
+@pytest.mark.django_db
+def test_slug_change_redirects_old_slug(slug_caches, users):
+    """Test that a changed slug is recorded and dropped from the caches."""
+    user = Account.objects.get(pk=users["user"].pk)
+    old_slug = user.slug
+    assert get_account_pk(old_slug) == user.pk
+
+    user.slug = "renamed-user"
+    user.save()
+
+    redirect = AccountSlugRedirect.objects.get(old_slug=old_slug)
+    assert redirect.account == user, "Old slug should point to the account"
+    assert get_account_pk(old_slug) is None, "Old slug should be forgotten"
+    assert user.get_absolute_url() == "/account/profile/renamed-user/"
+
+
+@pytest.mark.django_db
+def test_profile_detail_redirects_old_slug(slug_caches, client, users):
+    """Test that the profile view redirects an old slug permanently."""
+    user = Account.objects.get(pk=users["user"].pk)
+    old_slug = user.slug
+    user.slug = "renamed-user"
+    user.save()
+    client.force_login(user)
+
+    response = client.get(
+        reverse("account:profile_detail", args=(old_slug,)),
+    )
+
+    assert response.status_code == 301
+    assert response.url == "/account/profile/renamed-user/"
+    assert client.get(
+        reverse("account:profile_detail", args=("unknown-slug",)),
+    ).status_code == 404
+
+
+@pytest.mark.django_db
+def test_profile_detail_cached_without_queries(
+    slug_caches, rf, users, django_assert_num_queries,
+):
+    """Test that a cached profile is rendered without queries."""
+    from app.account.views import AccountProfileDetailView
+
+    user = users["user"]
+    request = rf.get(reverse("account:profile_detail", args=(user.slug,)))
+    request.user = user
+    view = AccountProfileDetailView.as_view()
+    view(request, slug=user.slug).render()
+
+    with django_assert_num_queries(0):
+        response = view(request, slug=user.slug)
+        response.render()
+
+    assert response.context_data["profile"] == user
@@ -0,0 +1,76 @@
+import multiprocessing
+from urllib.request import urlopen
+
+import pytest
+from celery.contrib.testing.worker import start_worker
+
+from app.myblog.task_metrics import TaskMetrics, get_task_metrics
+from app.services.metrics_functions import SharedHistograms
+from app.tests.conftest import metrics_app
+
+
+def observe_in_child(histograms):
+    histograms.observe("task", 0.2)
+
+
+def test_histograms_shared_with_forked_process():
+    """Test that values recorded in a forked process are visible."""
+    histograms = SharedHistograms(["task"], (0.1, 1))
+    histograms.observe("task", 0.05)
+    histograms.observe("unknown", 0.05)
+
+    process = multiprocessing.get_context("fork").Process(
+        target=observe_in_child, args=(histograms,),
+    )
+    process.start()
+    process.join()
+
+    counts, total = histograms.snapshot()["task"]
+    assert counts == [1, 2, 2], "Buckets should be cumulative"
+    assert total == pytest.approx(0.25)
+
+
+def test_queue_depth(metrics_app):
+    """Test that queue depth counts the waiting messages."""
+    app, sleep, _ = metrics_app("depth")
+    for _ in range(3):
+        sleep.delay(0)
+
+    assert TaskMetrics(app, []).queue_depths() == {"depth": 3}
+    app.control.purge()
+
+
+def test_worker_serves_task_metrics(metrics_app):
+    """Test that the worker records and serves wait, runtime, failures."""
+    app, sleep, fail = metrics_app("metrics")
+
+    with start_worker(app, pool="threads", perform_ping_check=False):
+        results = [sleep.delay(0.03) for _ in range(2)]
+        with pytest.raises(ValueError):
+            fail.delay().get(timeout=10)
+        for result in results:
+            result.get(timeout=10)
+        metrics = get_task_metrics(app)
+        metrics.serve(0)
+        port = metrics.server.server_address[1]
+        with urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            content_type = response.headers["Content-Type"]
+            body = response.read().decode()
+        metrics.close()
+
+    assert content_type.startswith("text/plain; version=0.0.4")
+    lines = body.splitlines()
+    assert "# TYPE celery_task_wait_seconds histogram" in lines
+    assert 'celery_task_wait_seconds_count{task="metrics.sleep"} 2' in lines
+    assert 'celery_task_runtime_seconds_count{task="metrics.fail"} 1' in lines
+    assert (
+        'celery_task_runtime_seconds_bucket{task="metrics.sleep",le="0.025"} 0'
+        in lines
+    ), "Sleeping tasks should run longer than 25 ms"
+    assert (
+        'celery_task_runtime_seconds_bucket{task="metrics.sleep",le="0.05"} 2'
+        in lines
+    )
+    assert 'celery_task_failures_total{task="metrics.sleep"} 0' in lines
+    assert 'celery_task_failures_total{task="metrics.fail"} 1' in lines
+    assert 'celery_queue_depth{queue="metrics"} 0' in lines
@@ -0,0 +1,71 @@
+import time
+from contextlib import ExitStack
+
+import pytest
+from celery.contrib.testing.worker import start_worker
+from django.conf import settings
+
+from app.myblog.celery import app as celery_app
+from app.tests.conftest import routing_app
+
+RESET_TASK = "app.account.tasks.dispatch_email_outbox"
+BULK_TASK = "app.account.tasks.send_newsletter_chunk"
+
+
+def reset_latencies(app, reset, bulk, queues):
+    """Measure reset task latency while a bulk job is queued."""
+    with ExitStack() as stack:
+        workers = [
+            stack.enter_context(start_worker(
+                app,
+                pool="threads",
+                queues=[queue],
+                perform_ping_check=False,
+                hostname=f"{queue}@test",
+            ))
+            for queue in queues
+        ]
+        bulk_results = [bulk.delay() for _ in range(20)]
+        reset_results = [
+            reset.delay(time.perf_counter()) for _ in range(3)
+        ]
+        latencies = [result.get(timeout=30) for result in reset_results]
+        for result in bulk_results:
+            result.get(timeout=30)
+    return workers, latencies
+
+
+@pytest.mark.parametrize(
+    ("task", "queue"),
+    [
+        (RESET_TASK, "interactive"),
+        ("app.account.tasks.send_reset_password_email", "interactive"),
+        ("app.account.tasks.send_confirmation_reminders", "bulk"),
+        ("app.account.tasks.send_confirmation_emails", "bulk"),
+        ("app.account.tasks.fan_out_newsletter", "bulk"),
+        (BULK_TASK, "bulk"),
+        ("app.account.tasks.unknown", "default"),
+    ],
+)
+def test_task_routes(task, queue):
+    """Test that tasks are routed to their queue."""
+    assert celery_app.amqp.router.route({}, task)["queue"].name == queue
+
+
+def test_reset_not_delayed_by_bulk_job(routing_app):
+    """Test that a bulk job doesn't hold up password reset emails."""
+    routes = {
+        "routing.reset": settings.CELERY_TASK_ROUTES[RESET_TASK],
+        "routing.bulk": settings.CELERY_TASK_ROUTES[BULK_TASK],
+    }
+    workers, routed = reset_latencies(
+        *routing_app(routes), ["interactive", "bulk"],
+    )
+    _, shared = reset_latencies(*routing_app({}), ["default"])
+
+    assert [
+        (worker.concurrency, worker.prefetch_multiplier)
+        for worker in workers
+    ] == [(4, 1), (2, 16)], "Worker should take the settings of its queue"
+    assert max(routed) < 0.25, "Reset should skip the bulk backlog"
+    assert min(shared) > 0.5, "One queue should hold reset behind bulk"
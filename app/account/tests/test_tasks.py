@@ -1,46 +1,328 @@
+from datetime import timedelta
+from io import StringIO
+
 import pytest
-from app.account.tasks import send_reset_password_email
-from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.utils.timezone import now
 
+from app.account.dispatch import TaskDispatchError
+from app.account.models import Account, OutboxEmail
+from app.account.tasks import (
+    dispatch_email_outbox,
+    queue_reset_password_email,
+    send_confirmation_emails,
+    send_confirmation_reminders,
+    send_reset_password_email,
+)
+from app.services import tasks_funtions
+from app.tests.conftest import users
 
 class TestSendResetPasswordEmailTask:
-    def test_send_reset_password_email(self, mocker):
+    @pytest.mark.django_db
+    def test_send_reset_password_email(
+        self, users, mocker, django_capture_on_commit_callbacks,
+    ):
         """Test the send_reset_password_email Celery task."""
-        mock_user = mocker.MagicMock()
-        mock_user.email = "test@test.com"
-        mock_user_get = mocker.patch("app.account.tasks.Account.objects.get")
-        mock_user_get.return_value = mock_user
+        mock_dispatch = mocker.patch("app.account.tasks.dispatch_task")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            send_reset_password_email(users["user"].pk)
+
+        email = OutboxEmail.objects.get()
+        assert email.kind == OutboxEmail.Kind.PASSWORD_RESET
+        assert email.account_id == users["user"].pk
+        mock_dispatch.assert_called_once_with(dispatch_email_outbox)
+
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "test-reset-dedupe",
+    },
+}
+
+
+class TestEmailOutbox:
+    @pytest.fixture
+    def dedupe(self, settings):
+        settings.CACHES = LOCMEM_CACHES
+        yield
+        cache.clear()
+
+    @pytest.mark.django_db
+    def test_repeated_requests_dropped(self, dedupe, users):
+        """Test that repeated requests of an account queue one email."""
+        user, admin = users["user"], users["admin"]
+
+        results = [
+            queue_reset_password_email(account.pk)
+            for account in (user, user, admin, user)
+        ]
+
+        assert results == [True, False, True, False]
+        assert OutboxEmail.objects.count() == 2
+
+    @pytest.mark.django_db
+    def test_failed_request_not_deduped(self, dedupe, users, mocker):
+        """Test that a request failing to queue doesn't block a retry."""
+        mocker.patch.object(
+            OutboxEmail.objects, "create", side_effect=DatabaseError,
+        )
+        with pytest.raises(DatabaseError):
+            queue_reset_password_email(users["user"].pk)
+        mocker.stopall()
+
+        assert queue_reset_password_email(users["user"].pk), \
+            "Retry after a failure is dropped"
+
+    @pytest.mark.django_db
+    def test_outbox_dispatched_after_commit(
+        self, users, mocker, django_capture_on_commit_callbacks,
+    ):
+        """Test that queuing an email dispatches the outbox on commit."""
+        mock_dispatch = mocker.patch("app.account.tasks.dispatch_task")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            queue_reset_password_email(users["user"].pk)
+            assert not mock_dispatch.called, "Dispatch should wait commit"
+
+        mock_dispatch.assert_called_once_with(dispatch_email_outbox)
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("skip_locked", [True, False])
+    def test_outbox_dispatched_over_one_connection(
+        self, users, mocker, skip_locked,
+    ):
+        """Test that pending emails are claimed and sent in a batch."""
+        mocker.patch.object(
+            connection.features,
+            "has_select_for_update_skip_locked",
+            skip_locked,
+        )
+        get_connection = mocker.spy(tasks_funtions, "get_connection")
+        queue_reset_password_email(users["user"].pk)
+        queue_reset_password_email(users["admin"].pk)
+        OutboxEmail.objects.create(
+            kind=OutboxEmail.Kind.CONFIRMATION,
+            account=users["user"],
+        )
+
+        assert dispatch_email_outbox() == 3
+
+        assert get_connection.call_count == 1, "One connection per batch"
+        assert sorted(
+            (message.to[0], message.subject) for message in mail.outbox
+        ) == [
+            ("admin@test.com", "Myblog Password Reset"),
+            ("user@test.com", "Myblog Email Confirmation"),
+            ("user@test.com", "Myblog Password Reset"),
+        ]
+        assert not OutboxEmail.objects.filter(sent_at__isnull=True).exists()
+        assert dispatch_email_outbox() == 0, "Sent emails aren't sent again"
+
+    @pytest.mark.django_db
+    def test_outbox_batches(self, users, settings):
+        """Test that the dispatcher sends until the outbox is empty."""
+        settings.EMAIL_OUTBOX_BATCH_SIZE = 1
+        for account in (users["user"], users["admin"]):
+            queue_reset_password_email(account.pk)
+
+        assert dispatch_email_outbox() == 2
+        assert len(mail.outbox) == 2
+
+    @pytest.mark.django_db
+    def test_failed_email_retried_later(self, users, settings, mocker):
+        """Test that a failed batch is retried after the retry delay."""
+        send = mocker.patch(
+            "app.account.tasks.send_messages_over_connection",
+            side_effect=OSError("Connection refused"),
+        )
+        queue_reset_password_email(users["user"].pk)
+
+        assert dispatch_email_outbox() == 1
+        email = OutboxEmail.objects.get()
+        assert email.attempts == 1
+        assert email.sent_at is None
+        assert dispatch_email_outbox() == 0, "Retry should wait"
+
+        settings.EMAIL_OUTBOX_RETRY_SECONDS = 0
+        send.side_effect = None
+        send.return_value = (1, 1.0)
+
+        assert dispatch_email_outbox() == 1
+        email.refresh_from_db()
+        assert email.attempts == 2
+        assert email.sent_at is not None
+
+    @pytest.mark.django_db
+    def test_failed_attempts_logged(self, users, settings, mocker, caplog):
+        """Test that every failure counts and exhausted emails are logged."""
+        settings.EMAIL_OUTBOX_MAX_ATTEMPTS = 2
+        settings.EMAIL_OUTBOX_RETRY_SECONDS = 0
+        mocker.patch(
+            "app.account.tasks.build_reset_message",
+            side_effect=ValueError("Broken template"),
+        )
+        queue_reset_password_email(users["user"].pk)
+
+        assert dispatch_email_outbox() == 1
+        assert dispatch_email_outbox() == 1
+        assert dispatch_email_outbox() == 0, "Exhausted email is given up"
 
-        mock_generate_token = mocker.patch(
-            "app.account.tasks.generate_password_reset_uidb_and_token"
+        email = OutboxEmail.objects.get()
+        assert email.attempts == 2
+        assert f"Gave up on outbox emails [{email.pk}]" in caplog.text
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize("skip_locked", [True, False])
+    def test_emails_sent_outside_claim_transaction(
+        self, users, mocker, skip_locked,
+    ):
+        """Test that no transaction is open while the emails are sent."""
+        mocker.patch.object(
+            connection.features,
+            "has_select_for_update_skip_locked",
+            skip_locked,
         )
-        mock_generate_token.return_value = ("mock_uidb64", "mock_token")
+        depths = []
+
+        def send(messages):
+            depths.append(len(connection.atomic_blocks))
+            return len(list(messages)), 1.0
 
-        mock_prepare_email = mocker.patch(
-            "app.account.tasks.prepare_password_reset_email_letter"
+        mocker.patch(
+            "app.account.tasks.send_messages_over_connection",
+            side_effect=send,
         )
-        mock_prepare_email.return_value = "This is a mock email message"
+        queue_reset_password_email(users["user"].pk)
+        depth = len(connection.atomic_blocks)
 
-        mock_send_mail = mocker.patch("app.account.tasks.send_mail")
+        assert dispatch_email_outbox() == 1
 
-        # Вызываем задачу
-        send_reset_password_email("test@test.com")
+        assert depths == [depth], "Claim transaction should be committed"
+        assert OutboxEmail.objects.get().sent_at is not None
 
-        mock_user_get.assert_called_once_with(email="test@test.com")
+    @pytest.mark.django_db
+    def test_dispatch_outbox_command(self, users):
+        """Test that the command sends pending emails once."""
+        queue_reset_password_email(users["user"].pk)
+        out = StringIO()
 
-        mock_generate_token.assert_called_once_with(mock_user)
+        call_command("dispatch_outbox", once=True, stdout=out)
 
-        mock_prepare_email.assert_called_once_with(
-            user=mock_user,
-            email="test@test.com",
-            uidb64="mock_uidb64",
-            token="mock_token",
-            template_name="account/password_reset_email.html",
+        assert out.getvalue() == "1 outbox emails dispatched\n"
+        assert len(mail.outbox) == 1
+
+    @pytest.mark.django_db
+    def test_confirmed_account_skipped(self, users):
+        """Test that confirmed accounts don't get a confirmation link."""
+        users["admin"].confirm_email = True
+        users["admin"].save()
+        OutboxEmail.objects.create(
+            kind=OutboxEmail.Kind.CONFIRMATION,
+            account=users["admin"],
         )
 
-        mock_send_mail.assert_called_once_with(
-            subject="Myblog Password Reset",
-            message="This is a mock email message",
-            from_email=settings.EMAIL_HOST_USER,
-            recipient_list=["test@test.com"],
+        assert dispatch_email_outbox() == 1
+
+        assert mail.outbox == []
+        assert OutboxEmail.objects.get().sent_at is not None
+
+
+class TestConfirmationEmails:
+    @pytest.fixture(autouse=True)
+    def verification(self, settings):
+        settings.ACCOUNT_EMAIL_VERIFICATION = "mandatory"
+
+    @pytest.mark.django_db
+    def test_send_confirmation_emails(self, users, mocker):
+        """Test that unconfirmed accounts get links over one connection."""
+        users["admin"].confirm_email = True
+        users["admin"].save()
+        get_connection = mocker.spy(tasks_funtions, "get_connection")
+
+        result = send_confirmation_emails(
+            [users["user"].pk, users["admin"].pk],
         )
+
+        assert result["sent"] == 1, "Confirmed accounts should be skipped"
+        assert get_connection.call_count == 1
+        assert mail.outbox[0].to == ["user@test.com"]
+        assert "/account/confirm-email/" in mail.outbox[0].body
+
+    @pytest.mark.django_db
+    def test_send_confirmation_reminders(self, settings, users, mocker):
+        """Test that reminders page accounts that joined N days ago."""
+        settings.EMAIL_CONFIRMATION_REMINDER_DAYS = (1,)
+        settings.EMAIL_CONFIRMATION_BATCH_SIZE = 1
+        Account.objects.update(date_joined=now() - timedelta(days=1))
+        mock_dispatch = mocker.patch("app.account.tasks.dispatch_task")
+
+        assert send_confirmation_reminders() == 2
+
+        assert mock_dispatch.call_args_list == [
+            mocker.call(send_confirmation_emails, [users["user"].pk]),
+            mocker.call(send_confirmation_emails, [users["admin"].pk]),
+        ]
+
+    @pytest.mark.django_db
+    def test_no_reminders_without_verification(
+        self, settings, users, mocker,
+    ):
+        """Test that nobody is reminded when verification is off."""
+        settings.ACCOUNT_EMAIL_VERIFICATION = "none"
+        settings.EMAIL_CONFIRMATION_REMINDER_DAYS = (1,)
+        Account.objects.update(date_joined=now() - timedelta(days=2))
+        mock_dispatch = mocker.patch("app.account.tasks.dispatch_task")
+
+        assert send_confirmation_reminders() == 0
+        assert not mock_dispatch.called
+
+    @pytest.mark.django_db
+    def test_reminders_catch_up_once(self, settings, users, mocker):
+        """Test that a missed reminder is sent later, but only once."""
+        settings.EMAIL_CONFIRMATION_REMINDER_DAYS = (1, 7)
+        settings.EMAIL_CONFIRMATION_REMINDER_WINDOW_DAYS = 3
+        user, admin = users["user"], users["admin"]
+        Account.objects.filter(pk=user.pk).update(
+            date_joined=now() - timedelta(days=2),
+        )
+        Account.objects.filter(pk=admin.pk).update(
+            date_joined=now() - timedelta(days=8),
+            confirmation_reminded_at=now() - timedelta(days=6),
+        )
+        mock_dispatch = mocker.patch("app.account.tasks.dispatch_task")
+
+        assert send_confirmation_reminders() == 1
+        mock_dispatch.assert_called_once_with(
+            send_confirmation_emails, [user.pk, admin.pk],
+        )
+
+        send_confirmation_emails([user.pk, admin.pk])
+
+        assert len(mail.outbox) == 2
+        assert send_confirmation_reminders() == 0, "Reminded are skipped"
+
+        Account.objects.update(
+            date_joined=now() - timedelta(days=11),
+            confirmation_reminded_at=None,
+        )
+
+        assert send_confirmation_reminders() == 0, "Expired are skipped"
+
+    @pytest.mark.django_db
+    def test_dropped_reminders_fail(self, settings, users, mocker):
+        """Test that a dropped batch fails and is left for the next run."""
+        settings.EMAIL_CONFIRMATION_REMINDER_DAYS = (1,)
+        Account.objects.update(date_joined=now() - timedelta(days=1))
+        mocker.patch("app.account.tasks.dispatch_task", return_value=False)
+
+        with pytest.raises(TaskDispatchError):
+            send_confirmation_reminders()
+
+        assert not Account.objects.filter(
+            confirmation_reminded_at__isnull=False,
+        ).exists(), "Dropped accounts should stay due"
@@ -0,0 +1,165 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import override_settings
+
+from app.account.forms import AccountLoginForm
+from app.account.throttling import (
+    CacheBucketStore,
+    LocalBucketStore,
+    LoginThrottle,
+    get_client_ip,
+    refill_bucket,
+)
+
+RATES = {"ip": (4, 60), "email": (2, 60)}
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "throttling-tests",
+    },
+}
+
+
+def test_refill_bucket():
+    """Test that tokens refill over time up to the capacity."""
+    assert refill_bucket(None, 5, 60, 0) == 5, "New bucket should be full"
+    assert refill_bucket((0, 0), 5, 60, 30) == 2.5, "Wrong refill rate"
+    assert refill_bucket((4, 0), 5, 60, 600) == 5, "Capacity is exceeded"
+
+
+def test_local_bucket_store_evicts_old_buckets():
+    """Test that the local store keeps a bounded number of buckets."""
+    store = LocalBucketStore(max_buckets=2)
+    for key in ("a", "b", "c"):
+        store.consume(key, 1, 60)
+
+    assert list(store._buckets) == ["b", "c"], "Oldest bucket isn't evicted"
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+def test_cache_bucket_store_sliding_window(mocker):
+    """Test that tokens of the previous period count while in the window."""
+    cache.clear()
+    clock = mocker.patch("app.account.throttling.time")
+    clock.time.return_value = 60.0
+    store = CacheBucketStore()
+
+    assert [store.consume("key", 2, 60) for _ in range(3)] == [
+        True, True, False,
+    ], "Capacity isn't applied"
+
+    clock.time.return_value = 150.0
+
+    assert [store.consume("key", 2, 60) for _ in range(2)] == [
+        True, False,
+    ], "Half of the previous period should still count"
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+def test_cache_bucket_store_concurrent_attempts(mocker):
+    """Test that concurrent attempts don't share tokens."""
+    cache.clear()
+    mocker.patch("app.account.throttling.time").time.return_value = 90.0
+    barrier = Barrier(8)
+    get = LocMemCache.get
+
+    def get_together(self, *args, **kwargs):
+        value = get(self, *args, **kwargs)
+        barrier.wait(timeout=5)
+        return value
+
+    mocker.patch.object(LocMemCache, "get", get_together)
+    store = CacheBucketStore()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        allowed = list(executor.map(
+            lambda _: store.consume("key", 3, 60), range(8),
+        ))
+
+    assert allowed.count(True) == 3, "Concurrent attempts share tokens"
+
+
+@pytest.mark.parametrize(
+    ("header", "proxy_count", "meta", "expected"),
+    [
+        ("REMOTE_ADDR", 0, {"REMOTE_ADDR": "10.0.0.1"}, "10.0.0.1"),
+        (
+            "HTTP_X_FORWARDED_FOR",
+            1,
+            {"HTTP_X_FORWARDED_FOR": "1.1.1.1, 10.0.0.1"},
+            "10.0.0.1",
+        ),
+        (
+            "HTTP_X_FORWARDED_FOR",
+            2,
+            {"HTTP_X_FORWARDED_FOR": "forged, 1.1.1.1, 10.0.0.1"},
+            "1.1.1.1",
+        ),
+        (
+            "HTTP_X_FORWARDED_FOR",
+            2,
+            {"HTTP_X_FORWARDED_FOR": "1.1.1.1"},
+            "1.1.1.1",
+        ),
+        ("HTTP_X_FORWARDED_FOR", 1, {}, None),
+    ],
+)
+def test_get_client_ip(settings, rf, header, proxy_count, meta, expected):
+    """Test that the client IP is read from the configured header."""
+    settings.LOGIN_THROTTLE_IP_HEADER = header
+    settings.LOGIN_THROTTLE_PROXY_COUNT = proxy_count
+
+    assert get_client_ip(rf.post("/account/login/", **meta)) == expected
+
+
+@override_settings(LOGIN_THROTTLE_RATES=RATES)
+@pytest.mark.parametrize("store_class", [LocalBucketStore, CacheBucketStore])
+def test_login_throttle_per_email_and_ip(store_class, rf):
+    """Test that attempts over the email or IP limit are rejected."""
+    with override_settings(CACHES=LOCMEM_CACHES):
+        cache.clear()
+        throttle = LoginThrottle(store=store_class())
+        request = rf.post("/account/login/", REMOTE_ADDR="10.0.0.1")
+
+        assert throttle.allow(request, "user@test.com")
+        assert throttle.allow(request, "USER@test.com")
+        assert not throttle.allow(request, "user@test.com"), \
+            "Email limit isn't applied"
+        assert throttle.allow(request, "other@test.com")
+        assert not throttle.allow(request, "third@test.com"), \
+            "IP limit isn't applied"
+
+        assert throttle.stats.snapshot() == {"admitted": 3, "rejected": 2}, \
+            "Wrong throttle counters"
+
+
+@pytest.mark.django_db
+@override_settings(LOGIN_THROTTLE_RATES=RATES)
+def test_login_form_throttled_before_query(
+    rf, mocker, django_assert_num_queries,
+):
+    """Test that a throttled login doesn't query or hash anything."""
+    mocker.patch(
+        "app.account.forms.login_throttle",
+        LoginThrottle(store=LocalBucketStore()),
+    )
+    check_password = mocker.patch(
+        "app.account.models.Account.check_password",
+    )
+    request = rf.post("/account/login/", REMOTE_ADDR="10.0.0.2")
+    data = {"email": "fake@test.com", "password": "wrong_password"}
+
+    for _ in range(2):
+        assert not AccountLoginForm(data=data, request=request).is_valid()
+
+    form = AccountLoginForm(data=data, request=request)
+    with django_assert_num_queries(0):
+        assert not form.is_valid(), "Throttled login is valid"
+
+    assert form.has_error("__all__", code="throttled"), \
+        "Throttling error isn't reported"
+    check_password.assert_not_called()
@@ -1,6 +1,7 @@
 import pytest
 from django.urls import reverse, resolve
 from app.account.views import (
+    AccountConfirmEmailView,
     AccountLoginView,
     AccountLogoutView,
     AccountPasswordResetCompleteView,
@@ -125,3 +126,14 @@ class TestAccountUrls:
         assert (
             resolver.func.view_class == AccountPasswordResetCompleteView
         ), "Password reset complete URL should resolve to AccountPasswordResetCompleteView"
+
+    def test_confirm_email_url(self):
+        """Test the email confirmation URL."""
+        url = reverse("account:confirm_email", args=["uid", "token"])
+        assert (
+            url == "/account/confirm-email/uid/token/"
+        ), "Confirm email URL should match the expected pattern"
+        resolver = resolve("/account/confirm-email/uid/token/")
+        assert (
+            resolver.func.view_class == AccountConfirmEmailView
+        ), "Confirm email URL should resolve to AccountConfirmEmailView"
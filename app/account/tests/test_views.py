@@ -14,7 +14,10 @@ from app.account.views import (
     AccountProfileUpdateView,
     AccountPasswordResetView,
 )
-from app.account.models import Account
+from app.account.models import Account, OutboxEmail
+from app.services.tasks_funtions import (
+    generate_email_confirmation_uidb_and_token,
+)
 from app.tests.conftest import factory, users
 
 
@@ -131,30 +134,24 @@ class TestAccountViews:
 
         data = {"email": users["user"].email}
 
-        mock_send_email = mocker.patch(
-            "app.account.tasks.send_reset_password_email.delay"
-        )
-
         response = client.post(
             reverse("account:password_reset"), data, follow=False
         )
 
         assert response.status_code == 302
         assert response.url == reverse("account:password_reset_done")
-        mock_send_email.assert_called_once_with("user@test.com")
+        email = OutboxEmail.objects.get()
+        assert email.kind == OutboxEmail.Kind.PASSWORD_RESET
+        assert email.account == users["user"]
 
     @pytest.mark.django_db
-    def test_password_reset_view_invalid_email(self, client, mocker):
+    def test_password_reset_view_invalid_email(self, client):
         data = {"email": ""}
 
-        mock_send_email = mocker.patch(
-            "app.account.tasks.send_reset_password_email.delay"
-        )
-
         response = client.post(reverse("account:password_reset"), data)
 
         assert response.status_code == 200
-        mock_send_email.assert_not_called()
+        assert not OutboxEmail.objects.exists()
 
     def test_password_reset_view_get(self, client):
         """Тест GET-запроса к странице сброса пароля."""
@@ -277,3 +274,56 @@ class TestAccountViews:
         assert "title" in response.context_data
         assert response.context_data["title"] == "Password Reset Complete"
 
+
+    # Тесты для AccountConfirmEmailView
+    @pytest.mark.django_db
+    def test_confirm_email_view_valid_token(self, client, users):
+        user = users["user"]
+        uidb64, token = generate_email_confirmation_uidb_and_token(user)
+        url = reverse("account:confirm_email", args=[uidb64, token])
+
+        shown = client.get(url)
+
+        assert shown.context_data["validlink"] is True
+        assert shown.context_data["confirmed"] is False
+        user.refresh_from_db()
+        assert user.confirm_email is False, "GET shouldn't confirm"
+
+        response = client.post(url)
+
+        assert response.status_code == 200
+        assert response.context_data["confirmed"] is True
+        user.refresh_from_db()
+        assert user.confirm_email is True
+        reused = client.post(url)
+        assert reused.context_data["confirmed"] is False, \
+            "Token should be invalid once the email is confirmed"
+
+    @pytest.mark.django_db
+    def test_confirm_email_view_invalid_link(self, client, users):
+        response = client.get(
+            reverse("account:confirm_email", args=["broken", "token"]),
+        )
+
+        assert response.status_code == 200
+        assert response.context_data["validlink"] is False
+        assert response.context_data["title"] == "Email Confirmation"
+
+    @pytest.mark.django_db
+    def test_signup_queues_confirmation_email(self, client, settings):
+        settings.ACCOUNT_EMAIL_VERIFICATION = "mandatory"
+
+        response = client.post(
+            reverse("account:signup"),
+            {
+                "email": "new@test.com",
+                "username": "new",
+                "password1": "Very_strong_password1",
+                "password2": "Very_strong_password1",
+            },
+        )
+
+        assert response.status_code == 302
+        email = OutboxEmail.objects.get()
+        assert email.kind == OutboxEmail.Kind.CONFIRMATION
+        assert email.account.email == "new@test.com"
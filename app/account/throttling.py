@@ -0,0 +1,254 @@
+# -*- coding: UTF-8 -*-
+"""This module adds token-bucket throttling of login attempts.
+
+Every attempt takes one token from the bucket of the client IP and one
+from the bucket of the email. Buckets refill continuously, so a client
+gets `capacity` attempts at once and then `capacity` per `period`.
+
+The bucket state lives in a pluggable store: `LocalBucketStore` keeps it
+in process memory (single node), `CacheBucketStore` keeps it in the
+Django cache so all nodes of a cluster share it.
+
+The client IP is read from the `LOGIN_THROTTLE_IP_HEADER` request META
+key. Behind reverse proxies it is the `X-Forwarded-For` address added by
+the outermost of the `LOGIN_THROTTLE_PROXY_COUNT` trusted proxies.
+"""
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from threading import Lock
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+from django.utils.module_loading import import_string
+
+from app.services.metrics_functions import Counters
+
+BUCKET_KEY = "login-throttle:{scope}:{value}"
+WINDOW_KEY = "{key}:{window}"
+
+
+def refill_bucket(
+    state: Optional[tuple[float, float]],
+    capacity: int,
+    period: float,
+    now: float,
+) -> float:
+    """Return the number of tokens in the bucket at the given time.
+
+    Args:
+        state (tuple[float, float] | None): Tokens and time of the last
+            update, None for a new bucket.
+        capacity (int): Maximum number of tokens.
+        period (float): Seconds to refill the bucket from empty to full.
+        now (float): Current time.
+
+    Returns:
+        Number of available tokens.
+    """
+    if state is None:
+        return float(capacity)
+    tokens, updated = state
+    return min(float(capacity), tokens + (now - updated) * capacity / period)
+
+
+class BucketStore:
+    """Base class for token bucket stores."""
+
+    def consume(self, key: str, capacity: int, period: float) -> bool:
+        """Take a token from the bucket.
+
+        Args:
+            key (str): Bucket key.
+            capacity (int): Maximum number of tokens.
+            period (float): Seconds to refill the bucket from empty to full.
+
+        Raises:
+            NotImplementedError: the method must be defined in a subclass.
+        """
+        raise NotImplementedError
+
+
+class LocalBucketStore(BucketStore):
+    """Keep buckets in process memory.
+
+    The least recently used buckets are dropped above `max_buckets`, so
+    spraying random emails can't exhaust memory.
+    """
+
+    def __init__(self, max_buckets: int = 100000):
+        """Create an empty store.
+
+        Args:
+            max_buckets (int): Maximum number of kept buckets.
+        """
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()
+        self._lock = Lock()
+
+    def consume(self, key: str, capacity: int, period: float) -> bool:
+        """Take a token from the bucket.
+
+        Args:
+            key (str): Bucket key.
+            capacity (int): Maximum number of tokens.
+            period (float): Seconds to refill the bucket from empty to full.
+
+        Returns:
+            True if a token was available, False otherwise.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens = refill_bucket(
+                self._buckets.pop(key, None), capacity, period, now,
+            )
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        return allowed
+
+
+class CacheBucketStore(BucketStore):
+    """Keep buckets in the Django cache shared by all nodes.
+
+    The cache has no atomic read-modify-write, so the bucket is
+    approximated by a sliding window: tokens taken in the current and
+    the previous period are counted with atomic `incr()`, and the
+    previous count is weighted by the part of it still in the window.
+    Concurrent attempts on different nodes never share a token.
+    """
+
+    def consume(self, key: str, capacity: int, period: float) -> bool:
+        """Take a token from the bucket.
+
+        Args:
+            key (str): Bucket key.
+            capacity (int): Maximum number of tokens.
+            period (float): Seconds to refill the bucket from empty to full.
+
+        Returns:
+            True if a token was available, False otherwise.
+        """
+        now = time.time()
+        window, elapsed = divmod(now, period)
+        current_key = WINDOW_KEY.format(key=key, window=int(window))
+        timeout = int(period * 2) + 1
+        cache.add(current_key, 0, timeout=timeout)
+        try:
+            taken = cache.incr(current_key)
+        except ValueError:
+            # Evicted between add() and incr()
+            cache.set(current_key, 1, timeout=timeout)
+            taken = 1
+        previous = cache.get(
+            WINDOW_KEY.format(key=key, window=int(window) - 1), 0,
+        )
+        allowed = previous * (1 - elapsed / period) + taken <= capacity
+        if not allowed:
+            try:
+                cache.decr(current_key)
+            except ValueError:
+                pass
+        return allowed
+
+
+def get_client_ip(request: Optional[HttpRequest]) -> Optional[str]:
+    """Return the client IP address of the request.
+
+    The address is read from the `LOGIN_THROTTLE_IP_HEADER` META key.
+    A header listing several addresses, like `X-Forwarded-For`, ends with
+    the ones added by the `LOGIN_THROTTLE_PROXY_COUNT` trusted proxies,
+    so the client is the address added by the outermost one and the
+    addresses before it, which the client may forge, are ignored.
+
+    Args:
+        request (HttpRequest): Request object, may be None.
+
+    Returns:
+        IP address or None if it isn't known.
+    """
+    meta = getattr(request, "META", None) or {}
+    header = meta.get(settings.LOGIN_THROTTLE_IP_HEADER) or ""
+    addresses = [
+        address.strip() for address in header.split(",") if address.strip()
+    ]
+    if not addresses:
+        return None
+    proxy_count = max(settings.LOGIN_THROTTLE_PROXY_COUNT, 1)
+    return addresses[max(len(addresses) - proxy_count, 0)]
+
+
+@lru_cache
+def get_bucket_store(path: str) -> BucketStore:
+    """Return the shared store instance for the import path.
+
+    Args:
+        path (str): Dotted path of the store class.
+
+    Returns:
+        Store instance.
+    """
+    return import_string(path)()
+
+
+class LoginThrottle:
+    """Decide whether a login attempt is allowed to proceed."""
+
+    def __init__(self, store: Optional[BucketStore] = None):
+        """Create the throttle.
+
+        Args:
+            store (BucketStore): Bucket store, `LOGIN_THROTTLE_STORE`
+                is used if it isn't provided.
+        """
+        self._store = store
+        self.stats = Counters("admitted", "rejected")
+
+    @property
+    def store(self) -> BucketStore:
+        """Return the bucket store.
+
+        Returns:
+            Bucket store instance.
+        """
+        return self._store or get_bucket_store(settings.LOGIN_THROTTLE_STORE)
+
+    def allow(self, request: Optional[HttpRequest], email: str) -> bool:
+        """Take tokens for the client IP and the email.
+
+        Args:
+            request (HttpRequest): Login request, may be None.
+            email (str): Email entered in the login form.
+
+        Returns:
+            True if the attempt is admitted, False if it is throttled.
+        """
+        keys = [("email", (email or "").lower())]
+        ip_address = get_client_ip(request)
+        if ip_address:
+            keys.insert(0, ("ip", ip_address))
+        for scope, value in keys:
+            capacity, period = settings.LOGIN_THROTTLE_RATES[scope]
+            key = BUCKET_KEY.format(scope=scope, value=value)
+            if not self.store.consume(key, capacity, period):
+                self.stats.increment("rejected")
+                return False
+        self.stats.increment("admitted")
+        return True
+
+
+login_throttle = LoginThrottle()
+
+
+def get_login_throttle_stats() -> dict[str, int]:
+    """Return the admitted/rejected counters of the login throttle.
+
+    Returns:
+        Copy of the counters.
+    """
+    return login_throttle.stats.snapshot()
@@ -0,0 +1,28 @@
+# -*- coding: UTF-8 -*-
+"""This module adds tokens for email confirmation links."""
+from django.contrib.auth.tokens import PasswordResetTokenGenerator
+
+
+class EmailConfirmationTokenGenerator(PasswordResetTokenGenerator):
+    """Generate and check tokens of email confirmation links.
+
+    A token becomes invalid once the email is confirmed or changed and
+    expires after `PASSWORD_RESET_TIMEOUT` like password reset tokens.
+    """
+
+    key_salt = "app.account.tokens.EmailConfirmationTokenGenerator"
+
+    def _make_hash_value(self, user, timestamp: int) -> str:
+        """Hash the account state the token depends on.
+
+        Args:
+            user (Account): Account instance.
+            timestamp (int): Token creation time.
+
+        Returns:
+            Value hashed into the token.
+        """
+        return f"{user.pk}{user.email}{user.confirm_email}{timestamp}"
+
+
+email_confirmation_token_generator = EmailConfirmationTokenGenerator()
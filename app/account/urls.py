@@ -5,6 +5,7 @@ from django.contrib.auth.decorators import login_required
 from django.urls import path
 
 from app.account.views import (
+    AccountConfirmEmailView,
     AccountLoginView,
     AccountLogoutView,
     AccountPasswordResetCompleteView,
@@ -20,6 +21,11 @@ urlpatterns = [
     path("login/", AccountLoginView.as_view(), name="login"),
     path("logout/", AccountLogoutView.as_view(), name="logout"),
     path("signup/", AccountSingUpView.as_view(), name="signup"),
+    path(
+        "confirm-email/<uidb64>/<token>/",
+        AccountConfirmEmailView.as_view(),
+        name="confirm_email",
+    ),
     path(
         "profile/<slug:slug>/",
         login_required(AccountProfileDetailView.as_view()),
@@ -2,6 +2,7 @@
 """Add endpoints for url `/account` in path."""
 from typing import Any
 
+from django.conf import settings
 from django.contrib.auth.views import (
     LoginView,
     LogoutView,
@@ -10,11 +11,24 @@ from django.contrib.auth.views import (
     PasswordResetDoneView,
     PasswordResetView,
 )
+from django.db import transaction
 from django.db.models import QuerySet
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
-from django.shortcuts import redirect, render
+from django.http import (
+    Http404,
+    HttpRequest,
+    HttpResponse,
+    HttpResponseRedirect,
+)
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
-from django.views.generic import CreateView, DetailView, UpdateView
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
+from django.views.generic import (
+    CreateView,
+    DetailView,
+    TemplateView,
+    UpdateView,
+)
 
 from app.account.forms import (
     AccountLoginForm,
@@ -23,8 +37,20 @@ from app.account.forms import (
     AccountSetPasswordForm,
     AccountSignUpForm,
 )
-from app.account.models import Account
-from app.account.tasks import send_reset_password_email
+from app.account.last_login import get_last_login
+from app.account.models import Account, OutboxEmail
+from app.account.slugs import (
+    get_account_pk,
+    get_account_url,
+    get_redirect_slug,
+)
+from app.account.tasks import queue_reset_password_email, wake_email_outbox
+from app.account.tokens import email_confirmation_token_generator
+from app.services.cache_functions import (
+    cache_account,
+    get_account_cache_version,
+    get_cached_account,
+)
 
 
 class AccountLoginView(LoginView):
@@ -61,6 +87,26 @@ class AccountLoginView(LoginView):
         kwargs["request"] = self.request
         return kwargs
 
+    def form_valid(self, form: AccountLoginForm) -> HttpResponseRedirect:
+        """Log the user in and set the session lifetime.
+
+        Without "Remember me" the session expires at browser close and
+        is kept only in the cache, otherwise it lasts for
+        `SESSION_COOKIE_AGE` and is also stored in the database.
+
+        Args:
+            form (AccountLoginForm): Validated form instance.
+
+        Returns:
+            Redirect to the success URL.
+        """
+        response = super().form_valid(form)
+        if form.cleaned_data.get("remember_me"):
+            self.request.session.set_expiry(settings.SESSION_COOKIE_AGE)
+        else:
+            self.request.session.set_expiry(0)
+        return response
+
 
 class AccountLogoutView(LogoutView):
     """Log out the user and redirect to the index page."""
@@ -117,6 +163,133 @@ class AccountSingUpView(CreateView):
         context["title"] = "Sign Up"
         return context
 
+    def form_valid(self, form: AccountSignUpForm) -> HttpResponseRedirect:
+        """Create the account and queue its confirmation email.
+
+        The email is written to the outbox in the same transaction as
+        the account, so the signup never waits for the mail server, and
+        the outbox is dispatched after the commit.
+
+        Args:
+            form (AccountSignUpForm): Validated form instance.
+
+        Returns:
+            Redirect to the login page.
+        """
+        with transaction.atomic():
+            response = super().form_valid(form)
+            if settings.ACCOUNT_EMAIL_VERIFICATION != "none":
+                OutboxEmail.objects.create(
+                    kind=OutboxEmail.Kind.CONFIRMATION,
+                    account=self.object,
+                )
+                wake_email_outbox()
+        return response
+
+
+class AccountConfirmEmailView(TemplateView):
+    """Confirm the email of an account by the link from the email.
+
+    The link only shows a page with a confirmation button, the email is
+    confirmed by the POST request of the button. Mail scanners and link
+    previews fetching the link don't confirm it.
+    """
+
+    template_name = "account/confirm_email.html"
+
+    def get(
+        self,
+        request: HttpRequest, *args, **kwargs,
+    ) -> HttpResponse:
+        """Handle GET requests.
+
+        Args:
+            request (HttpRequest): Request object.
+            *args (tuple): Positional arguments.
+            **kwargs (dict): Keyword arguments.
+
+        Returns:
+            Page asking to confirm the email, or telling the link is
+            invalid.
+        """
+        user = self.get_linked_user(kwargs["uidb64"], kwargs["token"])
+        return self.render_to_response(
+            self.get_context_data(validlink=user is not None, confirmed=False),
+        )
+
+    def post(
+        self,
+        request: HttpRequest, *args, **kwargs,
+    ) -> HttpResponse:
+        """Handle POST requests.
+
+        Args:
+            request (HttpRequest): Request object.
+            *args (tuple): Positional arguments.
+            **kwargs (dict): Keyword arguments.
+
+        Returns:
+            Page telling whether the email has been confirmed.
+        """
+        user = self.get_linked_user(kwargs["uidb64"], kwargs["token"])
+        if user is not None:
+            user.confirm_email = True
+            user.save(update_fields=["confirm_email"])
+        return self.render_to_response(
+            self.get_context_data(
+                validlink=user is not None,
+                confirmed=user is not None,
+            ),
+        )
+
+    def get_linked_user(self, uidb64: str, token: str) -> Account | None:
+        """Return the account of a valid confirmation link.
+
+        Args:
+            uidb64 (str): Base64 encoded primary key.
+            token (str): Confirmation token.
+
+        Returns:
+            Account instance or None for a broken or expired link.
+        """
+        user = self.get_user(uidb64)
+        if user is None or not email_confirmation_token_generator.check_token(
+            user, token,
+        ):
+            return None
+        return user
+
+    def get_user(self, uidb64: str) -> Account | None:
+        """Return the account encoded in the link.
+
+        Args:
+            uidb64 (str): Base64 encoded primary key.
+
+        Returns:
+            Account instance or None for a broken link.
+        """
+        try:
+            pk = force_str(urlsafe_base64_decode(uidb64))
+            return Account.objects.get(pk=pk)
+        except (TypeError, ValueError, OverflowError, Account.DoesNotExist):
+            return None
+
+    def get_context_data(self, **kwargs) -> dict[str, Any]:
+        """Add title in the context data.
+
+        Merge the context data of all parent classes with those of
+        the current class.
+
+        Args:
+            **kwargs (dict): Some context variables.
+
+        Returns:
+            context (dict[str, Any]): Dictionary of context variables.
+        """
+        context = super().get_context_data(**kwargs)
+        context["title"] = "Email Confirmation"
+        return context
+
 
 class AccountProfileDetailView(DetailView):
     """Render a "detail" view of an account."""
@@ -125,6 +298,62 @@ class AccountProfileDetailView(DetailView):
     context_object_name = "profile"
     template_name = "account/profile_detail.html"
 
+    def get(
+        self,
+        request: HttpRequest, *args, **kwargs,
+    ) -> HttpResponse:
+        """Handle GET requests.
+
+        An old slug of an account is permanently redirected to its
+        current profile URL.
+
+        Args:
+            request (HttpRequest): Request object.
+            *args (tuple): Positional arguments.
+            **kwargs (dict): Keyword arguments.
+
+        Returns:
+            Rendered profile or redirect to the current profile URL.
+        """
+        if get_account_pk(kwargs["slug"]) is None:
+            slug = get_redirect_slug(kwargs["slug"])
+            if slug is not None:
+                return redirect(
+                    get_account_url("account:profile_detail", slug),
+                    permanent=True,
+                )
+        return super().get(request, *args, **kwargs)
+
+    def get_object(self, queryset: QuerySet = None) -> Account:
+        """Return the profile with the freshest known last login.
+
+        The slug is resolved through the slug cache and the account is
+        read from the account cache, so a cached profile needs no query.
+
+        Args:
+            queryset (QuerySet): If queryset is provided, that queryset
+                will be used as the source of objects
+
+        Returns:
+            Account instance.
+
+        Raises:
+            Http404: If no account has the slug.
+        """
+        pk = get_account_pk(self.kwargs["slug"])
+        if pk is None:
+            raise Http404("No account found matching the query")
+        version = get_account_cache_version(pk)
+        profile = get_cached_account(pk, version)
+        if profile is None:
+            profile = get_object_or_404(
+                queryset if queryset is not None else Account.objects,
+                pk=pk,
+            )
+            cache_account(profile, version)
+        profile.last_login = get_last_login(profile)
+        return profile
+
     def get_context_data(self, **kwargs):
         """Add title in the context data.
 
@@ -205,8 +434,7 @@ class AccountPasswordResetView(PasswordResetView):
         Returns:
             Redirect to the `success_url` variable in class attributes.
         """
-        email = form.cleaned_data.get("email")
-        send_reset_password_email.delay(email)
+        queue_reset_password_email(form.account.pk)
         return HttpResponseRedirect(self.get_success_url())
 
     def get_context_data(self, **kwargs):
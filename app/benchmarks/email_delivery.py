@@ -0,0 +1,219 @@
+# -*- coding: UTF-8 -*-
+"""Email delivery benchmark against a local SMTP sink.
+
+Starts an in-process SMTP server on localhost and sends `--emails`
+emails with every mail path, through Django's SMTP backend (`smtp`) and
+the asyncio backend with `--concurrency` connections (`async`):
+
+* `reset-outbox` - `dispatch_outbox_batch` over pending password reset
+  rows of the outbox, one connection per batch;
+* `confirmation` - `send_confirmation_emails`, one connection per batch;
+* `newsletter` - `send_newsletter_chunk`, one connection per chunk.
+
+Tasks are called in process, without a broker. Latency is measured per
+task call, which covers one batch of `--batch-size` emails. `--rtt-ms`
+delays every SMTP reply to simulate a remote mail server.
+
+Usage:
+    python -m app.benchmarks.email_delivery --emails 1000 --concurrency 4
+"""
+import argparse
+from typing import Callable
+
+from app.benchmarks.smtp_sink import SMTPSink
+from app.benchmarks.utils import (
+    Timer,
+    benchmark_database,
+    percentile,
+    report,
+    setup_django,
+)
+
+BACKENDS = (
+    ("smtp", "django.core.mail.backends.smtp.EmailBackend"),
+    ("async", "app.account.email_backend.EmailBackend"),
+)
+
+
+def create_accounts(count: int) -> list[int]:
+    """Create subscribed, unconfirmed accounts for the benchmark.
+
+    Args:
+        count (int): Number of accounts.
+
+    Returns:
+        Primary keys of the accounts.
+    """
+    from django.contrib.auth import get_user_model
+
+    model = get_user_model()
+    accounts = []
+    for index in range(count):
+        account = model(
+            email=f"user{index}@benchmark.com",
+            email_canonical=f"user{index}@benchmark.com",
+            username=f"Benchmark User {index}",
+            slug=f"benchmark-user-{index}",
+            subscribe=True,
+        )
+        account.set_unusable_password()
+        accounts.append(account)
+    model.objects.bulk_create(accounts)
+    return list(model.objects.order_by("pk").values_list("pk", flat=True))
+
+
+def create_newsletter_chunks(pks: list[int], batch_size: int) -> list[int]:
+    """Create a newsletter split into chunks of subscribers.
+
+    Args:
+        pks (list[int]): Subscriber primary keys in order.
+        batch_size (int): Number of subscribers per chunk.
+
+    Returns:
+        Primary keys of the chunks.
+    """
+    from app.account.models import Newsletter, NewsletterChunk
+
+    newsletter = Newsletter.objects.create(
+        subject="Benchmark",
+        body="Benchmark newsletter.\n\nhttps://example.com/",
+    )
+    chunks = NewsletterChunk.objects.bulk_create(
+        NewsletterChunk(
+            newsletter=newsletter,
+            first_pk=pks[start],
+            last_pk=pks[min(start + batch_size, len(pks)) - 1],
+        )
+        for start in range(0, len(pks), batch_size)
+    )
+    return [chunk.pk for chunk in chunks]
+
+
+def create_reset_outbox(pks: list[int], batch_size: int) -> list[int]:
+    """Write a pending password reset email per account to the outbox.
+
+    Args:
+        pks (list[int]): Account primary keys.
+        batch_size (int): Number of emails per dispatched batch.
+
+    Returns:
+        Batch size of every dispatcher call.
+    """
+    from app.account.models import OutboxEmail
+
+    OutboxEmail.objects.bulk_create(
+        OutboxEmail(kind=OutboxEmail.Kind.PASSWORD_RESET, account_id=pk)
+        for pk in pks
+    )
+    return [batch_size] * -(-len(pks) // batch_size)
+
+
+def deliver(
+    sink: SMTPSink,
+    send: Callable,
+    calls: list,
+) -> tuple[float, list[float]]:
+    """Call the mail path once per argument and measure every call.
+
+    Args:
+        sink (SMTPSink): Running SMTP sink, reset before the run.
+        send (Callable): Task function sending the emails.
+        calls (list): Argument of every task call.
+
+    Returns:
+        Elapsed seconds and per-call latencies.
+    """
+    sink.reset()
+    latencies = []
+    with Timer() as total:
+        for argument in calls:
+            with Timer() as timer:
+                send(argument)
+            latencies.append(timer.elapsed)
+    return total.elapsed, latencies
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--rtt-ms", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.test import override_settings
+
+    from app.account.tasks import (
+        dispatch_outbox_batch,
+        send_confirmation_emails,
+        send_newsletter_chunk,
+    )
+
+    # The test environment switches to the locmem backend, so the SMTP
+    # settings are overridden inside it.
+    with SMTPSink(
+        rtt=args.rtt_ms / 1000,
+    ) as sink, benchmark_database(), override_settings(
+        EMAIL_HOST="127.0.0.1",
+        EMAIL_PORT=sink.port,
+        EMAIL_HOST_PASSWORD="",
+        EMAIL_USE_TLS=False,
+        EMAIL_USE_SSL=False,
+        EMAIL_CONCURRENCY=args.concurrency,
+    ):
+        pks = create_accounts(args.emails)
+        batches = [
+            pks[start:start + args.batch_size]
+            for start in range(0, len(pks), args.batch_size)
+        ]
+        rows = [(
+            "mail path",
+            "backend",
+            "emails/s",
+            "connections",
+            "emails/conn",
+            "p50 ms",
+            "p99 ms",
+        )]
+        for backend, backend_path in BACKENDS:
+            scenarios = (
+                (
+                    "reset-outbox",
+                    dispatch_outbox_batch,
+                    create_reset_outbox(pks, args.batch_size),
+                ),
+                ("confirmation", send_confirmation_emails, batches),
+                (
+                    "newsletter",
+                    send_newsletter_chunk,
+                    create_newsletter_chunks(pks, args.batch_size),
+                ),
+            )
+            for name, send, calls in scenarios:
+                with override_settings(EMAIL_BACKEND=backend_path):
+                    elapsed, latencies = deliver(sink, send, calls)
+                if sink.messages != args.emails:
+                    raise RuntimeError(
+                        f"{name}: sink got {sink.messages} of {args.emails}",
+                    )
+                rows.append((
+                    name,
+                    backend,
+                    f"{sink.messages / elapsed:.1f}",
+                    str(sink.connections),
+                    f"{sink.messages / sink.connections:.1f}",
+                    f"{percentile(latencies, 50) * 1000:.2f}",
+                    f"{percentile(latencies, 99) * 1000:.2f}",
+                ))
+    report(
+        f"{args.emails} emails, batch size {args.batch_size}, "
+        f"concurrency {args.concurrency}, SMTP round trip {args.rtt_ms} ms",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
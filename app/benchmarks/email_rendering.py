@@ -0,0 +1,75 @@
+# -*- coding: UTF-8 -*-
+"""Password reset email rendering benchmark.
+
+Compares renders per second of:
+
+* `render_to_string` - the previous rendering, a template lookup and a
+  full context per message, text body only;
+* `render_email` - the template compiled once and the cached site
+  context, text body and HTML alternative per message.
+
+Usage:
+    python -m app.benchmarks.email_rendering --renders 20000
+"""
+import argparse
+
+from app.benchmarks.utils import Timer, report, setup_django
+
+TEMPLATE_NAME = "account/password_reset_email.html"
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renders", type=int, default=20000)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.template.loader import render_to_string
+
+    from app.services.email_functions import render_email
+
+    user = get_user_model()(pk=1, email="bench@test.com", username="bench")
+    context = {
+        "email": user.email,
+        "uidb64": "MQ",
+        "user": user,
+        "token": "c2z4nk-0123456789abcdef0123456789abcdef",
+    }
+
+    def legacy() -> None:
+        render_to_string(
+            template_name=TEMPLATE_NAME,
+            context={
+                **context,
+                "domain": settings.DOMAIN,
+                "site_name": settings.SITE_NAME,
+                "protocol": "https" if settings.USE_HTTPS else "http",
+            },
+        )
+
+    def cached() -> None:
+        render_email(TEMPLATE_NAME, context)
+
+    rows = [("renderer", "renders/s", "us/render")]
+    for name, render in (
+        ("render_to_string", legacy),
+        ("render_email", cached),
+    ):
+        render()
+        with Timer() as timer:
+            for _ in range(args.renders):
+                render()
+        rows.append((
+            name,
+            f"{args.renders / timer.elapsed:.0f}",
+            f"{timer.elapsed / args.renders * 1e6:.1f}",
+        ))
+    report(f"{args.renders} password reset emails", rows)
+
+
+if __name__ == "__main__":
+    main()
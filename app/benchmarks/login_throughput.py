@@ -0,0 +1,128 @@
+# -*- coding: UTF-8 -*-
+"""Concurrent login benchmark for the ASGI deployment.
+
+Compares logins per second of:
+
+* `asgi-view` - POST to the login view through the ASGI handler;
+* `backend-sync` - `EmailAuthBackend.authenticate` behind
+  `sync_to_async`, the way Django wraps sync backends under ASGI;
+* `backend-async` - native `EmailAuthBackend.aauthenticate`.
+
+Usage:
+    python -m app.benchmarks.login_throughput --logins 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from app.benchmarks.utils import (
+    Timer,
+    benchmark_database,
+    percentile,
+    report,
+    setup_django,
+)
+
+EMAIL = "benchmark@test.com"
+PASSWORD = "benchmark_password"
+
+
+async def run_concurrently(
+    login: Callable[[], Awaitable[bool]],
+    logins: int,
+    concurrency: int,
+) -> tuple[float, list[float]]:
+    """Run `logins` calls of `login` with bounded concurrency.
+
+    Args:
+        login (Callable): Coroutine function doing one login.
+        logins (int): Total number of logins.
+        concurrency (int): Number of logins in flight at once.
+
+    Returns:
+        Elapsed seconds and per-login latencies.
+
+    Raises:
+        RuntimeError: If a login doesn't succeed.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_login() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            if not await login():
+                raise RuntimeError("Login failed")
+            latencies.append(time.perf_counter() - started)
+
+    with Timer() as timer:
+        await asyncio.gather(*(one_login() for _ in range(logins)))
+    return timer.elapsed, latencies
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from asgiref.sync import sync_to_async
+    from django.contrib.auth import get_user_model
+    from django.test import AsyncClient
+    from django.urls import reverse
+
+    from app.account.backends import EmailAuthBackend
+
+    backend = EmailAuthBackend()
+
+    async def asgi_view() -> bool:
+        response = await AsyncClient().post(
+            reverse("account:login"),
+            {"email": EMAIL, "password": PASSWORD},
+        )
+        return response.status_code == 302
+
+    async def backend_sync() -> bool:
+        user = await sync_to_async(backend.authenticate)(
+            None, username=EMAIL, password=PASSWORD,
+        )
+        return user is not None
+
+    async def backend_async() -> bool:
+        user = await backend.aauthenticate(
+            None, username=EMAIL, password=PASSWORD,
+        )
+        return user is not None
+
+    scenarios = (
+        ("asgi-view", asgi_view),
+        ("backend-sync", backend_sync),
+        ("backend-async", backend_async),
+    )
+    with benchmark_database():
+        get_user_model().objects.create_user(
+            email=EMAIL, password=PASSWORD, username="benchmark",
+        )
+        rows = [("scenario", "logins/s", "p50 ms", "p99 ms")]
+        for name, login in scenarios:
+            elapsed, latencies = asyncio.run(
+                run_concurrently(login, args.logins, args.concurrency),
+            )
+            rows.append((
+                name,
+                f"{args.logins / elapsed:.1f}",
+                f"{percentile(latencies, 50) * 1000:.1f}",
+                f"{percentile(latencies, 99) * 1000:.1f}",
+            ))
+    report(
+        f"{args.logins} logins, concurrency {args.concurrency}",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
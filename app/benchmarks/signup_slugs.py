@@ -0,0 +1,135 @@
+# -*- coding: UTF-8 -*-
+"""Signup benchmark with colliding usernames.
+
+Signs up `--accounts` accounts sharing `--usernames` distinct usernames,
+so almost every slug collides, and compares:
+
+* `legacy` - the previous `unique_slugify`, one `exists()` query per
+  candidate until a free one is found;
+* `set-based` - the current `unique_slugify`, one query for a batch of
+  candidates.
+
+Each scenario runs in its own test database. Passwords are left unusable
+so hashing doesn't dominate the timings.
+
+Usage:
+    python -m app.benchmarks.signup_slugs --accounts 100000 --usernames 10
+"""
+import argparse
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from unittest import mock
+from uuid import uuid4
+
+from app.benchmarks.utils import (
+    Timer,
+    benchmark_database,
+    percentile,
+    report,
+    setup_django,
+)
+
+
+def legacy_unique_slugify(instance, slug: str) -> str:
+    """Create a unique slug the way it was done before.
+
+    Args:
+        instance (Account): Account instance.
+        slug (str): Base slug string.
+
+    Returns:
+        Unique slug string.
+    """
+    from pytils.translit import slugify
+
+    model = instance.__class__
+    unique_slug = slugify(slug)
+    while model.objects.filter(slug=unique_slug).exists():
+        suffix = uuid4().hex[:8]
+        unique_slug = f"{slugify(slug)}-{suffix}"
+    return unique_slug
+
+
+@contextmanager
+def count_queries() -> Iterator[list[int]]:
+    """Count queries run on the default connection.
+
+    Yields:
+        One-item list holding the number of queries so far.
+    """
+    from django.db import connection
+
+    queries = [0]
+
+    def wrapper(execute, sql, params, many, context):
+        queries[0] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield queries
+
+
+def sign_up(accounts: int, usernames: int) -> tuple[float, list[float], int]:
+    """Create the accounts and measure every signup.
+
+    Args:
+        accounts (int): Number of accounts to create.
+        usernames (int): Number of distinct usernames.
+
+    Returns:
+        Elapsed seconds, per-signup latencies and number of queries.
+    """
+    from django.contrib.auth import get_user_model
+
+    manager = get_user_model().objects
+    latencies = []
+    with count_queries() as queries, Timer() as total:
+        for index in range(accounts):
+            with Timer() as timer:
+                manager.create_user(
+                    email=f"user{index}@benchmark.com",
+                    username=f"Benchmark User {index % usernames}",
+                    password=None,
+                )
+            latencies.append(timer.elapsed)
+    return total.elapsed, latencies, queries[0]
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=100000)
+    parser.add_argument("--usernames", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from app.services.models_functions import unique_slugify
+
+    scenarios: tuple[tuple[str, Callable], ...] = (
+        ("legacy", legacy_unique_slugify),
+        ("set-based", unique_slugify),
+    )
+    rows = [("scenario", "signups/s", "queries/signup", "p50 ms", "p99 ms")]
+    for name, slugify in scenarios:
+        with benchmark_database(), mock.patch(
+            "app.account.models.unique_slugify", slugify,
+        ):
+            elapsed, latencies, queries = sign_up(
+                args.accounts, args.usernames,
+            )
+        rows.append((
+            name,
+            f"{args.accounts / elapsed:.1f}",
+            f"{queries / args.accounts:.2f}",
+            f"{percentile(latencies, 50) * 1000:.2f}",
+            f"{percentile(latencies, 99) * 1000:.2f}",
+        ))
+    report(
+        f"{args.accounts} signups, {args.usernames} usernames",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
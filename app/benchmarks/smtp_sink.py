@@ -0,0 +1,193 @@
+# -*- coding: UTF-8 -*-
+"""In-process SMTP sink for the email benchmarks.
+
+A minimal SMTP server on localhost that accepts every message and
+throws it away. It speaks just enough of the protocol for `smtplib`
+and the asyncio email backend (EHLO/HELO, AUTH, MAIL, RCPT, DATA, RSET,
+NOOP, QUIT, with PIPELINING) and counts connections and messages. An
+optional delay before every response simulates the round trip to a real
+mail server.
+
+The standard library `smtpd` module is gone in Python 3.12, so the sink
+is built on `socketserver` to avoid a new dependency.
+"""
+import socket
+import socketserver
+import threading
+import time
+
+EHLO_REPLY = (
+    "250-localhost",
+    "250-8BITMIME",
+    "250-PIPELINING",
+    "250 SMTPUTF8",
+)
+
+
+class SMTPSinkHandler(socketserver.BaseRequestHandler):
+    """Serve one SMTP connection.
+
+    Replies to all commands received in one read are sent together, the
+    way servers answer pipelined commands, so the simulated round trip
+    is paid once per read.
+    """
+
+    def setup(self) -> None:
+        """Prepare the connection state."""
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sink = self.server.sink
+        self.recipients = 0
+        self.data = None
+        self.closing = False
+
+    def send(self, replies: list[str]) -> None:
+        """Send the replies after the simulated round trip.
+
+        Args:
+            replies (list[str]): Reply lines.
+        """
+        if self.sink.rtt:
+            time.sleep(self.sink.rtt)
+        self.request.sendall(
+            "".join(f"{line}\r\n" for line in replies).encode(),
+        )
+
+    def handle(self) -> None:
+        """Answer the SMTP commands until QUIT or disconnect."""
+        self.sink.count(connections=1)
+        self.send(["220 localhost SMTP sink"])
+        buffer = b""
+        while not self.closing:
+            received = self.request.recv(65536)
+            if not received:
+                return
+            *lines, buffer = (buffer + received).split(b"\r\n")
+            replies = []
+            for line in lines:
+                replies.extend(self.process(line))
+            if replies:
+                self.send(replies)
+
+    def process(self, line: bytes) -> list[str]:
+        """Process a command or a line of message data.
+
+        Args:
+            line (bytes): Line without the line ending.
+
+        Returns:
+            Reply lines, empty while message data is received.
+        """
+        if self.data is not None:
+            if line != b".":
+                self.data.append(line)
+                return []
+            self.sink.count(messages=1)
+            if self.sink.keep:
+                self.sink.received.append(b"\r\n".join(self.data))
+            self.data = None
+            return ["250 OK"]
+        command = line[:4].upper()
+        if command == b"EHLO":
+            return list(EHLO_REPLY)
+        if command == b"AUTH":
+            return ["235 Authentication successful"]
+        if command in {b"MAIL", b"RSET"}:
+            self.recipients = 0
+        elif command == b"RCPT":
+            if any(address.encode() in line for address in self.sink.refuse):
+                return ["550 No such user"]
+            self.recipients += 1
+        elif command == b"DATA":
+            if not self.recipients:
+                return ["554 No valid recipients"]
+            self.recipients = 0
+            self.data = []
+            return ["354 End data with <CR><LF>.<CR><LF>"]
+        elif command == b"QUIT":
+            self.closing = True
+            return ["221 Bye"]
+        return ["250 OK"]
+
+
+class SMTPSinkServer(socketserver.ThreadingTCPServer):
+    """Threaded TCP server holding a reference to its sink."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class SMTPSink:
+    """SMTP server on localhost counting and discarding messages.
+
+    Use as a context manager, the server runs in a background thread
+    while the block executes.
+    """
+
+    def __init__(
+        self,
+        rtt: float = 0.0,
+        keep: bool = False,
+        refuse: tuple[str, ...] = (),
+    ):
+        """Create the sink.
+
+        Args:
+            rtt (float): Seconds to wait before every response.
+            keep (bool): Keep received messages in `received`.
+            refuse (tuple[str, ...]): Recipient addresses to refuse.
+        """
+        self.rtt = rtt
+        self.keep = keep
+        self.refuse = refuse
+        self.received: list[bytes] = []
+        self.connections = 0
+        self.messages = 0
+        self._lock = threading.Lock()
+        self._server = SMTPSinkServer(("127.0.0.1", 0), SMTPSinkHandler)
+        self._server.sink = self
+
+    @property
+    def port(self) -> int:
+        """Return the port the sink listens on.
+
+        Returns:
+            TCP port number.
+        """
+        return self._server.server_address[1]
+
+    def count(self, connections: int = 0, messages: int = 0) -> None:
+        """Add to the counters.
+
+        Args:
+            connections (int): Number of new connections.
+            messages (int): Number of received messages.
+        """
+        with self._lock:
+            self.connections += connections
+            self.messages += messages
+
+    def reset(self) -> None:
+        """Set the counters to zero."""
+        with self._lock:
+            self.connections = 0
+            self.messages = 0
+
+    def __enter__(self) -> "SMTPSink":
+        """Start serving in a background thread.
+
+        Returns:
+            The sink itself.
+        """
+        threading.Thread(
+            target=self._server.serve_forever, daemon=True,
+        ).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stop the server.
+
+        Args:
+            *exc_info (tuple): Exception information, if any.
+        """
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,123 @@
+# -*- coding: UTF-8 -*-
+"""Task payload benchmark of the `json` and `compact` serializers.
+
+Publishes `send_confirmation_emails`-like tasks taking a list of
+`--batch-size` primary keys, with gaps like keys of deleted accounts,
+through Celery's in-memory broker and reads them back the way a worker
+does. For every serializer it reports:
+
+* `broker bytes` - size of the message as the Redis transport stores it
+  (the JSON envelope with the base64 encoded body);
+* `round trip` - publishing, fetching and decoding one message.
+
+Usage:
+    python -m app.benchmarks.task_payloads --batch-size 1000 --tasks 200
+"""
+import argparse
+import random
+
+from celery import Celery
+from kombu.utils.json import dumps
+
+from app.benchmarks.utils import Timer, percentile, report
+from app.services.serializer_functions import register_compact_serializer
+
+SERIALIZERS = ("json", "compact")
+QUEUE = "payloads"
+
+
+def create_batches(count: int, batch_size: int) -> list[list[int]]:
+    """Create sorted primary key lists with about 10% of keys missing.
+
+    Args:
+        count (int): Number of batches.
+        batch_size (int): Number of keys per batch.
+
+    Returns:
+        Key lists, consecutive batches follow each other.
+    """
+    generator = random.Random(0)
+    pks = sorted(generator.sample(
+        range(100000, 100000 + count * batch_size * 10 // 9),
+        count * batch_size,
+    ))
+    return [
+        pks[start:start + batch_size]
+        for start in range(0, len(pks), batch_size)
+    ]
+
+
+def round_trip(
+    app: Celery,
+    serializer: str,
+    batches: list[list[int]],
+) -> tuple[list[int], list[float]]:
+    """Publish every batch and read it back from the broker.
+
+    Args:
+        app (Celery): Application over the in-memory broker.
+        serializer (str): Serializer name.
+        batches (list[list[int]]): Task arguments.
+
+    Returns:
+        Message sizes in bytes and round trip seconds.
+    """
+    task = app.tasks["payloads.send"]
+    sizes = []
+    latencies = []
+    with app.connection_for_write() as connection:
+        channel = connection.default_channel
+        for pks in batches:
+            with Timer() as timer:
+                task.apply_async((pks,), serializer=serializer)
+                raw = channel._get(QUEUE)  # noqa: WPS437
+                args, _, _ = channel.Message(raw, channel=channel).decode()
+            if args[0] != pks:
+                raise RuntimeError(f"{serializer}: payload changed")
+            sizes.append(len(dumps(raw)))
+            latencies.append(timer.elapsed)
+    return sizes, latencies
+
+
+def main() -> None:
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=200)
+    args = parser.parse_args()
+
+    register_compact_serializer()
+    app = Celery("payloads", set_as_current=False, broker="memory://")
+    app.conf.update(
+        accept_content=list(SERIALIZERS),
+        task_default_queue=QUEUE,
+    )
+
+    @app.task(name="payloads.send")
+    def send(pks):
+        """Stand in for a batch task.
+
+        Args:
+            pks (list[int]): Primary keys.
+        """
+
+    batches = create_batches(args.tasks, args.batch_size)
+    round_trip(app, "json", batches[:10])
+
+    rows = [("serializer", "broker bytes", "p50 ms", "p99 ms")]
+    for serializer in SERIALIZERS:
+        sizes, latencies = round_trip(app, serializer, batches)
+        rows.append((
+            serializer,
+            str(sum(sizes) // len(sizes)),
+            f"{percentile(latencies, 50) * 1000:.3f}",
+            f"{percentile(latencies, 99) * 1000:.3f}",
+        ))
+    report(
+        f"{args.tasks} tasks of {args.batch_size} primary keys",
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
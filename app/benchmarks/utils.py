@@ -0,0 +1,96 @@
+# -*- coding: UTF-8 -*-
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway test database created from the
+project settings, so they never touch real data.
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import django
+
+
+def setup_django() -> None:
+    """Configure Django for a standalone benchmark script."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.myblog.settings")
+    django.setup()
+
+
+@contextmanager
+def benchmark_database() -> Iterator[None]:
+    """Create a test database for the duration of the benchmark.
+
+    Yields:
+        Nothing, the default connection points to the test database.
+    """
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+class Timer:
+    """Measure wall-clock time of a block of code."""
+
+    def __enter__(self) -> "Timer":
+        """Start the timer.
+
+        Returns:
+            The timer itself.
+        """
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Stop the timer.
+
+        Args:
+            *exc_info (tuple): Exception information, if any.
+        """
+        self.elapsed = time.perf_counter() - self.started
+
+
+def percentile(samples: list[float], percent: int) -> float:
+    """Return the given percentile of the samples.
+
+    Args:
+        samples (list[float]): Measured values.
+        percent (int): Percentile from 1 to 99.
+
+    Returns:
+        Percentile value, 0.0 for an empty sample.
+    """
+    if len(samples) < 2:
+        return samples[0] if samples else 0.0
+    return statistics.quantiles(samples, n=100)[percent - 1]
+
+
+def report(title: str, rows: list[tuple[str, ...]]) -> None:
+    """Print benchmark results as an aligned table.
+
+    Args:
+        title (str): Table title.
+        rows (list[tuple[str, ...]]): Header row followed by data rows.
+    """
+    widths = [
+        max(len(row[col]) for row in rows) for col in range(len(rows[0]))
+    ]
+    sys.stdout.write(f"{title}\n")
+    for row in rows:
+        cells = (cell.ljust(width) for cell, width in zip(row, widths))
+        sys.stdout.write("  ".join(cells).rstrip() + "\n")
@@ -1,12 +1,52 @@
 # -*- coding: UTF-8 -*-
-"""This module creates celery application."""
+"""This module creates celery application.
+
+Tasks are routed by `CELERY_TASK_ROUTES` to the `interactive` queue
+(emails a user is waiting for), the `bulk` queue (newsletters and other
+batch jobs) or the `default` queue. Run a worker per queue so bulk jobs
+never hold up interactive tasks:
+
+    celery -A app.myblog worker -Q interactive -n interactive@%h
+    celery -A app.myblog worker -Q bulk -n bulk@%h
+
+A worker consuming a single queue takes its pool size and prefetch
+multiplier from `CELERY_QUEUE_WORKERS`. Give it its own
+`CELERY_WORKER_METRICS_PORT` to serve task metrics (see `task_metrics`):
+
+    CELERY_WORKER_METRICS_PORT=9801 celery -A app.myblog worker ...
+"""
 import os
 
 from celery import Celery
+from celery.signals import worker_init
+from celery.worker import WorkController
+
+from app.myblog import task_metrics  # noqa: F401 Connects the signals.
+from app.services.serializer_functions import register_compact_serializer
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.myblog.settings")
 
+register_compact_serializer()
+
 app = Celery("myblog")
 
 app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
+
+
+@worker_init.connect
+def apply_queue_settings(sender: WorkController, **kwargs) -> None:
+    """Set concurrency and prefetch of a worker consuming one queue.
+
+    Args:
+        sender (WorkController): Worker being set up.
+        **kwargs (dict): Signal arguments.
+    """
+    queues = sender.app.amqp.queues.consume_from
+    queue_workers = sender.app.conf.get("queue_workers") or {}
+    if len(queues) != 1:
+        return
+    options = queue_workers.get(next(iter(queues)))
+    if options:
+        sender.concurrency = options["concurrency"]
+        sender.prefetch_multiplier = options["prefetch_multiplier"]
@@ -1,10 +1,13 @@
 # -*- coding: UTF-8 -*-
 """Django settings for myblog project."""
 
+import json
 import os
 from pathlib import Path
 
+from celery.schedules import crontab
 from dotenv import load_dotenv
+from kombu import Queue
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -120,16 +123,127 @@ AUTH_PASSWORD_VALIDATORS = (
 
 
 AUTHENTICATION_BACKENDS = (
-    "django.contrib.auth.backends.ModelBackend",
+    "app.account.backends.EmailAuthBackend",
+)
 
+# Password hashers
+# Cost parameters are written by `manage.py calibrate_hashers`.
+PASSWORD_HASHERS_CONFIG = BASE_DIR / "password_hashers.json"
+PASSWORD_HASHERS_CALIBRATION = (
+    json.loads(PASSWORD_HASHERS_CONFIG.read_text())
+    if PASSWORD_HASHERS_CONFIG.exists()
+    else {}
 )
+PASSWORD_HASHERS = [
+    "app.account.hashers.CalibratedPBKDF2PasswordHasher",
+    "app.account.hashers.CalibratedScryptPasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+if PASSWORD_HASHERS_CALIBRATION.get("algorithm") == "scrypt":
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
+# Threads used by EmailAuthBackend.aauthenticate to verify passwords
+PASSWORD_HASHING_WORKERS = min(4, os.cpu_count() or 1)
+
+# Login throttling, rates are (attempts at once, seconds to refill them).
+# Use app.account.throttling.LocalBucketStore on a single node.
+LOGIN_THROTTLE_STORE = "app.account.throttling.CacheBucketStore"
+LOGIN_THROTTLE_RATES = {
+    "ip": (20, 60),
+    "email": (5, 60),
+}
+# Request META key of the client IP. Behind reverse proxies use
+# "HTTP_X_FORWARDED_FOR" with the number of proxies, otherwise all clients
+# share the bucket of the proxy address.
+LOGIN_THROTTLE_IP_HEADER = "REMOTE_ADDR"
+LOGIN_THROTTLE_PROXY_COUNT = 0
+
+# Buffered last_login updates are written in bulk when this many logins
+# are pending or the oldest one is this many seconds old
+LAST_LOGIN_FLUSH_SIZE = 500
+LAST_LOGIN_FLUSH_SECONDS = 30
+
+# In-memory filter of registered emails used by the login and reset forms.
+# Emails registered by other processes are only seen through a shared
+# cache, so the filter is enabled with CACHE_URL only.
+REGISTERED_EMAIL_FILTER_ENABLED = bool(os.getenv("CACHE_URL"))
+REGISTERED_EMAIL_FILTER_ERROR_RATE = 0.01
+REGISTERED_EMAIL_FILTER_REBUILD_SECONDS = 60 * 60
 
 ACCOUNT_EMAIL_REQUIRED = True
+# "optional" or "mandatory" sends a confirmation link after signup
 ACCOUNT_EMAIL_VERIFICATION = "none"
-
+# Unconfirmed accounts are reminded this many days after signup,
+# in batches sent over one connection each. A reminder missed by the
+# daily run is still sent within EMAIL_CONFIRMATION_REMINDER_WINDOW_DAYS.
+EMAIL_CONFIRMATION_REMINDER_DAYS = (1, 7)
+EMAIL_CONFIRMATION_REMINDER_WINDOW_DAYS = 3
+EMAIL_CONFIRMATION_BATCH_SIZE = 500
+
+# Newsletter subscribers sent by one task over one connection, a failed
+# chunk is retried after NEWSLETTER_CHUNK_RETRY_SECONDS
+NEWSLETTER_CHUNK_SIZE = 500
+NEWSLETTER_CHUNK_RETRY_SECONDS = 60
+NEWSLETTER_CHUNK_MAX_RETRIES = 3
+
+
+# Cache settings
+# Redis is used when CACHE_URL is set, local memory otherwise.
+if os.getenv("CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_URL"),
+        },
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# Seconds an account stays in the cache used by EmailAuthBackend.get_user.
+# Changes invalidate the cached account only in a shared cache (CACHE_URL),
+# the local memory cache of another process keeps the old account until it
+# expires, so it is kept for a few seconds only.
+if os.getenv("CACHE_URL"):
+    ACCOUNT_CACHE_TIMEOUT = 60 * 15
+else:
+    ACCOUNT_CACHE_TIMEOUT = 5
+
+# Session settings
+# With a shared cache (CACHE_URL) sessions live in the cache, only
+# "Remember me" sessions are also written to the database, at most once
+# per SESSION_WRITE_BEHIND_SECONDS. The local memory cache isn't shared
+# between processes, so sessions stay in the database without it.
+if os.getenv("CACHE_URL"):
+    SESSION_ENGINE = "app.account.sessions"
+else:
+    SESSION_ENGINE = "django.contrib.sessions.backends.db"
+SESSION_EXPIRE_AT_BROWSER_CLOSE = True
+SESSION_WRITE_BEHIND_SECONDS = 60 * 5
 
 # Email settings
+# Password reset and confirmation emails are written to the outbox table
+# and sent in batches by the dispatch_email_outbox task every
+# EMAIL_OUTBOX_POLL_SECONDS (or by manage.py dispatch_outbox). Failed or
+# abandoned emails are retried after EMAIL_OUTBOX_RETRY_SECONDS, up to
+# EMAIL_OUTBOX_MAX_ATTEMPTS times, and then logged as given up.
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_POLL_SECONDS = 5
+EMAIL_OUTBOX_RETRY_SECONDS = 60 * 5
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+# Repeated password reset requests for an account within this many
+# seconds are dropped.
+PASSWORD_RESET_DEDUPE_SECONDS = 60
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Maximum number of SMTP connections per send_messages() call of
+# app.account.email_backend.EmailBackend.
+EMAIL_CONCURRENCY = 4
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
 # Internationalization
@@ -166,7 +280,58 @@ LOGOUT_REDIRECT_URL = "core:index"
 # Celery settings
 CELERY_BROKER_URL = 'redis://localhost:6380/0'
 CELERY_RESULT_BACKEND = 'redis://localhost:6380/0'
-CELERY_ACCEPT_CONTENT = ('json',)
+# `compact` is registered in `app.myblog.celery` for large batch payloads.
+CELERY_ACCEPT_CONTENT = ('json', 'compact')
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+CELERY_TASK_QUEUES = (
+    Queue("interactive"),
+    Queue("default"),
+    Queue("bulk"),
+)
+CELERY_TASK_DEFAULT_QUEUE = "default"
+CELERY_TASK_ROUTES = {
+    # Emails a user is waiting for.
+    "app.account.tasks.send_reset_password_email": {"queue": "interactive"},
+    "app.account.tasks.dispatch_email_outbox": {"queue": "interactive"},
+    # Batch jobs, where throughput matters more than latency.
+    "app.account.tasks.send_confirmation_reminders": {"queue": "bulk"},
+    "app.account.tasks.send_confirmation_emails": {"queue": "bulk"},
+    "app.account.tasks.fan_out_newsletter": {"queue": "bulk"},
+    "app.account.tasks.send_newsletter_chunk": {"queue": "bulk"},
+}
+# Pool size and prefetch multiplier of workers consuming a single queue.
+# Interactive workers take one task at a time, so a slow task never
+# holds prefetched ones, bulk workers prefetch to keep busy.
+CELERY_QUEUE_WORKERS = {
+    "interactive": {"concurrency": 4, "prefetch_multiplier": 1},
+    "default": {"concurrency": 2, "prefetch_multiplier": 4},
+    "bulk": {"concurrency": 2, "prefetch_multiplier": 16},
+}
+# How the account views and tasks queue Celery tasks: "broker" publishes
+# them and runs them on an in-process thread pool while the broker is
+# unreachable, "thread" always uses the pool, for single node deployments
+# without Redis (see app.account.dispatch).
+TASK_DISPATCH_MODE = os.getenv("TASK_DISPATCH_MODE", "broker")
+TASK_DISPATCH_TIMEOUT = 1
+TASK_DISPATCH_RETRY_SECONDS = 30
+TASK_DISPATCH_WORKERS = 2
+TASK_DISPATCH_QUEUE_SIZE = 100
+# Port of the worker metrics endpoint, off when unset. Every worker on a
+# host needs its own port.
+CELERY_WORKER_METRICS_PORT = (
+    int(os.getenv("CELERY_WORKER_METRICS_PORT"))
+    if os.getenv("CELERY_WORKER_METRICS_PORT")
+    else None
+)
+CELERY_BEAT_SCHEDULE = {
+    "send-confirmation-reminders": {
+        "task": "app.account.tasks.send_confirmation_reminders",
+        "schedule": crontab(hour=9, minute=0),
+    },
+    "dispatch-email-outbox": {
+        "task": "app.account.tasks.dispatch_email_outbox",
+        "schedule": EMAIL_OUTBOX_POLL_SECONDS,
+    },
+}
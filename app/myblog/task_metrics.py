@@ -0,0 +1,308 @@
+# -*- coding: UTF-8 -*-
+"""This module records per task metrics of Celery workers.
+
+Every published message gets its publish time in the `sent_at` header.
+The worker records per task name, from Celery signals:
+
+* `celery_task_wait_seconds` - time from publishing to the start;
+* `celery_task_runtime_seconds` - time the task runs;
+* `celery_task_failures_total` - tasks that raised.
+
+The values live in shared memory allocated at `worker_init`, before the
+pool forks, so prefork children record into the histograms the main
+process reads. With `CELERY_WORKER_METRICS_PORT` set, the main process
+serves them with the depth of the consumed queues at `/metrics` in the
+Prometheus text format. Recording costs about ten microseconds per task,
+queue depths are only read when scraped.
+"""
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, Optional
+from weakref import WeakKeyDictionary
+
+from celery import Celery, Task
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_ready,
+    worker_shutdown,
+)
+from celery.worker import WorkController
+from kombu.exceptions import OperationalError
+
+from app.services.metrics_functions import (
+    SharedCounters,
+    SharedHistograms,
+    format_histograms,
+    format_samples,
+)
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_task_metrics: WeakKeyDictionary = WeakKeyDictionary()
+
+
+class TaskMetrics:
+    """Wait, runtime and failure metrics of the tasks of a worker."""
+
+    def __init__(self, app: Celery, task_names: Iterable[str]):
+        """Create empty metrics.
+
+        Args:
+            app (Celery): Application of the worker.
+            task_names (Iterable[str]): Names of the recorded tasks.
+        """
+        names = sorted(task_names)
+        self.app = app
+        self.wait = SharedHistograms(names, BUCKETS)
+        self.runtime = SharedHistograms(names, BUCKETS)
+        self.failures = SharedCounters(names)
+        self.server: Optional[ThreadingHTTPServer] = None
+        self._started: dict[str, float] = {}
+
+    def task_started(self, task_id: str, task: Task) -> None:
+        """Record the wait of a task and remember its start.
+
+        Args:
+            task_id (str): Task id.
+            task (Task): Started task.
+        """
+        sent_at = task.request.get("sent_at")
+        if sent_at is not None:
+            self.wait.observe(task.name, max(time.time() - sent_at, 0))
+        self._started[task_id] = time.perf_counter()
+
+    def task_finished(self, task_id: str, task: Task) -> None:
+        """Record the runtime of a task.
+
+        Args:
+            task_id (str): Task id.
+            task (Task): Finished task.
+        """
+        started = self._started.pop(task_id, None)
+        if started is not None:
+            self.runtime.observe(task.name, time.perf_counter() - started)
+
+    def queue_depths(self) -> dict[str, int]:
+        """Return the number of messages waiting in the consumed queues.
+
+        Returns:
+            Message count per queue, empty if the broker is unreachable.
+        """
+        connection = self.app.connection_for_read()
+        errors = (
+            OperationalError,
+            *connection.connection_errors,
+            *connection.channel_errors,
+        )
+        depths = {}
+        try:
+            with connection:
+                connection.ensure_connection(max_retries=1)
+                channel = connection.default_channel
+                for name, queue in self.app.amqp.queues.consume_from.items():
+                    depths[name] = queue.bind(channel).queue_declare()[1]
+        except errors:
+            logger.warning("Queue depth unavailable", exc_info=True)
+            return {}
+        return depths
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text format.
+
+        Returns:
+            Metrics text.
+        """
+        lines = [
+            *format_histograms(
+                "celery_task_wait_seconds",
+                "Time from publishing to the start of a task.",
+                "task",
+                self.wait,
+            ),
+            *format_histograms(
+                "celery_task_runtime_seconds",
+                "Time a task runs.",
+                "task",
+                self.runtime,
+            ),
+            *format_samples(
+                "celery_task_failures_total",
+                "Tasks that raised an exception.",
+                "counter",
+                "task",
+                self.failures.snapshot(),
+            ),
+            *format_samples(
+                "celery_queue_depth",
+                "Messages waiting in a queue.",
+                "gauge",
+                "queue",
+                self.queue_depths(),
+            ),
+        ]
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int) -> None:
+        """Serve the metrics over HTTP from a background thread.
+
+        Args:
+            port (int): Port to listen on, 0 picks a free one.
+        """
+        self.server = MetricsServer(("", port), MetricsHandler)
+        self.server.metrics = self
+        threading.Thread(
+            target=self.server.serve_forever, daemon=True,
+        ).start()
+
+    def close(self) -> None:
+        """Stop serving the metrics."""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """HTTP server holding a reference to the metrics it serves."""
+
+    daemon_threads = True
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Answer scrapes of `/metrics`."""
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Send the metrics."""
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        """Keep scrapes out of the worker log.
+
+        Args:
+            *args (tuple): Log format and arguments.
+        """
+
+
+def get_task_metrics(app: Celery) -> Optional[TaskMetrics]:
+    """Return the metrics of the worker running the application.
+
+    Args:
+        app (Celery): Celery application.
+
+    Returns:
+        Metrics, None outside a worker.
+    """
+    return _task_metrics.get(app)
+
+
+@before_task_publish.connect
+def stamp_publish_time(headers: Optional[dict] = None, **kwargs) -> None:
+    """Add the publish time to the message headers.
+
+    Args:
+        headers (dict | None): Message headers.
+        **kwargs (dict): Signal arguments.
+    """
+    if headers is not None:
+        headers["sent_at"] = time.time()
+
+
+@worker_init.connect
+def create_task_metrics(sender: WorkController, **kwargs) -> None:
+    """Allocate the metrics before the pool forks.
+
+    Args:
+        sender (WorkController): Worker being set up.
+        **kwargs (dict): Signal arguments.
+    """
+    _task_metrics[sender.app] = TaskMetrics(
+        sender.app,
+        (name for name in sender.app.tasks if not name.startswith("celery.")),
+    )
+
+
+@worker_ready.connect
+def serve_task_metrics(sender, **kwargs) -> None:
+    """Start the metrics endpoint in the main worker process.
+
+    Args:
+        sender (Consumer): Consumer of the ready worker.
+        **kwargs (dict): Signal arguments.
+    """
+    metrics = get_task_metrics(sender.app)
+    port = sender.app.conf.get("worker_metrics_port")
+    if metrics is not None and port is not None:
+        metrics.serve(port)
+
+
+@worker_shutdown.connect
+def close_task_metrics(sender, **kwargs) -> None:
+    """Stop the metrics endpoint.
+
+    Args:
+        sender (WorkController): Stopping worker.
+        **kwargs (dict): Signal arguments.
+    """
+    metrics = get_task_metrics(sender.app)
+    if metrics is not None:
+        metrics.close()
+
+
+@task_prerun.connect
+def record_task_start(task_id: str, task: Task, **kwargs) -> None:
+    """Record the wait of a starting task.
+
+    Args:
+        task_id (str): Task id.
+        task (Task): Starting task.
+        **kwargs (dict): Signal arguments.
+    """
+    metrics = get_task_metrics(task.app)
+    if metrics is not None:
+        metrics.task_started(task_id, task)
+
+
+@task_postrun.connect
+def record_task_end(task_id: str, task: Task, **kwargs) -> None:
+    """Record the runtime of a finished task.
+
+    Args:
+        task_id (str): Task id.
+        task (Task): Finished task.
+        **kwargs (dict): Signal arguments.
+    """
+    metrics = get_task_metrics(task.app)
+    if metrics is not None:
+        metrics.task_finished(task_id, task)
+
+
+@task_failure.connect
+def record_task_failure(sender: Task, **kwargs) -> None:
+    """Count a failed task.
+
+    Args:
+        sender (Task): Failed task.
+        **kwargs (dict): Signal arguments.
+    """
+    metrics = get_task_metrics(sender.app)
+    if metrics is not None:
+        metrics.failures.increment(sender.name)
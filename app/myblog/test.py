@@ -19,6 +19,14 @@ CACHES = {
     },
 }
 
+SESSION_ENGINE = "django.contrib.sessions.backends.db"
+
+REGISTERED_EMAIL_FILTER_ENABLED = False
+
+LAST_LOGIN_FLUSH_SIZE = 1
+
+TASK_DISPATCH_MODE = "thread"
+
 TEST_RUNNER = "django.test.runner.DiscoverRunner"
 
 LOGGING = {
@@ -0,0 +1,189 @@
+# -*- coding: UTF-8 -*-
+"""Utils functions for caching accounts between requests.
+
+An account is cached under a version that is bumped when the account
+changes. Readers take the version before they fetch the account from
+the database and cache it under that version, and the version is only
+bumped once the change is committed, so a stale row is never cached
+under the new version.
+"""
+import time
+from functools import partial
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import lazy
+
+from app.services.metrics_functions import Counters
+
+Account = lazy(get_user_model, object)()
+
+ACCOUNT_VERSION_KEY = "account:{pk}:version"
+ACCOUNT_DATA_KEY = "account:{pk}:v{version}"
+
+_stats = Counters("hits", "misses")
+
+
+def get_account_cache_stats() -> dict[str, int]:
+    """Return the hit/miss counters of the account cache.
+
+    The counters are kept per process.
+
+    Returns:
+        Copy of the counters.
+    """
+    return _stats.snapshot()
+
+
+def reset_account_cache_stats() -> None:
+    """Reset the hit/miss counters of the account cache."""
+    _stats.reset()
+
+
+def get_account_cache_version(pk: int) -> int:
+    """Return the current cache version of the account.
+
+    A missing version (first access or evicted key) is replaced by a
+    new unique one, so stale data stored under an old version is never
+    read again.
+
+    Args:
+        pk (int): Account primary key.
+
+    Returns:
+        Current version number.
+    """
+    key = ACCOUNT_VERSION_KEY.format(pk=pk)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key, time.time_ns())
+    return version
+
+
+async def aget_account_cache_version(pk: int) -> int:
+    """Async version of `get_account_cache_version()`.
+
+    Args:
+        pk (int): Account primary key.
+
+    Returns:
+        Current version number.
+    """
+    key = ACCOUNT_VERSION_KEY.format(pk=pk)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key, time.time_ns())
+    return version
+
+
+def get_cached_account(
+    pk: int,
+    version: Optional[int] = None,
+) -> Optional["Account"]:
+    """Get the account from the cache.
+
+    Args:
+        pk (int): Account primary key.
+        version (int): Cache version, the current one by default.
+
+    Returns:
+        Account instance if it is cached, None otherwise.
+    """
+    if version is None:
+        version = get_account_cache_version(pk)
+    account = cache.get(ACCOUNT_DATA_KEY.format(pk=pk, version=version))
+    _stats.increment("misses" if account is None else "hits")
+    return account
+
+
+async def aget_cached_account(
+    pk: int,
+    version: Optional[int] = None,
+) -> Optional["Account"]:
+    """Async version of `get_cached_account()`.
+
+    Args:
+        pk (int): Account primary key.
+        version (int): Cache version, the current one by default.
+
+    Returns:
+        Account instance if it is cached, None otherwise.
+    """
+    if version is None:
+        version = await aget_account_cache_version(pk)
+    account = await cache.aget(ACCOUNT_DATA_KEY.format(pk=pk, version=version))
+    _stats.increment("misses" if account is None else "hits")
+    return account
+
+
+def cache_account(account: Account, version: Optional[int] = None) -> None:
+    """Put the account into the cache.
+
+    Pass the version read before the account was fetched: if the
+    account changed meanwhile, it is stored under the old version,
+    which is never read again.
+
+    Args:
+        account (Account): Account instance.
+        version (int): Cache version, the current one by default.
+    """
+    if version is None:
+        version = get_account_cache_version(account.pk)
+    cache.set(
+        ACCOUNT_DATA_KEY.format(pk=account.pk, version=version),
+        account,
+        timeout=settings.ACCOUNT_CACHE_TIMEOUT,
+    )
+
+
+async def acache_account(
+    account: Account,
+    version: Optional[int] = None,
+) -> None:
+    """Async version of `cache_account()`.
+
+    Args:
+        account (Account): Account instance.
+        version (int): Cache version, the current one by default.
+    """
+    if version is None:
+        version = await aget_account_cache_version(account.pk)
+    await cache.aset(
+        ACCOUNT_DATA_KEY.format(pk=account.pk, version=version),
+        account,
+        timeout=settings.ACCOUNT_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_account_cache(pk: int, using: Optional[str] = None) -> None:
+    """Invalidate the cached account by bumping its version.
+
+    The version is bumped when the current transaction commits, right
+    away outside of a transaction.
+
+    Args:
+        pk (int): Account primary key.
+        using (str): Database alias of the transaction.
+    """
+    transaction.on_commit(
+        partial(bump_account_cache_version, pk),
+        using=using,
+    )
+
+
+def bump_account_cache_version(pk: int) -> None:
+    """Bump the cache version of the account.
+
+    Args:
+        pk (int): Account primary key.
+    """
+    key = ACCOUNT_VERSION_KEY.format(pk=pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
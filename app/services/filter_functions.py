@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+"""Probabilistic membership structures."""
+import hashlib
+import math
+from threading import Lock
+from typing import Iterable
+
+
+class BloomFilter:
+    """Bloom filter over strings.
+
+    `in` never gives a false negative: if it returns False the item was
+    definitely never added. It may give a false positive with about
+    `error_rate` probability while the filter holds at most `capacity`
+    items.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """Create an empty filter.
+
+        Args:
+            capacity (int): Expected number of items.
+            error_rate (float): Target false positive probability.
+        """
+        capacity = max(capacity, 1)
+        self.size = math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2,
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray(math.ceil(self.size / 8))
+        self._lock = Lock()
+
+    def _positions(self, item: str) -> Iterable[int]:
+        """Return bit positions of the item using double hashing.
+
+        Args:
+            item (str): Item.
+
+        Returns:
+            Bit positions.
+        """
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first + index * second) % self.size
+            for index in range(self.hash_count)
+        )
+
+    def add(self, item: str) -> None:
+        """Add the item.
+
+        Args:
+            item (str): Item.
+        """
+        with self._lock:
+            for position in self._positions(item):
+                self._bits[position // 8] |= 1 << (position % 8)
+
+    def update(self, items: Iterable[str]) -> None:
+        """Add all items.
+
+        Args:
+            items (Iterable[str]): Items.
+        """
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        """Check whether the item may have been added.
+
+        Args:
+            item (str): Item.
+
+        Returns:
+            False if the item was definitely never added.
+        """
+        return all(
+            self._bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(item)
+        )
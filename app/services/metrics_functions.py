@@ -0,0 +1,218 @@
+# -*- coding: UTF-8 -*-
+"""Utils functions for in-process metrics."""
+from bisect import bisect_left
+from itertools import accumulate
+from multiprocessing import Array
+from threading import Lock
+from typing import Iterable
+
+LABEL_ESCAPES = str.maketrans({"\\": r"\\", '"': r"\"", "\n": r"\n"})
+
+
+class Counters:
+    """Thread-safe group of named counters kept per process."""
+
+    def __init__(self, *names: str):
+        """Create counters starting from zero.
+
+        Args:
+            *names (tuple): Counter names.
+        """
+        self._lock = Lock()
+        self._values = dict.fromkeys(names, 0)
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Increase a counter.
+
+        Args:
+            name (str): Counter name.
+            amount (int): Value added to the counter.
+        """
+        with self._lock:
+            self._values[name] = self._values.get(name, 0) + amount
+
+    def snapshot(self) -> dict[str, int]:
+        """Return the current values.
+
+        Returns:
+            Copy of the counters.
+        """
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        """Set all counters back to zero."""
+        with self._lock:
+            self._values = dict.fromkeys(self._values, 0)
+
+
+class SharedCounters:
+    """Labelled counters in shared memory.
+
+    Processes forked after creation, such as Celery prefork children,
+    add to the same counters the parent reads.
+    """
+
+    def __init__(self, labels: Iterable[str]):
+        """Create counters starting from zero.
+
+        Args:
+            labels (Iterable[str]): Counter labels, others are ignored.
+        """
+        self._offsets = {label: index for index, label in enumerate(labels)}
+        self._values = Array("Q", len(self._offsets))
+
+    def increment(self, label: str, amount: int = 1) -> None:
+        """Increase a counter.
+
+        Args:
+            label (str): Counter label.
+            amount (int): Value added to the counter.
+        """
+        offset = self._offsets.get(label)
+        if offset is None:
+            return
+        with self._values.get_lock():
+            self._values[offset] += amount
+
+    def snapshot(self) -> dict[str, int]:
+        """Return the current values.
+
+        Returns:
+            Counter value per label.
+        """
+        with self._values.get_lock():
+            values = self._values[:]
+        return {
+            label: values[offset] for label, offset in self._offsets.items()
+        }
+
+
+class SharedHistograms:
+    """Labelled histograms with fixed buckets in shared memory.
+
+    Every label holds the count per bucket, the count above the last
+    bucket and the sum of observed values in one flat array, so an
+    observation costs a bisect and a lock round trip.
+    """
+
+    def __init__(self, labels: Iterable[str], buckets: tuple[float, ...]):
+        """Create empty histograms.
+
+        Args:
+            labels (Iterable[str]): Histogram labels, others are ignored.
+            buckets (tuple[float, ...]): Sorted bucket upper bounds.
+        """
+        self.buckets = buckets
+        size = len(buckets) + 2
+        self._offsets = {
+            label: index * size for index, label in enumerate(labels)
+        }
+        self._values = Array("d", len(self._offsets) * size)
+
+    def observe(self, label: str, value: float) -> None:
+        """Record a value.
+
+        Args:
+            label (str): Histogram label.
+            value (float): Observed value.
+        """
+        offset = self._offsets.get(label)
+        if offset is None:
+            return
+        bucket = offset + bisect_left(self.buckets, value)
+        with self._values.get_lock():
+            self._values[bucket] += 1
+            self._values[offset + len(self.buckets) + 1] += value
+
+    def snapshot(self) -> dict[str, tuple[list[int], float]]:
+        """Return the current values.
+
+        Returns:
+            Cumulative bucket counts, ending with the total count, and
+            the sum of values per label.
+        """
+        with self._values.get_lock():
+            values = self._values[:]
+        size = len(self.buckets) + 2
+        return {
+            label: (
+                list(accumulate(
+                    int(count) for count in values[offset:offset + size - 1]
+                )),
+                values[offset + size - 1],
+            )
+            for label, offset in self._offsets.items()
+        }
+
+
+def format_labels(**labels: str) -> str:
+    """Format labels for the Prometheus text format.
+
+    Args:
+        **labels (dict): Label values by name.
+
+    Returns:
+        Labels in braces.
+    """
+    pairs = ",".join(
+        f'{name}="{str(value).translate(LABEL_ESCAPES)}"'
+        for name, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def format_histograms(
+    name: str,
+    description: str,
+    label: str,
+    histograms: SharedHistograms,
+) -> list[str]:
+    """Format histograms in the Prometheus text format.
+
+    Args:
+        name (str): Metric name.
+        description (str): Metric help text.
+        label (str): Name of the histogram label.
+        histograms (SharedHistograms): Histograms to format.
+
+    Returns:
+        Lines of the metric.
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    bounds = [repr(float(bound)) for bound in histograms.buckets] + ["+Inf"]
+    for value, (counts, total) in histograms.snapshot().items():
+        for bound, count in zip(bounds, counts):
+            labels = format_labels(**{label: value, "le": bound})
+            lines.append(f"{name}_bucket{labels} {count}")
+        labels = format_labels(**{label: value})
+        lines.append(f"{name}_sum{labels} {total!r}")
+        lines.append(f"{name}_count{labels} {counts[-1]}")
+    return lines
+
+
+def format_samples(
+    name: str,
+    description: str,
+    metric_type: str,
+    label: str,
+    samples: dict[str, float],
+) -> list[str]:
+    """Format counters or gauges in the Prometheus text format.
+
+    Args:
+        name (str): Metric name.
+        description (str): Metric help text.
+        metric_type (str): `counter` or `gauge`.
+        label (str): Name of the sample label.
+        samples (dict[str, float]): Sample value per label value.
+
+    Returns:
+        Lines of the metric.
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {metric_type}"]
+    lines.extend(
+        f"{name}{format_labels(**{label: value})} {sample}"
+        for value, sample in samples.items()
+    )
+    return lines
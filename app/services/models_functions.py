@@ -8,12 +8,49 @@ from pytils.translit import slugify
 
 Account = lazy(get_user_model, object)()
 
+SLUG_SUFFIX_LENGTH = 8
+SLUG_CANDIDATES = 4
+
+
+def _slug_parts(model: type, slug: str) -> tuple[str, str]:
+    """Return the base slug and the stem used for suffixed candidates.
+
+    Args:
+        model (type): Model class with a `slug` field.
+        slug (str): Base slug string.
+
+    Returns:
+        Base slug and its stem, both fitting the field with a suffix.
+    """
+    max_length = model._meta.get_field("slug").max_length
+    base_slug = slugify(slug)
+    return (
+        base_slug[:max_length],
+        base_slug[:max_length - SLUG_SUFFIX_LENGTH - 1],
+    )
+
+
+def _suffixed_slug(stem: str) -> str:
+    """Return the stem with a random suffix.
+
+    Args:
+        stem (str): Slug stem.
+
+    Returns:
+        Suffixed slug candidate.
+    """
+    return f"{stem}-{uuid4().hex[:SLUG_SUFFIX_LENGTH]}"
+
 
 def unique_slugify(instance: Account, slug: str) -> str:
     """Create a unique slug.
 
-    Create a unique slug based on default slug functions.
-    Until a unique slug is found, generation will occur.
+    The base slug and a few suffixed candidates are checked with a single
+    query and the first free one is returned. Only in the unlikely case
+    that all of them are taken another batch of candidates is checked.
+
+    A concurrent save may still take the returned slug before the
+    instance is saved, `Account.save()` retries with a new slug then.
 
     Args:
         instance (Account): Account instance.
@@ -23,8 +60,54 @@ def unique_slugify(instance: Account, slug: str) -> str:
         Unique slug string.
     """
     model = instance.__class__
-    unique_slug = slugify(slug)
-    while model.objects.filter(slug=unique_slug).exists():
-        suffix = uuid4().hex[:8]
-        unique_slug = f"{slugify(slug)}-{suffix}"
-    return unique_slug
+    base_slug, stem = _slug_parts(model, slug)
+    candidates = [base_slug]
+    while True:
+        candidates.extend(
+            _suffixed_slug(stem) for _ in range(SLUG_CANDIDATES)
+        )
+        taken = set(
+            model.objects.filter(slug__in=candidates).values_list(
+                "slug", flat=True,
+            ),
+        )
+        for candidate in candidates:
+            if candidate not in taken:
+                return candidate
+        candidates = []
+
+
+def unique_slugify_many(model: type, slugs: list[str]) -> list[str]:
+    """Create unique slugs for many new instances at once.
+
+    Every round checks all pending candidates with one query. The slugs
+    are unique among themselves and against the saved instances, which
+    usually takes two queries per call.
+
+    Args:
+        model (type): Model class with a `slug` field.
+        slugs (list[str]): Base slug strings, one per instance.
+
+    Returns:
+        Unique slug strings in the order of `slugs`.
+    """
+    parts = [_slug_parts(model, slug) for slug in slugs]
+    candidates = [base_slug for base_slug, _ in parts]
+    pending = list(range(len(slugs)))
+    assigned = set()
+    while pending:
+        taken = set(
+            model.objects.filter(
+                slug__in={candidates[index] for index in pending},
+            ).values_list("slug", flat=True),
+        )
+        still_pending = []
+        for index in pending:
+            candidate = candidates[index]
+            if candidate in taken or candidate in assigned:
+                candidates[index] = _suffixed_slug(parts[index][1])
+                still_pending.append(index)
+            else:
+                assigned.add(candidate)
+        pending = still_pending
+    return candidates
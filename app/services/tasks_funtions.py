@@ -1,39 +1,65 @@
 # -*- coding: UTF-8 -*-
 """Utils functions for celery tasks."""
-from typing import Callable
+import time
+from typing import Iterable
 
-from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.tokens import default_token_generator
-from django.template.loader import render_to_string
+from django.core.mail import EmailMessage, get_connection
 from django.utils.encoding import force_bytes
 from django.utils.http import urlsafe_base64_encode
 
+from app.account.last_login import last_login_recorder
+from app.account.tokens import email_confirmation_token_generator
+from app.services.email_functions import RenderedEmail, render_email
+
 Account = get_user_model()
 
 
 def generate_password_reset_uidb_and_token(user: Account) -> tuple[str, str]:
     """Generate uid and token for password reset.
 
+    The token hashes `last_login`, so a buffered login is written first.
+
     Args:
         user (Account): User object.
 
     Returns:
         Generated uid64 and token.
     """
+    last_login_recorder.flush_account(user)
     uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
     token = default_token_generator.make_token(user)
     return uidb64, token
 
 
-def prepare_password_reset_email_letter(
+def generate_email_confirmation_uidb_and_token(
+    user: Account,
+) -> tuple[str, str]:
+    """Generate uid and token for email confirmation.
+
+    Args:
+        user (Account): User object.
+
+    Returns:
+        Generated uid64 and token.
+    """
+    uidb64 = urlsafe_base64_encode(force_bytes(user.pk))
+    token = email_confirmation_token_generator.make_token(user)
+    return uidb64, token
+
+
+def prepare_password_reset_email(
         user: Account,
         email: str,
         uidb64: str,
         token: str,
         template_name: str,
-) -> Callable:
-    """Prepare password reset email message.
+) -> RenderedEmail:
+    """Prepare the text and HTML bodies of a password reset email.
+
+    The template is compiled once per process and the site part of the
+    context is reused, see `app.services.email_functions`.
 
     Args:
         user (Account): User object.
@@ -43,18 +69,66 @@ def prepare_password_reset_email_letter(
         template_name (str): Template name.
 
     Returns:
-        Rendered template with context data.
+        Rendered text body and its HTML alternative.
+    """
+    return render_email(
+        template_name,
+        {
+            "email": email,
+            "uidb64": uidb64,
+            "user": user,
+            "token": token,
+        },
+    )
+
+
+def prepare_email_confirmation_email(
+        user: Account,
+        email: str,
+        uidb64: str,
+        token: str,
+        template_name: str,
+) -> RenderedEmail:
+    """Prepare the text and HTML bodies of an email confirmation email.
+
+    Args:
+        user (Account): User object.
+        email (str): User's email address.
+        uidb64 (str): User's uidb64.
+        token (str): User's confirmation token.
+        template_name (str): Template name.
+
+    Returns:
+        Rendered text body and its HTML alternative.
     """
-    message = render_to_string(
-        template_name=template_name,
-        context={
+    return render_email(
+        template_name,
+        {
             "email": email,
-            "domain": settings.DOMAIN,
-            "site_name": settings.SITE_NAME,
             "uidb64": uidb64,
             "user": user,
             "token": token,
-            "protocol": "https" if settings.USE_HTTPS else "http",
         },
     )
-    return message
+
+
+def send_messages_over_connection(
+    messages: Iterable[EmailMessage],
+) -> tuple[int, float]:
+    """Send the messages over a single mail connection.
+
+    The backend opens the connection once for the whole batch instead of
+    once per message like `send_mail()`.
+
+    Args:
+        messages (Iterable[EmailMessage]): Messages to send.
+
+    Returns:
+        Number of sent messages and elapsed time in milliseconds.
+    """
+    messages = list(messages)
+    if not messages:
+        return 0, 0.0
+    started = time.perf_counter()
+    sent = get_connection().send_messages(messages) or 0
+    return sent, (time.perf_counter() - started) * 1000
@@ -1,8 +1,15 @@
+import time
+
 import pytest
+from celery import Celery
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.test import RequestFactory
 
+from app.account.dispatch import TaskDispatcher
+from app.account.email_backend import EmailBackend
 from app.account.forms import AccountLoginForm
+from app.benchmarks.smtp_sink import SMTPSink
 
 
 @pytest.fixture(scope="function")
@@ -58,3 +65,137 @@ def test_password():
 def factory():
     """Фикстура для создания RequestFactory."""
     return RequestFactory()
+
+
+@pytest.fixture
+def sink():
+    """SMTP sink keeping the received messages."""
+    with SMTPSink(keep=True) as smtp_sink:
+        yield smtp_sink
+
+
+@pytest.fixture
+def email_backend():
+    """Factory of email backends connecting to a local port."""
+    def create_backend(port, **kwargs):
+        return EmailBackend(
+            host="127.0.0.1",
+            port=port,
+            username="",
+            password="",
+            use_tls=False,
+            use_ssl=False,
+            **kwargs,
+        )
+    return create_backend
+
+
+def memory_celery_app(name, **conf):
+    """Create a Celery app over the in-memory broker and result backend.
+
+    Args:
+        name (str): Name of the app.
+        **conf: Extra configuration of the app.
+
+    Returns:
+        Celery: The app, not set as the current one.
+    """
+    app = Celery(
+        name,
+        set_as_current=False,
+        broker="memory://",
+        backend="cache+memory://",
+    )
+    app.conf.update(
+        broker_transport_options={"polling_interval": 0.005}, **conf,
+    )
+    return app
+
+
+@pytest.fixture
+def routing_app():
+    """Factory of apps over the in-memory broker with stand-in tasks.
+
+    The stand-ins have their own names, so the shared tasks of
+    `app.account.tasks` don't replace them, and take the given routes.
+    """
+    def create_app(task_routes):
+        app = memory_celery_app(
+            "routing",
+            task_queues=settings.CELERY_TASK_QUEUES,
+            task_default_queue=settings.CELERY_TASK_DEFAULT_QUEUE,
+            task_routes=task_routes,
+            queue_workers=settings.CELERY_QUEUE_WORKERS,
+        )
+
+        @app.task(name="routing.reset")
+        def reset(sent_at):
+            return time.perf_counter() - sent_at
+
+        @app.task(name="routing.bulk")
+        def bulk():
+            time.sleep(0.05)
+
+        return app, reset, bulk
+    return create_app
+
+
+@pytest.fixture
+def metrics_app():
+    """Factory of apps over the in-memory broker with test tasks.
+
+    The in-memory broker is shared by the process, so every test uses
+    its own queue.
+    """
+    def create_app(queue):
+        app = memory_celery_app("metrics", task_default_queue=queue)
+
+        @app.task(name="metrics.sleep")
+        def sleep(seconds):
+            time.sleep(seconds)
+
+        @app.task(name="metrics.fail")
+        def fail():
+            raise ValueError("Failed")
+
+        return app, sleep, fail
+    return create_app
+
+
+@pytest.fixture
+def recording_task():
+    """Factory of tasks recording their calls over the given broker."""
+    def create_task(broker):
+        app = Celery("dispatch", set_as_current=False, broker=broker)
+        app.conf.task_default_queue = "dispatch"
+        calls = []
+
+        @app.task(name="dispatch.record")
+        def record(value, release=None):
+            if release is not None:
+                release.wait(5)
+            calls.append(value)
+
+        return record, calls
+    return create_task
+
+
+@pytest.fixture
+def task_dispatcher():
+    """Factory of small task dispatchers shut down after the test."""
+    dispatchers = []
+
+    def create_dispatcher(mode="broker", **kwargs):
+        options = {
+            "timeout": 1,
+            "retry_seconds": 30,
+            "workers": 1,
+            "queue_size": 1,
+        }
+        options.update(kwargs)
+        dispatcher = TaskDispatcher(mode, **options)
+        dispatchers.append(dispatcher)
+        return dispatcher
+    yield create_dispatcher
+    for dispatcher in dispatchers:
+        dispatcher.shutdown()